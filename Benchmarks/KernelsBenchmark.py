@@ -0,0 +1,48 @@
+"""
+Benchmark of worker task kernels: pure python implementation against array-backed implementation.
+Run from the root of repository:
+    python -m Benchmarks.KernelsBenchmark
+"""
+import random
+import timeit
+
+from Server import Kernels
+
+
+sizes: tuple = (10, 100, 1000, 10000, 100000)  # lengths of data
+max_symbol_repeat_size: int = 10000  # symbol_repeat result grows as size**2, so bigger data is skipped
+
+
+def random_data(size: int) -> str:
+    """generate random string with symbols from several unicode planes"""
+    alphabet = 'abcdefghijklmnopqrstuvwxyz0123456789абвгдеёжзий€😀'
+    return ''.join(random.choice(alphabet) for _ in range(size))
+
+
+def measure(kernel: callable, data: str) -> float:
+    """best time of one kernel call in seconds"""
+    timer = timeit.Timer(lambda: kernel(data))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=3, number=number)) / number
+
+
+def main():
+    if Kernels.np is None:
+        print('numpy is not installed, only python kernels are measured')
+    print(f'{"task type":<18}{"size":>8}{"python, s":>14}{"array, s":>14}{"speedup":>10}')
+    for task_type in Kernels.python_kernels.keys():
+        for size in sizes:
+            if task_type == 'symbol_repeat' and size > max_symbol_repeat_size:
+                continue
+            data = random_data(size)
+            python_time = measure(Kernels.python_kernels[task_type], data)
+            if Kernels.np is None:
+                print(f'{task_type:<18}{size:>8}{python_time:>14.6f}{"-":>14}{"-":>10}')
+                continue
+            array_time = measure(Kernels.array_kernels[task_type], data)
+            print(f'{task_type:<18}{size:>8}{python_time:>14.6f}{array_time:>14.6f}'
+                  f'{python_time / array_time:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark of relay from client to result window: CPU time of idle relay thread and throughput of lines.
+The result window is replaced by a reader thread on socketpair.
+Run from the root of repository:
+    python -m Benchmarks.RelayBenchmark
+"""
+import argparse
+import socket
+import time
+from threading import Thread
+
+from Client.Queues import DisplayQueue, ResultRelay
+from src.MessageHandlers import ClientMessageHandler, DataTransfer
+
+
+def start_relay() -> tuple:
+    """relay over socketpair and reader thread, which reads frames and counts lines"""
+    sender_socket, reader_socket = socket.socketpair()
+    data_to_show = DisplayQueue()
+    relay = ResultRelay(data_to_show, ClientMessageHandler(sender_socket, ('socketpair', 0)))
+    reader = DataTransfer(reader_socket, ('socketpair', 0))
+    reader.frames = 0  # count of read frames
+    reader.lines = 0  # count of read lines
+
+    def read():
+        while True:
+            try:
+                data = reader.read_msg()
+            except (OSError, TimeoutError):
+                return
+            reader.frames += 1
+            reader.lines += data.count(b'"]') or 1
+    relay_thread = Thread(target=relay.run, daemon=True)
+    reader_thread = Thread(target=read, daemon=True)
+    relay_thread.start()
+    reader_thread.start()
+    return data_to_show, relay, relay_thread, reader, (sender_socket, reader_socket)
+
+
+def idle_cpu(seconds: float) -> float:
+    """CPU time of the process per second of wall time, while relay is idle"""
+    data_to_show, relay, relay_thread, reader, sockets = start_relay()
+    start_cpu, start_time = time.process_time(), time.perf_counter()
+    time.sleep(seconds)
+    result = (time.process_time() - start_cpu) / (time.perf_counter() - start_time)
+    relay.stop()
+    relay_thread.join()
+    for i in sockets:
+        i.close()
+    return result
+
+
+def throughput(count: int, line_size: int) -> tuple:
+    """
+    lines per second and frames per second of relay
+    :param count: count of lines
+    :param line_size: length of one line
+    """
+    data_to_show, relay, relay_thread, reader, sockets = start_relay()
+    line = 'x' * line_size
+    start = time.perf_counter()
+    for i in range(count):
+        data_to_show.appendleft([line, ''])
+    while reader.lines < count:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    relay.stop()
+    relay_thread.join()
+    for i in sockets:
+        i.close()
+    return count / elapsed, reader.frames / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of result window relay')
+    parser.add_argument('--idle', type=float, default=2.0, help='duration of idle measurement, s')
+    parser.add_argument('--count', type=int, default=100000, help='count of lines in throughput measurement')
+    args = parser.parse_args()
+
+    print(f'idle CPU: {idle_cpu(args.idle) * 100:.2f} % of one core')
+    for line_size in (20, 1000):
+        lines_per_second, frames_per_second = throughput(args.count, line_size)
+        print(f'lines of {line_size} symbols: {lines_per_second:.0f} lines/s in {frames_per_second:.0f} frames/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""
+Microbenchmark suite of hot paths: message framing, serialization, parsing, request dispatch and task kernels.
+Results are written as JSON {benchmark name: seconds per operation} and can be compared against stored baseline.
+Run from the root of repository:
+    python -m Benchmarks.Suite --output results.json
+    python -m Benchmarks.Suite --save-baseline baseline.json
+    python -m Benchmarks.Suite --baseline baseline.json --threshold 0.1
+"""
+import argparse
+import json
+import random
+import socket
+import string
+import sys
+import timeit
+from collections import deque
+from threading import Thread
+from types import SimpleNamespace
+from typing import Dict
+
+from Server.Kernels import run_kernel
+from Server.Worker import Worker
+from src.ClientRequests import BaseRequest, create_request
+from src.MessageHandlers import DataTransfer
+from src.ServerRequest import commands as server_commands
+
+
+message_sizes: tuple = (100, 10000, 1000000)  # sizes of framed messages, bytes
+data_sizes: tuple = (100, 10000)  # lengths of task data
+
+
+def measure(function: callable, repeat: int = 5) -> float:
+    """best time of one call in seconds"""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def random_data(size: int) -> str:
+    """random ascii string"""
+    return ''.join(random.choices(string.ascii_letters, k=size))
+
+
+def client_stub() -> SimpleNamespace:
+    """client event loop with the attributes used by request parsers"""
+    return SimpleNamespace(request_num=0, batch_processing_mode=SimpleNamespace(status=False, task=None))
+
+
+class ServerStub:
+    """server event loop with the attributes used by server requests"""
+    def __init__(self, worker: Worker):
+        self.worker: Worker = worker
+        self.data_to_send: deque = deque()
+
+
+def framing_benchmarks() -> Dict[str, float]:
+    """send_msg and read_msg over socketpair: time of one message from sending to reading"""
+    results = dict()
+    for size in message_sizes:
+        sender_socket, reader_socket = socket.socketpair()
+        sender = DataTransfer(sender_socket, ('socketpair', 0))
+        reader = DataTransfer(reader_socket, ('socketpair', 0))
+        message = BaseRequest.dump([1, 'task', None, '--reverse', False, None, random_data(size), None])
+        count = max(10, 10000000 // size)  # count of messages per measurement
+        timings = list()
+        for _ in range(3):
+            sender_thread = Thread(target=lambda: [sender.send_msg(message) for _ in range(count)])
+            start = timeit.default_timer()
+            sender_thread.start()
+            for _ in range(count):
+                reader.read_msg()
+            timings.append((timeit.default_timer() - start) / count)
+            sender_thread.join()
+        results[f'framing.send_read.{size}'] = min(timings)
+        sender_socket.close()
+        reader_socket.close()
+    return results
+
+
+def serialization_benchmarks() -> Dict[str, float]:
+    """BaseRequest.dump, BaseRequest.loads and create_request"""
+    results = dict()
+    for size in data_sizes:
+        value = [1, 'task', None, '--reverse', False, None, random_data(size), None, None, None]
+        dumped = BaseRequest.dump(value)
+        results[f'serialization.dump.{size}'] = measure(lambda: BaseRequest.dump(value))
+        results[f'serialization.loads.{size}'] = measure(lambda: BaseRequest.loads(dumped[:-8]))
+
+    event_handler = client_stub()
+    user_inputs = {'task': 'task --reverse -b some data for task',
+                   'status': 'status 12',
+                   'result': 'result 12',
+                   'cancel': 'cancel 1 2 3',
+                   'identifiers': 'identifiers'}
+    for command, user_input in user_inputs.items():
+        results[f'parsing.create_request.{command}'] = measure(lambda: create_request(user_input, event_handler))
+    return results
+
+
+def dispatch_benchmarks() -> Dict[str, float]:
+    """the path from decoded message to request.run() on server"""
+    results = dict()
+    worker = Worker()  # worker thread is not started, tasks stay in queue
+    event_handler = ServerStub(worker)
+    worker.add_task(SimpleNamespace(event_handler=event_handler, request_identifier_on_client=1, command='task',
+                                    error=None, task_type='--reverse', is_batch_processing_mode=False,
+                                    request_identifier_on_result=None, data='abc', deadline=None, trace=None))
+    messages = {'status': [2, 'status', None, 1, None, None],
+                'result': [3, 'result', None, 1, None, None],
+                'identifiers': [4, 'identifiers', None, None, None],
+                'task': [5, 'task', None, '--reverse', False, None, 'abc', None, None, None]}
+
+    for command, decoded_data in messages.items():
+        def dispatch():
+            request = server_commands[decoded_data[1]](event_handler, *decoded_data)
+            request.run()
+            event_handler.data_to_send.clear()
+        results[f'dispatch.{command}'] = measure(dispatch)
+    return results
+
+
+def kernel_benchmarks() -> Dict[str, float]:
+    """compute phase of every task type (delay phase is not executed)"""
+    results = dict()
+    for task_type in Worker.delays.keys():
+        for size in data_sizes:
+            if task_type == 'symbol_repeat' and size > 1000:  # result grows as size**2
+                size = 1000
+            data = random_data(size)
+            results[f'kernel.{task_type}.{size}'] = measure(lambda: run_kernel(task_type, data))
+    return results
+
+
+def run_suite() -> Dict[str, float]:
+    """run all benchmarks"""
+    results = dict()
+    for benchmarks in (framing_benchmarks, serialization_benchmarks, dispatch_benchmarks, kernel_benchmarks):
+        results.update(benchmarks())
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> Dict[str, float]:
+    """
+    compare results with baseline
+    :param results: current results
+    :param baseline: stored results
+    :param threshold: allowed relative slowdown, 0.1 means 10%
+    :return: regressions Dict[benchmark name: relative slowdown]
+    """
+    regressions = dict()
+    for name, value in results.items():
+        if name in baseline and baseline[name] > 0:
+            slowdown = value / baseline[name] - 1
+            if slowdown > threshold:
+                regressions[name] = slowdown
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Microbenchmark suite')
+    parser.add_argument('--output', default=None, help='file to write results as JSON')
+    parser.add_argument('--baseline', default=None, help='file with stored results to compare with')
+    parser.add_argument('--save-baseline', default=None, help='file to store results as new baseline')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed relative slowdown, default 0.1')
+    args = parser.parse_args()
+
+    results = run_suite()
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    for name, value in results.items():
+        line = f'{name:<45}{value * 1e6:>14.3f} us'
+        if baseline is not None and name in baseline:
+            line += f'{(value / baseline[name] - 1) * 100:>+10.1f} %'
+        print(line)
+
+    for path in (args.output, args.save_baseline):
+        if path is not None:
+            with open(path, 'w') as file:
+                json.dump(results, file, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for name, slowdown in regressions.items():
+            print(f'REGRESSION {name}: {slowdown * 100:.1f} % slower than baseline')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Memory of worker task table: the tasks are added to the worker (worker thread is not started)
+and the memory allocated by them is measured by tracemalloc, when the tasks are in queue and when they are finished.
+The result is scaled to one million tasks.
+Run from the root of repository:
+    python -m Benchmarks.TaskTableBenchmark --count 200000 --size 16
+"""
+import argparse
+import gc
+import tracemalloc
+from collections import deque
+from types import SimpleNamespace
+
+from Server.Worker import Worker
+
+
+class ClientStub:
+    """event loop of client, the tasks keep only its connection id"""
+    def __init__(self):
+        self.data_to_send: deque = deque()
+
+
+def report(title: str, allocated: int, count: int):
+    """print allocated memory per task"""
+    print(f'{title}: {allocated / count:.1f} bytes per task, '
+          f'{allocated / count * 1e6 / 2 ** 20:.1f} MiB per million tasks')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of memory of task table')
+    parser.add_argument('--count', type=int, default=200000, help='count of tasks')
+    parser.add_argument('--size', type=int, default=16, help='length of data of task')
+    parser.add_argument('--clients', type=int, default=10, help='count of clients')
+    args = parser.parse_args()
+
+    worker = Worker()  # worker thread is not started, tasks stay in table
+    clients = [ClientStub() for _ in range(args.clients)]
+    data = 'x' * args.size
+    gc.collect()
+    tracemalloc.start()
+    for i in range(args.count):
+        is_batch_processing_mode = i % 2 == 1
+        worker.add_task(SimpleNamespace(
+            event_handler=clients[i % args.clients], request_identifier_on_client=i, command='task', error=None,
+            task_type='--reverse', is_batch_processing_mode=is_batch_processing_mode,
+            request_identifier_on_result=i + 1 if is_batch_processing_mode else None,
+            data=data[:-1] + str(i % 10), deadline=None, trace=None))  # every task has its own data string
+    worker.deque.clear()  # the queue is not a part of table
+    gc.collect()
+    report('tasks in queue', tracemalloc.get_traced_memory()[0], args.count)
+
+    worker.semaphore.acquire()
+    for identifier in worker.tasks.identifiers():  # finish tasks: they keep only the rows of table
+        worker.cancel_task(identifier)
+    worker.semaphore.release()
+    for client in clients:  # drop result responses of batch processing mode
+        client.data_to_send.clear()
+    gc.collect()
+    report('finished tasks', tracemalloc.get_traced_memory()[0], args.count)
+    tracemalloc.stop()
+
+    print(f'task table ({args.count} tasks, data {args.size} symbols):')
+    for name, size in worker.memory_usage().items():
+        print(f'    {name:<10}{size / args.count:>10.1f} bytes per task')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark of transports of local links: TCP loopback, unix domain socket and shared memory ring.
+One-way latency of small messages and throughput of large messages are measured in one process:
+the sender and the reader are different threads.
+Run from the root of repository:
+    python -m Benchmarks.TransportBenchmark
+"""
+import argparse
+import os
+import socket
+import struct
+import tempfile
+import time
+from threading import Thread
+from typing import List, Tuple
+
+from src.MessageHandlers import DataTransfer
+from src.Transport import ShmRingTransfer, create_socket, shared_memory
+
+
+def socket_pair(scheme: str) -> Tuple[DataTransfer, DataTransfer, callable]:
+    """
+    connected sender and reader over socket of scheme tcp or unix
+    :return: sender, reader, function to close them
+    """
+    listener = create_socket(scheme)
+    if scheme == 'unix':
+        address = os.path.join(tempfile.mkdtemp(), 'benchmark.sock')
+    else:
+        address = ('127.0.0.1', 0)
+    listener.bind(address)
+    listener.listen(1)
+    address = listener.getsockname()
+    sender_socket = create_socket(scheme)
+    sender_socket.connect(address)
+    reader_socket, _ = listener.accept()
+    listener.close()
+    if scheme == 'tcp':
+        sender_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def close():
+        sender_socket.close()
+        reader_socket.close()
+        if scheme == 'unix':
+            os.remove(address)
+    return DataTransfer(sender_socket, address), DataTransfer(reader_socket, address), close
+
+
+def shm_pair() -> Tuple[ShmRingTransfer, ShmRingTransfer, callable]:
+    """
+    sender and reader over shared memory ring
+    :return: sender, reader, function to close them
+    """
+    name = f'benchmark_{os.getpid()}'
+    reader = ShmRingTransfer(name)
+    reader.listen()
+    sender = ShmRingTransfer(name)
+    sender.connect()
+
+    def close():
+        sender.close()
+        reader.close()
+    return sender, reader, close
+
+
+def create_pair(transport: str) -> tuple:
+    """sender, reader and function to close them"""
+    return shm_pair() if transport == 'shm' else socket_pair(transport)
+
+
+def latency(transport: str, count: int) -> List[float]:
+    """
+    one-way latencies of small messages, the next message is sent after the previous one is read
+    :param transport: tcp, unix or shm
+    :param count: count of messages
+    :return: sorted latencies, s
+    """
+    sender, reader, close = create_pair(transport)
+    latencies = list()
+
+    def read():
+        for _ in range(count):
+            data = reader.read_msg()
+            latencies.append(time.perf_counter() - struct.unpack('d', data)[0])
+    reader_thread = Thread(target=read)
+    reader_thread.start()
+    for _ in range(count):
+        received = len(latencies)
+        sender.send_msg(struct.pack('d', time.perf_counter()) + b'endofmsg')
+        while len(latencies) == received and reader_thread.is_alive():  # wait for reading
+            time.sleep(0)
+    reader_thread.join()
+    close()
+    return sorted(latencies)
+
+
+def throughput(transport: str, count: int, size: int) -> float:
+    """
+    throughput of messages
+    :param transport: tcp, unix or shm
+    :param count: count of messages
+    :param size: size of message, bytes
+    :return: megabytes per second
+    """
+    sender, reader, close = create_pair(transport)
+    message = b'x' * size + b'endofmsg'
+
+    def read():
+        for _ in range(count):
+            reader.read_msg()
+    reader_thread = Thread(target=read)
+    start = time.perf_counter()
+    reader_thread.start()
+    for _ in range(count):
+        sender.send_msg(message)
+    reader_thread.join()
+    elapsed = time.perf_counter() - start
+    close()
+    return count * size / elapsed / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of transports')
+    parser.add_argument('--count', type=int, default=5000, help='count of messages in latency measurement')
+    parser.add_argument('--size', type=int, default=65536, help='size of message in throughput measurement')
+    parser.add_argument('--megabytes', type=int, default=200, help='total size of throughput measurement, MB')
+    args = parser.parse_args()
+
+    transports = ['tcp']
+    if hasattr(socket, 'AF_UNIX'):
+        transports.append('unix')
+    if shared_memory is not None:
+        transports.append('shm')
+    print(f'{"transport":<12}{"p50, us":>12}{"p99, us":>12}{"MB/s":>12}')
+    for transport in transports:
+        latencies = latency(transport, args.count)
+        speed = throughput(transport, max(1, args.megabytes * 1000000 // args.size), args.size)
+        print(f'{transport:<12}{latencies[len(latencies) // 2] * 1e6:>12.1f}'
+              f'{latencies[int(len(latencies) * 0.99)] * 1e6:>12.1f}{speed:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -3,12 +3,14 @@ from __future__ import annotations
 import select
 import socket
 import time
-from typing import Tuple, TYPE_CHECKING, Union
+from typing import Dict, Iterator, Tuple, TYPE_CHECKING, Union
 from functools import wraps
 
-from Client.Queues import Queue, BatchProcessingMode, InputOutput
+from Client.Queues import Queue, BatchProcessingMode, InputOutput, ResultCache
 from src.ClientRequests import commands, BaseRequest
 from src.MessageHandlers import ClientMessageHandler
+from src.Metrics import metrics
+from src.Tracing import hop
 
 if TYPE_CHECKING:
     from src.ClientRequests import StatusRequest, ResultRequest, InfoRequest, Task
@@ -29,42 +31,107 @@ class ClientEventLoop(ClientMessageHandler):
                  client_socket: socket.socket,
                  address: Tuple[str, int],
                  result_window_sender: ClientMessageHandler,
-                 is_start_result_window: bool = True):
+                 is_start_result_window: bool = True,
+                 result_cache: ResultCache = None,
+                 start_time: float = None,
+                 **queue_options):
         """
         :param client_socket: created socket descriptor
         :param address: tuple([ip: str, port: int])
         :param result_window_sender: message sender to the result window
         :param is_start_result_window: if you need to automatically start result window - set True,
                                        if you want to open this window manually - set False
+        :param result_cache: cache of final statuses and results, None - cache with default settings
+        :param start_time: time.perf_counter() of client start, startup phases are measured from it
+        :param queue_options: timeouts, retries and size of wait table, see Queue
         """
         super(ClientEventLoop, self).__init__(client_socket, address)
+        self.start_time: float = start_time if start_time is not None else time.perf_counter()  # client start
+        self.startup: Dict[str: float, ...] = dict()  # Dict[startup phase: time from client start, s]
+        metrics.gauge('client_startup_seconds', 'Time from client start to startup phase', self.startup.copy, 'phase')
         self.request_num: int = 0  # counter of requests on client
         self.is_start_result_window = is_start_result_window  # is start result window (user defined)
         self.result_window_sender: ClientMessageHandler = result_window_sender  # message sender to the result window
-        self.queue: Queue = Queue(self)  # queue: requests to send, waiting for response and, results for show
+        self.queue: Queue = Queue(self, result_cache, **queue_options)  # queue: requests to send, waiting for response and, results for show
         self.input_output: InputOutput = InputOutput(self)  # input/output threads here
         self.batch_processing_mode: BatchProcessingMode = BatchProcessingMode(self)  # batch processing mode info
+        self.upload: Union[Task, None] = None  # task, whose file is being uploaded
+        self.upload_messages: Union[Iterator[bytes], None] = None  # not sent messages of upload: chunks and task
+        self.upload_message: Union[bytes, None] = None  # the next message of upload
 
 
+    def mark_startup(self, phase: str):
+        """
+        save time of startup phase
+        :param phase: name of phase
+        """
+        if phase not in self.startup:
+            self.startup[phase] = time.perf_counter() - self.start_time
+
     def connect(self, *args, **kwargs):
         """
-        Stop all threads, except input_thread. Because input_thread is daemon = True
+        Connect to server, then connect to result window and start input/output threads.
+        Stop all threads, except input_thread, if connection is interrupted. Because input_thread is daemon = True
         """
         try:
             super(ClientEventLoop, self).connect(*args, **kwargs)  # inherited connect method try to connect
+            if self.is_connected:
+                self.mark_startup('server_connected')
+                self.queue.request_instance()  # the first request: result cache is bound to server instance
+                self.input_output.start()  # connect to result window and start threads
         except KeyboardInterrupt:  # if keyboard interrupt the threads stop
             self.stop_threads()
             print('\nExit client')  # inform user
 
 
+    def start_upload(self, request: Task):
+        """
+        start upload of file of task, the messages are sent by send_upload
+        :param request: task with upload_path
+        """
+        self.upload = request
+        self.upload_messages = request.iter_dumps()
+        self.upload_message = None
+
+    def send_upload(self):
+        """
+        send the next message of upload: chunk of file or the task after the last chunk.
+        If the file can't be read or the message is not sent in time, the upload is aborted and the user is informed,
+        the server removes the received chunks after its upload timeout
+        """
+        request = self.upload
+        try:
+            if self.upload_message is None:  # the first message, the next one is read in advance
+                self.upload_message = next(self.upload_messages)
+            self.send_msg(self.upload_message)
+            self.upload_message = next(self.upload_messages, None)
+        except ConnectionError:  # connection is lost, event loop is stopped
+            raise
+        except (OSError, ValueError) as ex:  # timeout of sending or error of reading file
+            self.stop_upload()
+            self.queue.abort(request, ex)
+            return
+        if self.upload_message is None:  # the task is sent, it waits for response
+            self.stop_upload()
+            self.queue.register_waiting(request)
+            self.mark_startup('first_command_sent')
+
+    def stop_upload(self):
+        """forget current upload and close its file"""
+        if self.upload_messages is not None:
+            self.upload_messages.close()
+        self.upload, self.upload_messages, self.upload_message = None, None, None
+
     def stop_threads(self):
         """
         Stop all threads, except input_thread. Because input_thread is daemon = True
         """
-        self.input_output.threads_is_active = False  # deactivate threads
-        self.input_output.send_thread.join()  # wait for send_thread finished
-        # self.input_output.stop_subprocess()  # send kill result window
-        self.input_output.result_window.join()  # wait for result_window thread finished
+        self.input_output.stop()  # deactivate threads
+        for thread in (self.input_output.send_thread, self.input_output.result_window):
+            try:
+                thread.join()  # wait for send_thread and result_window thread finished
+            except RuntimeError:  # thread is not started
+                continue
 
 
     def run_decorator(fun: callable):
@@ -89,15 +156,17 @@ class ClientEventLoop(ClientMessageHandler):
         while True:
             try:  # catch the exceptions in event loop
                 # checking if there is something to read or to write in socket
+                # responses are not read, while result window falls behind (backpressure)
                 ready_to_read, ready_to_write, in_error = select.select(
-                    [self.client_socket], [self.client_socket], [], self.loop_timeout)
+                    [] if self.queue.data_to_show.is_full() else [self.client_socket],
+                    [self.client_socket], [], self.loop_timeout)
 
                 # if socket in the error, raise exception and stop event loop
                 if len(in_error) == 1:
                     raise ConnectionError('Socket error')
 
                 # read data firstly if there is data to read
-                if len(ready_to_read) == 1:
+                if len(ready_to_read) == 1 or (self.has_buffered_msg() and not self.queue.data_to_show.is_full()):
                     try:
                         bytes_data: bytes = self.read_msg()  # get bytes data from server
                         decoded_data: list = BaseRequest.loads(bytes_data)  # convert bytes to list
@@ -110,18 +179,31 @@ class ClientEventLoop(ClientMessageHandler):
                         response = None
 
                     if response is not None:
+                        hop(response.trace, 'client_received')
                         self.queue.handle_response(response)  # send request object in response handler
 
-                # send data if there is data to send
-                if len(ready_to_write) == 1 and len(self.queue.data_to_send) >= 1:
+                # send one chunk of uploaded file per iteration, so the responses are read while it is uploaded
+                if len(ready_to_write) == 1 and self.upload is not None:
+                    self.send_upload()
+
+                # send data if there is data to send, the next upload waits for the end of current one
+                if len(ready_to_write) == 1 and len(self.queue.data_to_send) >= 1 and \
+                        (self.upload is None or getattr(self.queue.data_to_send[-1], 'upload_path', None) is None):
                     try:
                         request = self.queue.data_to_send.pop()  # pop request from queue
-                        self.send_msg(request.dumps())  # dump request to bytes and send to server bytes data
-                        # move request to waiting container (dict)
-                        self.queue.wait_for_result[request.request_identifier_on_client] = request
+                        hop(request.trace, 'client_sent')
+                        if getattr(request, 'upload_path', None) is not None:  # chunks are sent before the task
+                            self.start_upload(request)
+                        else:
+                            self.send_msg(request.dumps())  # send bytes data to server
+                            # move request to waiting container (dict)
+                            self.queue.register_waiting(request)
+                            self.mark_startup('first_command_sent')
                     except TimeoutError:  # ignore timeout error
                         pass
 
+                self.queue.check_timeouts()  # expire or send again requests without response
+
 
             except KeyboardInterrupt:  # if keyboard interrupted
                 if self.batch_processing_mode.status:  # if in batch processing mode, then exit from this mode
@@ -129,6 +211,7 @@ class ClientEventLoop(ClientMessageHandler):
                     # remove request which wait for result from waiting container
                     if task.request_identifier_on_result in self.queue.wait_for_result.keys():
                         del self.queue.wait_for_result[task.request_identifier_on_result]
+                        self.queue.attempts.pop(task.request_identifier_on_result, None)
                     self.batch_processing_mode.status = False
                     self.batch_processing_mode.task = None
                     # inform user about exit from batch processing mode
@@ -0,0 +1,467 @@
+"""
+Programmatic client of the task server without interactive terminal and result window.
+Requests are pipelined over pool of connections. Every connection has IO thread and window of requests in flight,
+every request returns future, which is resolved by the response with the same request_identifier_on_client.
+
+Blocking usage:
+    with TaskClient(('127.0.0.1', 12345), connections=4, max_in_flight=128) as client:
+        identifier = client.submit('reverse', 'some text').result()
+        results = client.wait([identifier])
+
+Asyncio usage:
+    async with AsyncTaskClient(('127.0.0.1', 12345)) as client:
+        identifier = await client.submit('reverse', 'some text')
+        results = await client.wait([identifier])
+"""
+from __future__ import annotations
+
+import asyncio
+import select
+import socket
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from threading import Lock, Thread
+from typing import Deque, Dict, Iterable, List, Set, Tuple, Union
+
+from src.ClientRequests import BaseRequest, CancelRequest, InfoRequest, ResultRequest, StatusRequest, Task, commands
+from src.Exceptions import ResponseError, TaskTypeNotFound
+from src.MessageHandlers import ClientMessageHandler
+from src.Tracing import tracer, hop
+from src.Transport import create_socket, parse_address
+
+
+final_statuses: tuple = ('done', 'cancelled', 'expired',)  # statuses of tasks, which will not change
+
+
+def resolve(future: Future, result=None, ex: BaseException = None):
+    """
+    set result or exception of future, unless the future is cancelled by user or resolved already
+    :param future: future of response
+    :param result: result of future
+    :param ex: exception of future, result is ignored if it is not None
+    """
+    if future.done() or not future.set_running_or_notify_cancel():  # cancelled future can't be resolved
+        return
+    if ex is not None:
+        future.set_exception(ex)
+    else:
+        future.set_result(result)
+
+
+class BatchProcessingModeStub:
+    """batch processing mode of library connection is always inactive (the request parsers check it)"""
+    status: bool = False
+    task: Task = None
+
+
+class ClientConnection(ClientMessageHandler):
+    """
+    Connection with IO thread. Any thread can send request, the IO thread sends requests in order,
+    reads responses and resolves futures. Not more than max_in_flight requests wait for response at the same time,
+    the other requests wait in the queue
+    """
+    def __init__(self, address: Union[Tuple[str, int], str], max_in_flight: int = 128):
+        """
+        :param address: server address tuple([ip: str, port: int]) or address with scheme tcp:// or unix://
+        :param max_in_flight: maximum count of sent requests without response
+        """
+        scheme = 'tcp'
+        if isinstance(address, str):
+            scheme, address = parse_address(address)
+        super(ClientConnection, self).__init__(create_socket(scheme), address)
+        self.request_num: int = 0  # counter of requests
+        self.batch_processing_mode = BatchProcessingModeStub()  # is used by request parsers
+        self.lock: Lock = Lock()  # lock of request counter, futures and queue of requests
+        self.data_to_send: Deque[BaseRequest] = deque()  # requests to send
+        self.futures: Dict[int: Future, ...] = dict()  # futures waiting for response Dict[identifier: future]
+        self.in_flight: Set[int] = set()  # identifiers of sent requests without response
+        self.max_in_flight: int = max_in_flight  # window of requests in flight
+        self.wakeup_reader, self.wakeup_writer = socket.socketpair()  # wakes up IO thread when request is added
+        self.max_write: int = 65536  # maximum bytes sent in one iteration of IO loop, then responses are read
+        self.is_active: bool = False  # is IO thread active
+        self.error: Union[BaseException, None] = None  # error, which stopped IO thread, new requests fail with it
+        self.thread: Thread = Thread(target=self.run, daemon=True)  # IO thread
+
+    def open(self, n_max: int = 10):
+        """
+        connect to server and start IO thread
+        :param n_max: max count of tries to connect
+        """
+        self.connect(n_max)
+        if not self.is_connected:
+            raise ConnectionError(f"Can't connect to {self.address}")
+        self.is_active = True
+        self.thread.start()
+
+    def close(self):
+        """stop IO thread, close connection and fail not resolved futures"""
+        self.is_active = False
+        self.wakeup_writer.send(b'\0')
+        if self.thread.is_alive():
+            self.thread.join()
+        self.client_socket.close()
+        self.wakeup_reader.close()
+        self.wakeup_writer.close()
+        with self.lock:
+            if self.error is None:
+                self.error = ConnectionError(f'Connection with {self.address} is closed')
+        self.fail_futures(self.error)
+
+    def load(self) -> int:
+        """count of queued requests and requests in flight"""
+        return len(self.data_to_send) + len(self.in_flight)
+
+    def next_request_identifier(self) -> int:
+        """new request identifier. Lock must be acquired"""
+        self.request_num += 1
+        return self.request_num
+
+    def send(self, request_class: type, *args, expect_result: bool = False) -> Union[Future, Tuple[Future, Future]]:
+        """
+        create request and put it in the queue
+        :param request_class: class of request from src.ClientRequests
+        :param args: arguments of request class after request_identifier_on_client
+        :param expect_result: the request is task in batch processing mode, server will send its result
+        :return: future of response or (future of response, future of task result) if expect_result
+        """
+        future = Future()
+        result_future = Future() if expect_result else None
+        with self.lock:
+            if self.error is not None:  # IO thread is stopped, nobody will resolve the future
+                future.set_exception(self.error)
+                return (future, result_future) if expect_result else future
+            request_identifier = self.next_request_identifier()
+            if expect_result:  # request_identifier_on_result of task
+                result_identifier = self.next_request_identifier()
+                args = args[:4] + (result_identifier,) + args[5:]
+                self.futures[result_identifier] = result_future
+            request = request_class(self, request_identifier, *args)
+            request.trace = tracer.start(request.command)
+            hop(request.trace, 'client_queued')
+            self.futures[request_identifier] = future
+            self.data_to_send.appendleft(request)
+        self.wakeup_writer.send(b'\0')
+        return (future, result_future) if expect_result else future
+
+    def fail_futures(self, ex: Exception):
+        """fail all not resolved futures"""
+        with self.lock:
+            futures = list(self.futures.values())
+            self.futures.clear()
+        for future in futures:
+            resolve(future, ex=ex)
+
+    def handle_response(self, bytes_data: bytes):
+        """
+        resolve future of response
+        :param bytes_data: received message
+        """
+        decoded_data: list = BaseRequest.loads(bytes_data)
+        response: BaseRequest = commands[decoded_data[1]](self, *decoded_data)
+        hop(response.trace, 'client_received')
+        tracer.finish(response.trace)
+        with self.lock:
+            future: Future = self.futures.pop(response.request_identifier_on_client, None)
+        self.in_flight.discard(response.request_identifier_on_client)
+        if future is None:
+            return
+        resolve(future, response.result, ResponseError(response.error) if response.error is not None else None)
+
+    def send_requests(self):
+        """
+        send queued requests by one write (not more than max_write bytes, if there are several requests),
+        while the window of requests in flight is not full
+        """
+        requests = list()
+        size = 0
+        while len(self.data_to_send) > 0 and size < self.max_write and len(self.in_flight) < self.max_in_flight:
+            request = self.data_to_send.pop()
+            self.in_flight.add(request.request_identifier_on_client)
+            hop(request.trace, 'client_sent')
+            requests.append(request.dumps())
+            size += len(requests[-1])
+        if requests:
+            self.send_msg(b''.join(requests))
+
+    def run(self):
+        """IO thread event loop"""
+        try:
+            while self.is_active:
+                # don't wait if there are requests, which can be sent, but were not sent in previous iteration
+                timeout = self.loop_timeout
+                if len(self.data_to_send) > 0 and len(self.in_flight) < self.max_in_flight:
+                    timeout = 0
+                ready_to_read, ready_to_write, in_error = select.select(
+                    [self.client_socket, self.wakeup_reader], [], [], timeout)
+                if self.wakeup_reader in ready_to_read:
+                    self.wakeup_reader.recv(4096)  # clear wakeup signals
+                self.send_requests()
+                if self.client_socket in ready_to_read or self.has_buffered_msg():
+                    self.handle_response(self.read_msg())
+                    while self.has_buffered_msg():  # handle all received responses
+                        self.handle_response(self.read_msg())
+        except Exception as ex:  # broken connection or malformed response: waiting futures must not hang
+            with self.lock:
+                self.is_active = False
+                self.error = ConnectionError(f'Connection with {self.address} is broken: {ex!r}')
+            self.fail_futures(self.error)
+
+
+class ConnectionPool:
+    """
+    Pool of connections. Every request is sent by the least loaded connection
+    """
+    def __init__(self, address: Union[Tuple[str, int], str], connections: int = 1, max_in_flight: int = 128):
+        """
+        :param address: server address tuple([ip: str, port: int]) or address with scheme
+        :param connections: count of connections
+        :param max_in_flight: maximum count of sent requests without response per connection
+        """
+        self.connections: List[ClientConnection] = [ClientConnection(address, max_in_flight)
+                                                    for _ in range(connections)]
+
+    def open(self, n_max: int = 10):
+        """connect all connections"""
+        for connection in self.connections:
+            connection.open(n_max)
+
+    def close(self):
+        """close all connections"""
+        for connection in self.connections:
+            connection.close()
+
+    def send(self, request_class: type, *args, expect_result: bool = False) -> Union[Future, Tuple[Future, Future]]:
+        """send request by the least loaded connection, see ClientConnection.send"""
+        connection = min(self.connections, key=ClientConnection.load)
+        return connection.send(request_class, *args, expect_result=expect_result)
+
+
+class TaskClient:
+    """
+    Blocking client library. Methods return concurrent.futures.Future, wait() blocks
+    """
+    def __init__(self,
+                 address: Union[Tuple[str, int], str],
+                 poll_interval: float = 0.1,
+                 connections: int = 1,
+                 max_in_flight: int = 128):
+        """
+        :param address: server address tuple([ip: str, port: int]) or address with scheme
+        :param poll_interval: interval of status requests in wait(), s
+        :param connections: count of connections in pool
+        :param max_in_flight: maximum count of sent requests without response per connection
+        """
+        self.connection: ConnectionPool = ConnectionPool(address, connections, max_in_flight)
+        self.poll_interval: float = poll_interval
+        self.pushed_results: Dict[int: Future, ...] = dict()  # results sent by server Dict[identifier: future]
+
+    def open(self) -> TaskClient:
+        """connect to server"""
+        self.connection.open()
+        return self
+
+    def close(self):
+        """close connection"""
+        self.connection.close()
+
+    def __enter__(self) -> TaskClient:
+        return self.open()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def submit(self, task_type: Union[str, Iterable[str]], data: str, deadline: float = None,
+               push_result: bool = False) -> Future:
+        """
+        create task on server
+        :param task_type: reverse, pair_permutation or symbol_repeat (with or without leading '--'),
+                          or pipeline of them: 'reverse|pair_permutation' or list of stages
+        :param data: data for task
+        :param deadline: seconds after submission, when the task is expired if it is not done
+        :param push_result: server sends result when the task is finished (batch processing mode),
+                            wait() doesn't poll status of the task
+        :return: future of task identifier
+        """
+        stages = task_type.split('|') if isinstance(task_type, str) else task_type
+        task_type = '|'.join('--' + stage.strip().lstrip('-') for stage in stages)
+        try:
+            Task.check_task_type(task_type)
+        except TaskTypeNotFound:
+            raise ValueError(f'ValueError. Task type must be one of {Task.task_types} or pipeline of them')
+        args = ('task', None, task_type, push_result, None, data, None, deadline)
+        if not push_result:
+            return self.connection.send(Task, *args)
+
+        future, result_future = self.connection.send(Task, *args, expect_result=True)
+        identifier_future = Future()
+
+        def register(done_future: Future):  # remember pushed result by task identifier
+            if done_future.exception() is not None:
+                resolve(identifier_future, ex=done_future.exception())
+            else:
+                self.pushed_results[done_future.result()] = result_future
+                resolve(identifier_future, done_future.result())
+        future.add_done_callback(register)
+        return identifier_future
+
+    def status(self, identifiers: Iterable[int]) -> Dict[int, Future]:
+        """
+        request status of tasks
+        :param identifiers: task identifiers
+        :return: Dict[identifier: future of status]
+        """
+        return {i: self.connection.send(StatusRequest, 'status', None, i, None) for i in identifiers}
+
+    def result(self, identifiers: Iterable[int]) -> Dict[int, Future]:
+        """
+        request result of tasks
+        :param identifiers: task identifiers
+        :return: Dict[identifier: future of result], result is None if task is not done
+        """
+        return {i: self.connection.send(ResultRequest, 'result', None, i, None) for i in identifiers}
+
+    def cancel(self, identifiers: Iterable[int]) -> Future:
+        """
+        cancel tasks
+        :param identifiers: task identifiers
+        :return: future of list of pairs [identifier, status after cancellation]
+        """
+        return self.connection.send(CancelRequest, 'cancel', None, list(identifiers), None)
+
+    def identifiers(self) -> Future:
+        """future of identifiers of all tasks on server (comma separated string)"""
+        return self.connection.send(InfoRequest, 'identifiers', None, None)
+
+    def wait(self, identifiers: Iterable[int], timeout: float = None) -> Dict[int, Union[str, None]]:
+        """
+        wait until tasks have final status and get their results
+        :param identifiers: task identifiers
+        :param timeout: maximum time to wait, s. None - infinite
+        :return: Dict[identifier: result], result is None if task is cancelled or expired
+        """
+        end_time = time.monotonic() + timeout if timeout is not None else None
+
+        def response(future: Future):
+            """result of future, which is waited not longer than the rest of timeout"""
+            try:
+                return future.result(None if end_time is None else max(end_time - time.monotonic(), 0))
+            except FutureTimeoutError:  # it is not builtin TimeoutError before python 3.11
+                raise TimeoutError(f'Timeout to wait for response of server in {timeout} s')
+
+        results = dict()
+        waiting = list()
+        for identifier in identifiers:
+            if identifier in self.pushed_results:  # server sends result itself
+                try:
+                    results[identifier] = response(self.pushed_results.pop(identifier))
+                except ResponseError:  # task is cancelled or expired
+                    results[identifier] = None
+            else:
+                waiting.append(identifier)
+
+        while waiting:
+            statuses = {i: response(future) for i, future in self.status(waiting).items()}
+            finished = [i for i, status in statuses.items() if status in final_statuses]
+            for identifier, future in self.result(finished).items():
+                results[identifier] = response(future)
+            waiting = [i for i in waiting if i not in statuses or statuses[i] not in final_statuses]
+            if waiting:
+                if end_time is not None and time.monotonic() + self.poll_interval > end_time:
+                    raise TimeoutError(f'Timeout to wait for tasks {waiting}')
+                time.sleep(self.poll_interval)
+        return results
+
+
+class AsyncTaskClient:
+    """
+    Asyncio client library. Methods are coroutines, which are resolved by the IO thread of connection
+    """
+    def __init__(self,
+                 address: Union[Tuple[str, int], str],
+                 poll_interval: float = 0.1,
+                 connections: int = 1,
+                 max_in_flight: int = 128):
+        """
+        :param address: server address tuple([ip: str, port: int]) or address with scheme
+        :param poll_interval: interval of status requests in wait(), s
+        :param connections: count of connections in pool
+        :param max_in_flight: maximum count of sent requests without response per connection
+        """
+        self.client: TaskClient = TaskClient(address, poll_interval, connections, max_in_flight)
+
+    async def open(self) -> AsyncTaskClient:
+        """connect to server"""
+        await asyncio.get_running_loop().run_in_executor(None, self.client.open)
+        return self
+
+    async def close(self):
+        """close connection"""
+        await asyncio.get_running_loop().run_in_executor(None, self.client.close)
+
+    async def __aenter__(self) -> AsyncTaskClient:
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def submit(self, task_type: Union[str, Iterable[str]], data: str, deadline: float = None,
+                     push_result: bool = False) -> int:
+        """create task on server, see TaskClient.submit"""
+        return await asyncio.wrap_future(self.client.submit(task_type, data, deadline, push_result))
+
+    async def status(self, identifiers: Iterable[int]) -> Dict[int, str]:
+        """status of tasks Dict[identifier: status]"""
+        return await self.gather(self.client.status(identifiers))
+
+    async def result(self, identifiers: Iterable[int]) -> Dict[int, Union[str, None]]:
+        """result of tasks Dict[identifier: result]"""
+        return await self.gather(self.client.result(identifiers))
+
+    async def cancel(self, identifiers: Iterable[int]) -> List[list]:
+        """cancel tasks, see TaskClient.cancel"""
+        return await asyncio.wrap_future(self.client.cancel(identifiers))
+
+    async def identifiers(self) -> str:
+        """identifiers of all tasks on server"""
+        return await asyncio.wrap_future(self.client.identifiers())
+
+    async def wait(self, identifiers: Iterable[int], timeout: float = None) -> Dict[int, Union[str, None]]:
+        """
+        wait until tasks have final status and get their results
+        :param identifiers: task identifiers
+        :param timeout: maximum time to wait, s. None - infinite
+        :return: Dict[identifier: result], result is None if task is cancelled or expired
+        """
+        end_time = time.monotonic() + timeout if timeout is not None else None  # one deadline for all tasks
+        results = dict()
+        waiting = list()
+        for identifier in identifiers:
+            if identifier in self.client.pushed_results:  # server sends result itself
+                try:
+                    results[identifier] = await asyncio.wait_for(
+                        asyncio.wrap_future(self.client.pushed_results.pop(identifier)),
+                        None if end_time is None else max(end_time - time.monotonic(), 0))
+                except ResponseError:  # task is cancelled or expired
+                    results[identifier] = None
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f'Timeout to wait for task {identifier}')
+            else:
+                waiting.append(identifier)
+
+        while waiting:
+            statuses = await self.status(waiting)
+            finished = [i for i, status in statuses.items() if status in final_statuses]
+            results.update(await self.result(finished))
+            waiting = [i for i in waiting if statuses[i] not in final_statuses]
+            if waiting:
+                if end_time is not None and time.monotonic() + self.client.poll_interval > end_time:
+                    raise TimeoutError(f'Timeout to wait for tasks {waiting}')
+                await asyncio.sleep(self.client.poll_interval)
+        return results
+
+    @staticmethod
+    async def gather(futures: Dict[int, Future]) -> dict:
+        """wait for dictionary of futures"""
+        values = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures.values()))
+        return dict(zip(futures.keys(), values))
@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import json
+import random
+import select
+import socket
+import string
+import time
+from threading import Lock, Thread
+from typing import Dict, List, Tuple, Union
+
+from Client.ClientLibrary import BatchProcessingModeStub
+from src.ClientRequests import BaseRequest, commands, create_request
+from src.MessageHandlers import ClientMessageHandler
+
+
+# user inputs of the commands of load mix. {data} is replaced by random data, {identifier} by known task identifier
+command_templates: dict = {'reverse': 'task --reverse {data}',
+                           'reverse_b': 'task --reverse -b {data}',
+                           'pair_permutation': 'task --pair_permutation {data}',
+                           'pair_permutation_b': 'task --pair_permutation -b {data}',
+                           'symbol_repeat': 'task --symbol_repeat {data}',
+                           'symbol_repeat_b': 'task --symbol_repeat -b {data}',
+                           'status': 'status {identifier}',
+                           'result': 'result {identifier}',
+                           'identifiers': 'identifiers'}
+
+default_mix: str = 'reverse=3,pair_permutation=1,symbol_repeat=1,reverse_b=1,status=3,result=3,identifiers=1'
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """
+    parse load mix
+    :param mix: string like "reverse=3,status=2,result_b=1"
+    :return: Dict[command label: weight]
+    """
+    weights = dict()
+    for item in mix.split(','):
+        label, _, weight = item.strip().partition('=')
+        if label not in command_templates:
+            raise ValueError(f'ValueError. Unknown command "{label}" in load mix. '
+                             f'Available commands: {", ".join(command_templates)}')
+        weights[label] = float(weight) if weight else 1.0
+    return weights
+
+
+class Operation:
+    """
+    one operation of load generator: request and its final response.
+    Operation with task in batch processing mode is finished, when the result of the task is received
+    """
+    def __init__(self, label: str, start_time: float):
+        """
+        :param label: command label from command_templates
+        :param start_time: time.perf_counter(), when the operation should start
+        """
+        self.label: str = label
+        self.start_time: float = start_time
+
+
+class LoadConnection(ClientMessageHandler):
+    """
+    Connection of load generator with own thread and event loop.
+    It sends requests according to the load mix and measures the latency of every operation
+    """
+    def __init__(self, generator: LoadGenerator, address: Tuple[str, int], rate: Union[float, None]):
+        """
+        :param generator: parent load generator
+        :param address: tuple([ip: str, port: int])
+        :param rate: requests per second of the connection (open loop), None - closed loop
+        """
+        super(LoadConnection, self).__init__(socket.socket(socket.AF_INET, socket.SOCK_STREAM), address)
+        self.generator: LoadGenerator = generator  # parent load generator
+        self.rate: Union[float, None] = rate  # requests per second, None - closed loop
+        self.request_num: int = 0  # counter of requests (is used by request parsers)
+        self.batch_processing_mode = BatchProcessingModeStub()  # is used by request parsers
+        self.pending: Dict[int: Operation, ...] = dict()  # operations waiting for response Dict[identifier: operation]
+        self.identifiers: List[int] = list()  # identifiers of created tasks
+        self.thread: Thread = Thread(target=self.run, daemon=True)
+
+    def create_request(self, label: str) -> BaseRequest:
+        """create request of the command from load mix"""
+        identifier = random.choice(self.identifiers) if self.identifiers else 1
+        user_input = command_templates[label].format(data=self.generator.random_data(), identifier=identifier)
+        return create_request(user_input, self)
+
+    def send_operation(self, start_time: float):
+        """
+        send request of new operation
+        :param start_time: intended start time of operation
+        """
+        label = self.generator.choose_command()
+        request = self.create_request(label)
+        operation = Operation(label, start_time)
+        self.send_msg(request.dumps())
+        self.pending[request.request_identifier_on_client] = operation
+        if request.command == 'task' and request.is_batch_processing_mode:  # wait for result of task too
+            self.pending[request.request_identifier_on_result] = operation
+
+    def handle_response(self, bytes_data: bytes):
+        """
+        finish operation according to response
+        :param bytes_data: received message
+        """
+        decoded_data: list = BaseRequest.loads(bytes_data)
+        response: BaseRequest = commands[decoded_data[1]](self, *decoded_data)
+        operation: Operation = self.pending.pop(response.request_identifier_on_client, None)
+        if operation is None:
+            return
+        if response.command == 'task':
+            if response.result is not None:
+                self.identifiers.append(response.result)
+            if response.is_batch_processing_mode and response.error is None:  # operation waits for result
+                return
+            self.pending.pop(response.request_identifier_on_result, None)
+        self.generator.record(operation.label, time.perf_counter() - operation.start_time, response.error)
+
+    def run(self):
+        """event loop of connection"""
+        try:
+            self.connect(n_max=10)
+            if not self.is_connected:
+                raise ConnectionError(f"Can't connect to {self.address}")
+        except OSError as ex:
+            self.generator.record_connection_error(ex)
+            return
+
+        end_time: float = self.generator.end_time
+        next_send: float = time.perf_counter()
+        try:
+            while True:
+                now = time.perf_counter()
+                if now >= end_time and (not self.pending or now >= end_time + self.generator.timeout):
+                    break
+                if self.rate is None:  # closed loop: next operation starts after the previous one is finished
+                    can_send = now < end_time and not self.pending
+                    next_send = now
+                else:  # open loop: operations start according to schedule
+                    can_send = now < end_time and now >= next_send
+                timeout = self.loop_timeout
+                if self.rate is not None and now < end_time:  # wake up at the time of next operation
+                    timeout = max(0, min(next_send - now, self.loop_timeout))
+
+                ready_to_read, ready_to_write, in_error = select.select(
+                    [self.client_socket], [self.client_socket] if can_send else [], [], timeout)
+
+                if ready_to_read or self.has_buffered_msg():
+                    self.handle_response(self.read_msg())
+                if ready_to_write:
+                    self.send_operation(next_send)
+                    if self.rate is not None:  # poisson arrivals
+                        next_send += random.expovariate(self.rate)
+        except (OSError, ValueError) as ex:
+            self.generator.record_connection_error(ex)
+        finally:
+            for operation in set(self.pending.values()):  # operations without response
+                self.generator.record(operation.label, None, 'timeout')
+            self.client_socket.close()
+
+
+class LoadGenerator:
+    """
+    Headless load generator: N concurrent connections drive the load mix in open loop (target rate) or closed loop
+    """
+    def __init__(self,
+                 address: Tuple[str, int],
+                 connections: int = 10,
+                 duration: float = 10.0,
+                 rate: float = None,
+                 mix: str = default_mix,
+                 data_size: int = 16,
+                 timeout: float = 10.0):
+        """
+        :param address: server address tuple([ip: str, port: int])
+        :param connections: count of concurrent connections
+        :param duration: duration of load, s
+        :param rate: total requests per second (open loop), None - closed loop
+        :param mix: load mix, see parse_mix
+        :param data_size: length of task data
+        :param timeout: time to wait for responses after the end of load, s
+        """
+        self.address: Tuple[str, int] = address
+        self.connections: int = connections
+        self.duration: float = duration
+        self.rate: float = rate
+        self.weights: Dict[str, float] = parse_mix(mix)
+        self.data_size: int = data_size
+        self.timeout: float = timeout
+        self.end_time: float = None
+        self.latencies: Dict[str: List[float], ...] = {label: list() for label in self.weights}
+        self.errors: Dict[str: int, ...] = {label: 0 for label in self.weights}
+        self.errors_lock: Lock = Lock()  # counters of errors are changed by the connection threads
+        self.connection_errors: List[str] = list()
+
+    def random_data(self) -> str:
+        """random data for task"""
+        return ''.join(random.choices(string.ascii_letters, k=self.data_size))
+
+    def choose_command(self) -> str:
+        """choose command label according to the weights of load mix"""
+        return random.choices(list(self.weights.keys()), list(self.weights.values()))[0]
+
+    def record(self, label: str, latency: Union[float, None], error: Union[str, None]):
+        """
+        record finished operation. list.append is atomic, increment of error counter is guarded by lock
+        :param label: command label
+        :param latency: latency of operation, s. None - operation is not finished
+        :param error: error of response
+        """
+        if error is not None:
+            with self.errors_lock:
+                self.errors[label] += 1
+        elif latency is not None:
+            self.latencies[label].append(latency)
+
+    def record_connection_error(self, ex: Exception):
+        """record error of connection"""
+        self.connection_errors.append(str(ex))
+
+    def run(self) -> dict:
+        """
+        run load and wait for all connections finished
+        :return: report
+        """
+        rate = self.rate / self.connections if self.rate is not None else None
+        load_connections = [LoadConnection(self, self.address, rate) for _ in range(self.connections)]
+        start_time = time.perf_counter()
+        self.end_time = start_time + self.duration
+        for load_connection in load_connections:
+            load_connection.thread.start()
+        for load_connection in load_connections:
+            load_connection.thread.join()
+        return self.report(time.perf_counter() - start_time)
+
+    @staticmethod
+    def percentile(values: List[float], q: float) -> Union[float, None]:
+        """percentile of sorted values"""
+        if not values:
+            return None
+        return values[min(int(q * len(values)), len(values) - 1)]
+
+    def report(self, elapsed: float) -> dict:
+        """
+        report of load
+        :param elapsed: duration of load including waiting for last responses, s
+        """
+        report = {'mode': 'closed loop' if self.rate is None else f'open loop, {self.rate} requests/s',
+                  'connections': self.connections,
+                  'elapsed': elapsed,
+                  'connection_errors': len(self.connection_errors),
+                  'commands': dict()}
+        total = 0
+        for label, latencies in self.latencies.items():
+            latencies = sorted(latencies)
+            total += len(latencies)
+            report['commands'][label] = {'count': len(latencies),
+                                         'errors': self.errors[label],
+                                         'throughput': len(latencies) / self.duration,
+                                         'p50': self.percentile(latencies, 0.5),
+                                         'p99': self.percentile(latencies, 0.99),
+                                         'p999': self.percentile(latencies, 0.999)}
+        report['throughput'] = total / self.duration
+        return report
+
+
+def format_report(report: dict) -> str:
+    """human readable report"""
+    def ms(value: Union[float, None]) -> str:
+        return '-' if value is None else f'{value * 1000:.2f}'
+
+    lines = [f'{report["mode"]}, {report["connections"]} connections, elapsed {report["elapsed"]:.2f} s, '
+             f'throughput {report["throughput"]:.1f} operations/s, connection errors {report["connection_errors"]}',
+             f'{"command":<20}{"count":>8}{"errors":>8}{"ops/s":>10}{"p50, ms":>12}{"p99, ms":>12}{"p999, ms":>12}']
+    for label, item in report['commands'].items():
+        lines.append(f'{label:<20}{item["count"]:>8}{item["errors"]:>8}{item["throughput"]:>10.1f}'
+                     f'{ms(item["p50"]):>12}{ms(item["p99"]):>12}{ms(item["p999"]):>12}')
+    return '\n'.join(lines)
+
+
+def dump_report(report: dict, path: str):
+    """write report as JSON"""
+    with open(path, 'w') as file:
+        json.dump(report, file, indent=2)
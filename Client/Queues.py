@@ -1,31 +1,199 @@
 from __future__ import annotations
 
+import heapq
+import os
 import platform
+import random
+import re
+import shutil
 import time
-from collections import deque
-from json import dumps
+from collections import deque, OrderedDict
+from json import dumps, loads
 from subprocess import Popen, DEVNULL
 import sys
-from threading import Thread
-from typing import Dict, TYPE_CHECKING, Union, Deque
+from threading import Thread, Lock, Condition
+from typing import Dict, List, TYPE_CHECKING, Union, Deque, Set, Tuple
 
-from src.ClientRequests import StatusRequest, ResultRequest, Task, InfoRequest, create_request
-from src.Exceptions import BatchProcessingModeCommandError
+from src.ClientRequests import BaseRequest, StatusRequest, ResultRequest, Task, InfoRequest, CancelRequest, \
+    create_request
+from src.Exceptions import BatchProcessingModeCommandError, IdentifierNotFound, RequestTimeout, UploadAborted, \
+    WaitTableOverflow
+from src.MessageHandlers import ClientMessageHandler
+from src.Metrics import metrics
+from src.Tracing import tracer, hop
+from src.Transport import ReadinessListener, format_address
 
 if TYPE_CHECKING:
     from Client.ClientEventLoops import ClientEventLoop
 
 
+# script of result window, it is found next to the client scripts, not in the current directory
+result_window_script: str = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ResultWindow.py')
+cache_hits = metrics.counter('result_cache_hits_total', 'Status and result requests answered by client cache', 'command')
+cache_misses = metrics.counter('result_cache_misses_total', 'Status and result requests sent to server', 'command')
+cache_invalidations = metrics.counter('result_cache_invalidations_total', 'Identifiers removed from client cache')
+request_timeouts = metrics.counter('client_request_timeouts_total', 'Requests without response in time', 'command')
+request_retries = metrics.counter('client_request_retries_total', 'Requests sent again after timeout', 'command')
+wait_table_overflows = metrics.counter('client_wait_table_overflows_total', 'Requests rejected by full wait table')
+relay_frames = metrics.counter('relay_frames_total', 'Frames sent to result window')
+relay_lines = metrics.counter('relay_lines_total', 'Lines sent to result window')
+relay_bytes = metrics.counter('relay_bytes_total', 'Bytes sent to result window')
+relay_batch_size = metrics.histogram('relay_batch_lines', 'Lines in one frame sent to result window',
+                                     buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512))
+relay_backpressure = metrics.counter('relay_backpressure_total',
+                                     'Times the reading of responses was paused, because result window falls behind')
+
+
+class DisplayQueue:
+    """
+    Queue of lines to show in result window. Items are [text, control] or [text, control, trace].
+    Producers call appendleft, the relay thread blocks in pop_batch until there are items.
+    The queue is soft bounded: when it contains more than high_watermark items, is_full returns True
+    and client stops reading responses from server until the queue is drained below low_watermark
+    """
+    def __init__(self, high_watermark: int = 10000, low_watermark: int = 1000):
+        """
+        :param high_watermark: count of items, from which the queue is full
+        :param low_watermark: count of items, below which the full queue becomes not full
+        """
+        self.items: Deque = deque()  # items, new items are on the left
+        self.condition: Condition = Condition()  # wakes up the relay thread
+        self.high_watermark: int = high_watermark
+        self.low_watermark: int = low_watermark
+        self.full: bool = False  # is the queue full (with hysteresis)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def appendleft(self, item: list):
+        """put item in queue"""
+        with self.condition:
+            self.items.appendleft(item)
+            self.condition.notify()
+
+    def clear(self):
+        """remove all items"""
+        with self.condition:
+            self.items.clear()
+
+    def wakeup(self):
+        """wake up the waiting relay thread (for example, to stop it)"""
+        with self.condition:
+            self.condition.notify_all()
+
+    def is_full(self) -> bool:
+        """is the queue full, the check is called by event loop before reading of responses"""
+        if self.full:
+            self.full = len(self.items) > self.low_watermark
+        elif len(self.items) > self.high_watermark:
+            self.full = True
+            relay_backpressure.inc()
+        return self.full
+
+    def pop_batch(self, max_bytes: int, max_delay: float, is_active: callable) -> Tuple[list, list]:
+        """
+        wait for items and pop them as one frame.
+        After the first item, the frame is waiting for next items not longer than max_delay
+        :param max_bytes: maximum size of text in frame (one item is popped anyway)
+        :param max_delay: maximum time of waiting for next items, s
+        :param is_active: function, which returns False, when the relay must stop
+        :return: list of [text, control] pairs and list of traces of items
+        """
+        lines, traces = list(), list()
+        size = 0
+        deadline = None
+        with self.condition:
+            while is_active():
+                while self.items and (not lines or size + len(self.items[-1][0]) <= max_bytes):
+                    item = self.items.pop()
+                    lines.append(item[:2])
+                    size += len(item[0])
+                    if len(item) > 2 and item[2] is not None:
+                        traces.append(item[2])
+                    if item[1]:  # control item is the last item of frame
+                        return lines, traces
+                if self.items or size >= max_bytes:  # size budget is over
+                    break
+                if lines:  # wait for next items, while latency budget is not over
+                    if deadline is None:
+                        deadline = time.monotonic() + max_delay
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    self.condition.wait(timeout)
+                else:  # wait for first item
+                    self.condition.wait()
+        return lines, traces
+
+
+class ResultRelay:
+    """
+    Relay of lines from display queue to result window. Several lines are sent as one frame:
+    JSON list of [text, control] pairs
+    """
+    def __init__(self,
+                 data_to_show: DisplayQueue,
+                 sender: ClientMessageHandler,
+                 max_bytes: int = 64 * 1024,
+                 max_delay: float = 0.005):
+        """
+        :param data_to_show: queue of lines to show
+        :param sender: message sender to the result window
+        :param max_bytes: size budget of frame, bytes of text
+        :param max_delay: latency budget of frame, s
+        """
+        self.data_to_show: DisplayQueue = data_to_show
+        self.sender: ClientMessageHandler = sender
+        self.max_bytes: int = max_bytes
+        self.max_delay: float = max_delay
+        self.is_active: bool = True  # flag: is relay active
+
+    def stop(self):
+        """stop relay thread"""
+        self.is_active = False
+        self.data_to_show.wakeup()
+
+    def run(self):
+        """
+        send lines to the result window, until the relay is stopped
+        """
+        while self.is_active:
+            lines, traces = self.data_to_show.pop_batch(self.max_bytes, self.max_delay, lambda: self.is_active)
+            if not lines:
+                continue
+            frame: bytes = BaseRequest.dump(lines)  # escape end message part inside texts and add it
+            try:
+                self.sender.send_msg(frame)  # send frame, blocks while result window doesn't read
+                relay_frames.inc()
+                relay_lines.inc(len(lines))
+                relay_bytes.inc(len(frame))
+                relay_batch_size.observe(len(lines))
+                for trace in traces:  # finish traces of responses
+                    hop(trace, 'relay_sent')
+                    tracer.finish(trace)
+            except TimeoutError:  # ignore TimeoutError
+                pass
+            except Exception as ex:  # catch exception and show to user
+                print(ex)
+                return
+
+
 class InputOutput:
     """
-    Class contains three threads to control input and output
+    Class contains three threads to control input and output.
+    Result window is started in constructor, so it starts at the same time as client connects to server.
+    Then start() waits for readiness notification of result window, connects to it and starts threads
     """
+    ready_timeout: float = 10.0  # maximum time of waiting for readiness notification of result window, s
+
     def __init__(self, event_handler: ClientEventLoop):
         """
         :param event_handler: client event loop
         """
         self.event_handler: ClientEventLoop = event_handler  # parent event loop
-        self.data_to_show: deque = self.event_handler.queue.data_to_show  # queue with data to send to result window
+        self.data_to_show: DisplayQueue = self.event_handler.queue.data_to_show  # queue with data to send to result window
+        # relay of data to result window
+        self.relay: ResultRelay = ResultRelay(self.data_to_show, self.event_handler.result_window_sender)
         # function that creates request from user input
         self.create_request: callable = self.event_handler.queue.create_request
 
@@ -33,28 +201,60 @@ class InputOutput:
         # thread, which get user input and create requests
         self.input_thread: Thread = Thread(target=self.threading_input, daemon=True)
         # thread, which get send results to result window
-        self.send_thread: Thread = Thread(target=self.send_results, daemon=False)
+        self.send_thread: Thread = Thread(target=self.relay.run, daemon=False)
         # thread, which control subprocess with result window
         self.result_window: Thread = Thread(target=self.start_subprocess, daemon=False)
         self.result_window_subprocess: Popen = None  # Popen Constructor
+        self.readiness: ReadinessListener = None  # listener of readiness notification of result window
 
         if self.event_handler.is_start_result_window:  # is result window needed, run subprocess in separate thread
+            self.readiness = ReadinessListener()
             self.result_window.start()
-            time.sleep(0.5)
-        self.event_handler.result_window_sender.connect()  # connect to the result window
+
+    def wait_result_window(self) -> bool:
+        """
+        wait for readiness notification of result window
+        :return: is result window ready
+        """
+        deadline = time.monotonic() + self.ready_timeout
+        try:
+            while time.monotonic() < deadline:
+                if self.readiness.wait(0.05):
+                    return True
+                if not self.result_window.is_alive() and (self.result_window_subprocess is None or
+                                                          self.result_window_subprocess.poll() is not None):
+                    return False  # result window is not started or closed
+            return False
+        finally:
+            self.readiness.close()
+
+    def start(self):
+        """
+        connect to the result window and start threads
+        """
+        n_max = 10  # tries to connect to result window, which is started manually or without notification
+        if self.readiness is not None and self.wait_result_window():
+            self.event_handler.mark_startup('result_window_ready')
+            n_max = 3  # result window is listening
+        self.event_handler.result_window_sender.connect(n_max=n_max)  # connect to the result window
+        self.event_handler.mark_startup('result_window_connected')
         self.input_thread.start()  # start thread
         self.send_thread.start()  # start thread
+        self.event_handler.mark_startup('input_ready')
 
 
     def start_subprocess(self):
         """
         Creating the subprocess with result window
         """
+        address = format_address(self.event_handler.result_window_sender)  # address of result window
+        arguments = ['--address', address, '--notify', self.readiness.address]
         if platform.system() == 'Windows':
-            self.result_window_subprocess = Popen(['start', '/wait', sys.executable, 'ResultWindow.py'],
+            self.result_window_subprocess = Popen(['start', '/wait', sys.executable, result_window_script] + arguments,
                                                   shell=True, stderr=DEVNULL, stdout=DEVNULL)
         if platform.system() == 'Linux':
-            self.result_window_subprocess = Popen(['gnome-terminal', '--wait', '--', sys.executable, 'sub.py'],
+            self.result_window_subprocess = Popen(['gnome-terminal', '--wait', '--', sys.executable,
+                                                   result_window_script] + arguments,
                                                   shell=False, stdout=DEVNULL, stderr=DEVNULL)
 
 
@@ -68,21 +268,12 @@ class InputOutput:
                 self.event_handler.queue.create_request(user_input)  # create request
 
 
-    def send_results(self):
+    def stop(self):
         """
-        send result to the result window
+        deactivate threads
         """
-        while self.threads_is_active:
-            if len(self.data_to_show) > 0:
-                data_to_send: list = self.data_to_show.pop()  # pop data from data_to_show queue
-                data_to_send: str = dumps(data_to_send) + 'endofmsg'  # add end message part
-                try:
-                    self.event_handler.result_window_sender.send_msg(data_to_send.encode('utf-8'))  # send message
-                except TimeoutError:  # ignore TimeoutError
-                    pass
-                except Exception as ex:  # catch exception and show to user
-                    print(ex)
-                    return
+        self.threads_is_active = False
+        self.relay.stop()
 
 
 class BatchProcessingMode:
@@ -95,18 +286,216 @@ class BatchProcessingMode:
         self.task: Task = None  # batch processing mode task
 
 
+class ResultCache:
+    """
+    Cache of tasks with final status (done, cancelled, expired): their status and result never change.
+    Entries are kept in memory in LRU order while total size is less than max_bytes.
+    If directory is set, entries are also written to disk and the entries evicted from memory are read from disk.
+    Task identifiers are unique only within server instance, so the disk is used only after bind() and the entries
+    are kept in directory/<server address>/<server instance>
+    """
+    final_statuses: tuple = ('done', 'cancelled', 'expired',)  # statuses of tasks, which will not change
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, directory: str = None):
+        """
+        :param max_bytes: maximum size of results in memory, bytes
+        :param directory: directory for disk backing, None - memory only
+        """
+        self.max_bytes: int = max_bytes  # maximum size of results in memory
+        self.directory: str = directory  # directory for disk backing
+        self.instance: Union[str, None] = None  # identifier of server instance, whose tasks are cached
+        self.instance_directory: Union[str, None] = None  # directory of entries of server instance, None - no disk
+        self.entries: OrderedDict = OrderedDict()  # LRU of entries Dict[identifier: (status, result)]
+        self.size: int = 0  # size of results in memory
+        self.lock: Lock = Lock()  # input thread reads cache, main thread updates it
+        self.hits: int = 0  # count of requests answered by cache
+        self.misses: int = 0  # count of requests not answered by cache
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def entry_size(result: Union[str, None]) -> int:
+        """memory size of cached result"""
+        return sys.getsizeof(result) if result is not None else 0
+
+    def bind(self, server: str, instance: str):
+        """
+        set server instance, whose tasks are cached. Entries of other instance are dropped from memory,
+        and the disk entries of previous instances of the server are removed: their identifiers are reused
+        :param server: address of server, for example tcp://127.0.0.1:12345
+        :param instance: identifier of server instance from "instance" response
+        """
+        if not isinstance(instance, str) or not re.fullmatch(r'\w{1,64}', instance):  # it is part of path
+            raise ValueError(f'ValueError. Wrong identifier of server instance: {instance!r}')
+        with self.lock:
+            if self.instance is not None and self.instance != instance:  # server is restarted
+                self.entries.clear()
+                self.size = 0
+            self.instance = instance
+            if self.directory is None:
+                return
+            server_directory = os.path.join(self.directory, re.sub(r'[^\w.-]', '_', server))
+            os.makedirs(server_directory, exist_ok=True)
+            for name in os.listdir(server_directory):
+                if name != instance:
+                    shutil.rmtree(os.path.join(server_directory, name), ignore_errors=True)
+            self.instance_directory = os.path.join(server_directory, instance)
+            os.makedirs(self.instance_directory, exist_ok=True)
+
+    def path(self, identifier: int) -> str:
+        """file of entry on disk"""
+        return os.path.join(self.instance_directory, f'{identifier}.json')
+
+    def put(self, identifier: int, status: str, result: Union[str, None] = None):
+        """
+        add task with final status to cache
+        :param identifier: task identifier
+        :param status: final status of task
+        :param result: result of task, None if result is not known or task is not done
+        """
+        if status not in self.final_statuses:
+            return
+        with self.lock:
+            previous = self.entries.pop(identifier, None)
+            if previous is not None:
+                self.size -= self.entry_size(previous[1])
+                if result is None:  # keep known result
+                    result = previous[1]
+            self.entries[identifier] = (status, result)
+            self.size += self.entry_size(result)
+            while self.size > self.max_bytes and len(self.entries) > 1:  # evict least recently used entries
+                evicted_identifier, (evicted_status, evicted_result) = self.entries.popitem(last=False)
+                self.size -= self.entry_size(evicted_result)
+        if self.instance_directory is not None:  # write through to disk
+            with open(self.path(identifier), 'w') as file:
+                file.write(dumps([status, result]))
+
+    def get(self, identifier: int) -> Union[Tuple[str, Union[str, None]], None]:
+        """
+        get cached entry
+        :param identifier: task identifier
+        :return: (status, result) or None if the task is not in cache
+        """
+        with self.lock:
+            entry = self.entries.get(identifier)
+            if entry is not None:
+                self.entries.move_to_end(identifier)
+                return entry
+        if self.instance_directory is not None and os.path.exists(self.path(identifier)):  # read entry from disk
+            with open(self.path(identifier)) as file:
+                status, result = loads(file.read())
+            self.put(identifier, status, result)
+            return status, result
+        return None
+
+    def invalidate(self, identifier: int):
+        """
+        remove task from cache, when server doesn't know the identifier (for example, after server restart)
+        :param identifier: task identifier
+        """
+        with self.lock:
+            entry = self.entries.pop(identifier, None)
+            if entry is not None:
+                self.size -= self.entry_size(entry[1])
+        if self.instance_directory is not None and os.path.exists(self.path(identifier)):
+            os.remove(self.path(identifier))
+        cache_invalidations.inc()
+
+    def answer(self, request: Union[StatusRequest, ResultRequest]) -> bool:
+        """
+        answer status or result request from cache
+        :param request: request
+        :return: True if request is answered, False if request must be sent to server
+        """
+        entry = self.get(request.identifier)
+        # result of done task is answered, only if it is cached
+        if entry is None or (request.command == 'result' and entry[0] == 'done' and entry[1] is None):
+            self.misses += 1
+            cache_misses.inc(label=request.command)
+            return False
+        request.error = None
+        request.result = entry[0] if request.command == 'status' else entry[1]
+        self.hits += 1
+        cache_hits.inc(label=request.command)
+        return True
+
+    def update(self, response: Union[StatusRequest, ResultRequest, CancelRequest]):
+        """
+        update cache according to response from server
+        :param response: response
+        """
+        if response.command == 'cancel' and response.error is None:
+            for identifier, status in response.result:
+                if status == 'not found':
+                    self.invalidate(identifier)
+                else:
+                    self.put(identifier, status)
+            return
+        if response.command != 'status' and response.command != 'result':
+            return
+        if response.error is not None:
+            if response.identifier is not None and response.error == str(IdentifierNotFound(response.identifier)):
+                self.invalidate(response.identifier)
+        elif response.command == 'status':
+            self.put(response.identifier, response.result)
+        elif response.result is not None:  # server returns result only for done task
+            self.put(response.identifier, 'done', response.result)
+
+    def hit_rate(self) -> float:
+        """part of requests answered by cache"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
 class Queue:
     """
-    class the queues for sending requests, waiting response and showing results
+    class the queues for sending requests, waiting response and showing results.
+    Every sent request waits for response until its deadline. Deadlines are kept in heap, the entries of answered
+    requests are not removed from heap, they are skipped when popped.
+    Idempotent requests without response are sent again after exponential backoff with jitter.
     """
-    def __init__(self, event_handler: ClientEventLoop):
+    idempotent_commands: tuple = ('status', 'result', 'identifiers', 'instance',)  # commands, which can be sent again
+    retry_backoff: float = 0.2  # base of exponential backoff, s
+    retry_backoff_cap: float = 5.0  # maximum backoff, s
+
+    def __init__(self,
+                 event_handler: ClientEventLoop,
+                 result_cache: ResultCache = None,
+                 request_timeout: float = 10.0,
+                 max_retries: int = 3,
+                 max_waiting: int = 10000,
+                 batch_timeout: float = 300.0):
         """
         :param event_handler: client event loop
+        :param result_cache: cache of final statuses and results, None - cache with default settings
+        :param request_timeout: time of waiting for response, s
+        :param max_retries: maximum count of sending again of idempotent request
+        :param max_waiting: maximum count of requests waiting for response or for sending
+        :param batch_timeout: time of waiting for result of task in batch processing mode, s
         """
         self.event_handler: ClientEventLoop = event_handler  # parent event loop
         self.data_to_send: Deque = deque()  # request to send queue
         self.wait_for_result: Dict = dict()  # request to wait dict
-        self.data_to_show: Deque = deque()  # response to show queue
+        self.data_to_show: DisplayQueue = DisplayQueue()  # response to show queue
+        self.result_cache: ResultCache = result_cache if result_cache is not None else ResultCache()
+        self.request_timeout: float = request_timeout  # time of waiting for response
+        self.max_retries: int = max_retries  # maximum count of retries
+        self.max_waiting: int = max_waiting  # maximum size of wait table
+        self.batch_timeout: float = batch_timeout  # time of waiting for result in batch processing mode
+        self.deadlines: List[Tuple[float, int, int], ...] = list()  # heap of (deadline, request identifier, attempt)
+        self.retries: List[Tuple[float, int], ...] = list()  # heap of (time to send again, request identifier)
+        self.attempts: Dict[int: int, ...] = dict()  # Dict[request identifier: count of sent attempts]
+        self.resending: Set[int] = set()  # identifiers of requests in data_to_send, which are sent again
+        self.instance_request: Union[int, None] = None  # identifier of not shown request of server instance
+
+    def request_instance(self):
+        """
+        request identifier of server instance, the result cache uses disk after the response.
+        Is called by event loop after connection
+        """
+        request: InfoRequest = create_request('instance', self.event_handler)
+        self.instance_request = request.request_identifier_on_client
+        self.handle_request(request)
 
     def create_request(self, user_input: str):
         """
@@ -132,6 +521,14 @@ class Queue:
         """
         handle request according to request parameters
         """
+        if len(self.wait_for_result) + len(self.data_to_send) >= self.max_waiting:  # wait table is full
+            wait_table_overflows.inc()
+            raise WaitTableOverflow(self.max_waiting)
+        # answer status and result of task with final status from cache
+        if request.command == 'status' or request.command == 'result':
+            if self.result_cache.answer(request):
+                self.data_to_show.appendleft([request.show_result() + ' (cached)', ''])
+                return
         if request.command == 'task':  # if request is task and
             if request.is_batch_processing_mode:  # batch processing mode in task is true
                 # set batch_processing_mode status and task
@@ -143,16 +540,126 @@ class Queue:
                 # inform user about activated batch_processing_mode
                 self.data_to_show.appendleft(['Batch processing mode activated. '
                                              'Only "status" and "result" requests available', ''])
-        # add request to the send request queue
+        # start trace if request is sampled and add request to the send request queue
+        request.trace = tracer.start(request.command)
+        hop(request.trace, 'client_queued')
         self.data_to_send.appendleft(request)
 
 
+    def register_waiting(self, request: Union[StatusRequest, ResultRequest, Task, InfoRequest]):
+        """
+        move sent request to wait table and set deadline of response. Is called by event loop after sending
+        :param request: sent request
+        """
+        now = time.monotonic()
+        identifier = request.request_identifier_on_client
+        self.wait_for_result[identifier] = request
+        self.resending.discard(identifier)
+        self.attempts[identifier] = attempt = self.attempts.get(identifier, 0) + 1
+        heapq.heappush(self.deadlines, (now + self.request_timeout, identifier, attempt))
+        if request.command == 'task' and request.is_batch_processing_mode:  # deadline of result of task
+            result_identifier = request.request_identifier_on_result
+            self.attempts[result_identifier] = 1
+            heapq.heappush(self.deadlines, (now + self.batch_timeout, result_identifier, 1))
+        if len(self.deadlines) > 2 * self.max_waiting:  # drop entries of answered requests
+            self.deadlines = [i for i in self.deadlines if self.attempts.get(i[1]) == i[2]]
+            heapq.heapify(self.deadlines)
+
+    def check_timeouts(self):
+        """
+        Is called by event loop. Expire requests without response and send again idempotent ones
+        """
+        now = time.monotonic()
+        while self.retries and self.retries[0][0] <= now:  # backoff is over, send request again
+            _, identifier = heapq.heappop(self.retries)
+            # the request stays in wait table until it is sent again, so the late response is still accepted
+            request = self.wait_for_result.get(identifier)
+            if request is not None:  # response was not received during backoff
+                request_retries.inc(label=request.command)
+                self.resending.add(identifier)
+                self.data_to_send.appendleft(request)
+
+        while self.deadlines and self.deadlines[0][0] <= now:
+            _, identifier, attempt = heapq.heappop(self.deadlines)
+            request = self.wait_for_result.get(identifier)
+            if request is None or self.attempts.get(identifier) != attempt:  # answered or sent again
+                continue
+            request_timeouts.inc(label=request.command)
+            if request.command in self.idempotent_commands and attempt <= self.max_retries and \
+                    not self.is_batch_result(request):
+                # exponential backoff with full jitter, response is still accepted during backoff
+                backoff = random.uniform(0, min(self.retry_backoff_cap, self.retry_backoff * 2 ** (attempt - 1)))
+                heapq.heappush(self.retries, (now + backoff, identifier))
+                continue
+            self.expire(request, attempt)
+
+    def is_batch_result(self, request: Union[StatusRequest, ResultRequest, Task, InfoRequest]) -> bool:
+        """is the request waiting for result of task in batch processing mode"""
+        task = self.event_handler.batch_processing_mode.task
+        return self.event_handler.batch_processing_mode.status and task is not None and \
+            request.request_identifier_on_client == task.request_identifier_on_result
+
+    def expire(self, request: Union[StatusRequest, ResultRequest, Task, InfoRequest], attempt: int):
+        """
+        remove request without response from wait table and inform user
+        :param request: expired request
+        :param attempt: count of sent attempts
+        """
+        identifier = request.request_identifier_on_client
+        del self.wait_for_result[identifier]
+        del self.attempts[identifier]
+        batch_processing_mode = self.event_handler.batch_processing_mode
+        if self.is_batch_result(request):  # result of task is requested by task itself
+            text, timeout = str(batch_processing_mode.task), self.batch_timeout
+        else:
+            text, timeout = str(request), self.request_timeout
+        self.data_to_show.appendleft([str(RequestTimeout(text, timeout, attempt)), ''])
+        # batch processing mode can't be finished without task or its result
+        if batch_processing_mode.status and batch_processing_mode.task is not None and \
+                identifier in (batch_processing_mode.task.request_identifier_on_client,
+                               batch_processing_mode.task.request_identifier_on_result):
+            self.wait_for_result.pop(batch_processing_mode.task.request_identifier_on_result, None)
+            self.attempts.pop(batch_processing_mode.task.request_identifier_on_result, None)
+            batch_processing_mode.status = False
+            batch_processing_mode.task = None
+            self.data_to_show.appendleft(['Batch processing mode deactivated. Response is not received', ''])
+
+    def abort(self, request: Task, ex: Exception):
+        """
+        drop task, whose file is not uploaded, and inform user. Is called by event loop
+        :param request: task, which is not sent
+        :param ex: error of reading or sending
+        """
+        tracer.finish(request.trace)
+        self.data_to_show.appendleft([str(UploadAborted(request.upload_path, ex)), ''])
+        batch_processing_mode = self.event_handler.batch_processing_mode
+        if batch_processing_mode.status and batch_processing_mode.task is request:  # result will not be sent
+            self.wait_for_result.pop(request.request_identifier_on_result, None)
+            batch_processing_mode.status = False
+            batch_processing_mode.task = None
+            self.data_to_show.appendleft(['Batch processing mode deactivated. Task is not sent', ''])
+
     def handle_response(self, response: Union[StatusRequest, ResultRequest, Task, InfoRequest]):
         """
         handle response from server
         """
         if response.request_identifier_on_client in self.wait_for_result.keys():  # if the response is expected
-            del self.wait_for_result[response.request_identifier_on_client]   # remove request from waiting dict
+            request = self.wait_for_result.pop(response.request_identifier_on_client)  # remove request from wait table
+            if response.request_identifier_on_client in self.resending:  # late response, the request is not sent again
+                self.resending.discard(response.request_identifier_on_client)
+                if request in self.data_to_send:  # it could be dropped by timeout of sending
+                    self.data_to_send.remove(request)
+            self.attempts.pop(response.request_identifier_on_client, None)  # deadline entry becomes stale
+            self.result_cache.update(response)  # cache final status and result
+
+            if response.request_identifier_on_client == self.instance_request:  # server instance for result cache
+                self.instance_request = None
+                if response.error is None:
+                    try:
+                        self.result_cache.bind(format_address(self.event_handler), response.result)
+                    except (OSError, ValueError) as ex:  # cache stays in memory
+                        self.data_to_show.appendleft([f'Disk cache is not used: {ex}', ''])
+                return
 
             # updating task if batch processing mode is active and response contain identifier
             if self.event_handler.batch_processing_mode.status and \
@@ -161,7 +668,7 @@ class Queue:
                 self.event_handler.batch_processing_mode.task = response
 
             # add response to the showing queue
-            self.data_to_show.appendleft([response.show_result(), ''])
+            self.data_to_show.appendleft([response.show_result(), '', response.trace])
 
             # deactivate batch processing mode if batch processing mode is active and
             # response contain result of task solving
@@ -171,3 +678,5 @@ class Queue:
                 self.event_handler.batch_processing_mode.status = False
                 self.event_handler.batch_processing_mode.task = None
                 self.data_to_show.appendleft(['Batch processing mode deactivated. Response with result received ', ''])
+        elif response.request_identifier_on_client == 0 and response.error is not None:  # notice of server
+            self.data_to_show.appendleft([response.show_result(), ''])
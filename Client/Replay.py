@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import json
+import select
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Set, Tuple, Union
+
+from src.Capture import CLOSE, OPEN, REQUEST, RESPONSE, read_log
+from src.ClientRequests import BaseRequest
+from src.MessageHandlers import ClientMessageHandler
+from src.Transport import create_socket, parse_address
+
+
+class ReplayConnection(ClientMessageHandler):
+    """
+    Connection of replay, it repeats one captured connection of client
+    """
+    def __init__(self, address: str, connection: int):
+        """
+        :param address: server address with scheme
+        :param connection: connection id in capture log
+        """
+        scheme, socket_address = parse_address(address)
+        super(ReplayConnection, self).__init__(create_socket(scheme), socket_address)
+        self.connection: int = connection  # connection id in capture log
+        self.msg_len = 65536  # responses with results can be large
+        self.pending: Dict[int: Tuple[str, float], ...] = dict()  # Dict[request identifier: (command, send time)]
+        self.is_closing: bool = False  # captured connection is closed, it is closed after the last response
+
+
+class Replayer:
+    """
+    Replay of captured traffic (StartServer.py --capture-file) against the server.
+    The connections are opened, the requests are sent and the connections are closed at the captured time
+    divided by speed (speed 0 - as fast as possible, the order of requests of every connection is kept).
+    Every response is compared with the captured one. Identifiers of tasks are assigned by server, so the
+    identifiers of captured responses are mapped to the replayed ones and the requests with identifiers
+    (status, result, cancel) are rewritten. Traces are ignored and the responses of volatile_commands,
+    which depend on timing and state of server, are not compared
+    """
+    volatile_commands: tuple = ('stats', 'identifiers', 'status', 'instance',)  # responses which are not compared
+
+    def __init__(self,
+                 path: str,
+                 address: str,
+                 speed: float = 1.0,
+                 max_in_flight: int = 1024,
+                 timeout: float = 30.0,
+                 max_examples: int = 10):
+        """
+        :param path: path of capture log
+        :param address: server address with scheme
+        :param speed: speed of replay relative to capture, 0 - as fast as possible
+        :param max_in_flight: maximum count of requests without response in all connections
+        :param timeout: maximum time of waiting for responses after the last request, s
+        :param max_examples: count of mismatched responses shown in report
+        """
+        self.path: str = path
+        self.address: str = address
+        self.speed: float = speed
+        self.max_in_flight: int = max_in_flight
+        self.timeout: float = timeout
+        self.max_examples: int = max_examples
+        self.connections: Dict[int: ReplayConnection, ...] = dict()  # Dict[captured connection id: connection]
+        self.identifiers: Dict[int: int, ...] = dict()  # Dict[captured task identifier: replayed task identifier]
+        self.unmapped: Set[int] = set()  # captured task identifiers, whose replayed identifiers are not received yet
+        # responses, which wait for the pair: Dict[(connection id, request identifier): decoded response]
+        self.expected: Dict[Tuple[int, int]: list, ...] = dict()
+        self.received: Dict[Tuple[int, int]: list, ...] = dict()
+        self.in_flight: int = 0  # count of requests without response
+        self.latencies: Dict[str: List[float], ...] = defaultdict(list)  # Dict[command: latencies of responses]
+        self.counters: Counter = Counter()  # requests, responses, matched, mismatched, unchecked, errors ...
+        self.examples: List[dict, ...] = list()  # mismatched responses
+
+    def map_identifier(self, identifier):
+        """replayed identifier of captured task identifier"""
+        return self.identifiers.get(identifier, identifier) if isinstance(identifier, int) else identifier
+
+    def rewrite(self, value: list) -> bool:
+        """
+        replace captured task identifiers in request or response by the replayed ones
+        :param value: decoded message, it is changed
+        :return: is message changed
+        """
+        command = value[1]
+        if command in ('status', 'result') and value[3] in self.identifiers:
+            value[3] = self.identifiers[value[3]]
+            return True
+        if command == 'cancel':
+            mapped = [self.map_identifier(identifier) for identifier in value[3]]
+            if value[4]:  # statuses of cancelled tasks in response
+                value[4] = [[self.map_identifier(identifier), status] for identifier, status in value[4]]
+            changed, value[3] = mapped != value[3], mapped
+            return changed or bool(value[4])
+        return False
+
+    @staticmethod
+    def normalize(value: list) -> list:
+        """message without traces"""
+        return [None if isinstance(item, dict) else item for item in value]
+
+    def open(self, connection: int):
+        """open connection of replay"""
+        replay_connection = ReplayConnection(self.address, connection)
+        try:
+            replay_connection.connect()
+        except ConnectionError:
+            self.counters['connection_errors'] += 1
+            return
+        self.connections[connection] = replay_connection
+
+    def close(self, replay_connection: ReplayConnection):
+        """close connection of replay, not received responses are missing"""
+        self.connections.pop(replay_connection.connection, None)
+        replay_connection.client_socket.close()
+        self.in_flight -= len(replay_connection.pending)
+        self.counters['missing'] += len(replay_connection.pending)
+        replay_connection.pending.clear()
+
+    def send(self, connection: int, payload: bytes):
+        """
+        send captured request
+        :param connection: captured connection id
+        :param payload: captured message
+        """
+        replay_connection = self.connections.get(connection)
+        if replay_connection is None:  # connection was not opened
+            self.counters['not_sent'] += 1
+            return
+        value = list(BaseRequest.loads(payload))
+        request_identifier, command = value[0], value[1]
+        self.wait_identifiers(value)
+        message = BaseRequest.dump(value) if self.rewrite(value) else payload + replay_connection.end_of_msg
+        send_time = time.perf_counter()
+        if command != 'upload':  # chunks of uploaded data have no response
+            replay_connection.pending[request_identifier] = (command, send_time)
+            self.in_flight += 1
+        if command == 'task' and value[4]:  # result of task in batch processing mode is sent too
+            replay_connection.pending[value[5]] = ('task_result', send_time)
+            self.in_flight += 1
+        try:
+            replay_connection.send_msg(message)
+        except (TimeoutError, ConnectionError, OSError):
+            self.counters['connection_errors'] += 1
+            self.close(replay_connection)
+            return
+        self.counters['requests'] += 1
+
+    def wait_identifiers(self, value: list):
+        """
+        wait for the responses of tasks, whose identifiers are used in request. Without replayed identifier the request
+        would refer to another task, it happens, when the requests are sent faster than in capture
+        :param value: decoded request
+        """
+        if value[1] not in ('status', 'result', 'cancel'):
+            return
+        identifiers = value[3] if isinstance(value[3], list) else [value[3]]
+        deadline = time.perf_counter() + self.timeout
+        while any(identifier in self.unmapped for identifier in identifiers) and time.perf_counter() < deadline:
+            self.poll(0.05)
+
+    def expect(self, connection: int, payload: bytes):
+        """
+        register captured response
+        :param connection: captured connection id
+        :param payload: captured message
+        """
+        value = list(BaseRequest.loads(payload))
+        if value[1] == 'task' and isinstance(value[7], int):  # replayed identifier of task will be received
+            self.unmapped.add(value[7])
+        key = (connection, value[0])
+        received = self.received.pop(key, None)
+        if received is None:
+            self.expected[key] = value
+        else:
+            self.compare(value, received)
+
+    def handle_response(self, replay_connection: ReplayConnection, bytes_data: bytes):
+        """
+        register received response
+        :param replay_connection: connection of replay
+        :param bytes_data: received message
+        """
+        value = list(BaseRequest.loads(bytes_data))
+        request_identifier = value[0]
+        pending = replay_connection.pending.pop(request_identifier, None)
+        if pending is None:  # notice of server or response of not sent request
+            self.counters['unexpected'] += 1
+            return
+        command, send_time = pending
+        self.in_flight -= 1
+        self.counters['responses'] += 1
+        self.latencies[command].append(time.perf_counter() - send_time)
+        if value[1] == 'task' and value[2] is not None:  # result of task will not be sent
+            if replay_connection.pending.pop(value[5], None) is not None:
+                self.in_flight -= 1
+        key = (replay_connection.connection, request_identifier)
+        expected = self.expected.pop(key, None)
+        if expected is None:
+            self.received[key] = value
+        else:
+            self.compare(expected, value)
+
+    def compare(self, expected: list, received: list):
+        """
+        compare captured response with the replayed one
+        :param expected: captured response
+        :param received: replayed response
+        """
+        command = received[1]
+        if command == 'task' and isinstance(expected[7], int) and isinstance(received[7], int):
+            self.identifiers[expected[7]] = received[7]  # identifier of task on server
+            self.unmapped.discard(expected[7])
+            expected[7] = received[7]
+        if command in self.volatile_commands:
+            self.counters['unchecked'] += 1
+            return
+        self.rewrite(expected)
+        if self.normalize(expected) == self.normalize(received):
+            self.counters['matched'] += 1
+            return
+        self.counters['mismatched'] += 1
+        if len(self.examples) < self.max_examples:
+            self.examples.append({'command': command,
+                                  'expected': json.dumps(self.normalize(expected))[:200],
+                                  'received': json.dumps(self.normalize(received))[:200]})
+
+    def poll(self, timeout: float):
+        """
+        handle received responses and close finished connections
+        :param timeout: maximum time of waiting for response, s
+        """
+        for replay_connection in [replay_connection for replay_connection in self.connections.values()
+                                  if replay_connection.is_closing and not replay_connection.pending]:
+            self.close(replay_connection)
+        if not self.connections:
+            time.sleep(timeout)
+            return
+        sockets = {replay_connection.client_socket: replay_connection
+                   for replay_connection in self.connections.values()}
+        ready_to_read, ready_to_write, in_error = select.select(list(sockets), [], [], timeout)
+        for client_socket in ready_to_read:
+            replay_connection = sockets[client_socket]
+            try:
+                self.handle_response(replay_connection, replay_connection.read_msg())
+                while replay_connection.has_buffered_msg():  # handle all received responses
+                    self.handle_response(replay_connection, replay_connection.read_msg())
+            except (TimeoutError, ConnectionError, OSError, ValueError):
+                self.counters['connection_errors'] += 1
+                self.close(replay_connection)
+
+    def run(self) -> dict:
+        """
+        replay capture log
+        :return: report
+        """
+        start = time.perf_counter()
+        captured_duration = 0.0
+        for timestamp, connection, kind, payload in read_log(self.path):
+            captured_duration = timestamp
+            if self.speed > 0:  # keep the pace of capture
+                due = start + timestamp / self.speed
+                while time.perf_counter() < due:
+                    self.poll(min(due - time.perf_counter(), 0.05))
+            while self.in_flight >= self.max_in_flight:  # window of requests without response is full
+                self.poll(0.05)
+            if kind == OPEN:
+                self.open(connection)
+            elif kind == REQUEST:
+                self.poll(0)  # read responses, so the server is not blocked by not read socket
+                self.send(connection, payload)
+            elif kind == RESPONSE:
+                self.expect(connection, payload)
+            elif kind == CLOSE and connection in self.connections:
+                self.connections[connection].is_closing = True
+        last_request = time.perf_counter()
+        while self.in_flight > 0 and time.perf_counter() - last_request < self.timeout:  # wait for last responses
+            self.poll(0.05)
+        for replay_connection in list(self.connections.values()):
+            self.close(replay_connection)
+        return self.report(time.perf_counter() - start, captured_duration)
+
+    def report(self, elapsed: float, captured_duration: float) -> dict:
+        """
+        report of replay
+        :param elapsed: duration of replay, s
+        :param captured_duration: duration of capture, s
+        """
+        report = {'speed': self.speed if self.speed > 0 else 'max',
+                  'elapsed': elapsed,
+                  'captured_duration': captured_duration,
+                  'counters': dict(self.counters),
+                  'not_compared': len(self.expected) + len(self.received),  # one of the pair is missing
+                  'commands': dict(),
+                  'mismatches': self.examples}
+        for command, latencies in self.latencies.items():
+            latencies = sorted(latencies)
+            report['commands'][command] = {'count': len(latencies),
+                                           'p50': percentile(latencies, 0.5),
+                                           'p99': percentile(latencies, 0.99),
+                                           'max': latencies[-1]}
+        report['throughput'] = self.counters['responses'] / elapsed if elapsed > 0 else 0.0
+        return report
+
+
+def percentile(values: List[float], q: float) -> Union[float, None]:
+    """percentile of sorted values"""
+    if not values:
+        return None
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+def format_report(report: dict) -> str:
+    """human readable report"""
+    def ms(value: Union[float, None]) -> str:
+        return '-' if value is None else f'{value * 1000:.2f}'
+
+    counters = report['counters']
+    lines = [f'speed {report["speed"]}, elapsed {report["elapsed"]:.2f} s '
+             f'(captured {report["captured_duration"]:.2f} s), throughput {report["throughput"]:.1f} responses/s',
+             f'requests {counters.get("requests", 0)} (not sent {counters.get("not_sent", 0)}), '
+             f'responses {counters.get("responses", 0)}, '
+             f'matched {counters.get("matched", 0)}, mismatched {counters.get("mismatched", 0)}, '
+             f'not compared {counters.get("unchecked", 0)} (volatile) + {report["not_compared"]} (no pair), '
+             f'missing {counters.get("missing", 0)}, unexpected {counters.get("unexpected", 0)}, '
+             f'connection errors {counters.get("connection_errors", 0)}',
+             f'{"command":<20}{"count":>8}{"p50, ms":>12}{"p99, ms":>12}{"max, ms":>12}']
+    for command, item in report['commands'].items():
+        lines.append(f'{command:<20}{item["count"]:>8}{ms(item["p50"]):>12}{ms(item["p99"]):>12}{ms(item["max"]):>12}')
+    for example in report['mismatches']:
+        lines.append(f'mismatch of {example["command"]}:\n    expected {example["expected"]}\n'
+                     f'    received {example["received"]}')
+    return '\n'.join(lines)
+
+
+def dump_report(report: dict, path: str):
+    """write report as JSON"""
+    with open(path, 'w') as file:
+        json.dump(report, file, indent=2)
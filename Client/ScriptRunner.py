@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import select
+import socket
+import time
+from typing import Dict, Iterable, Iterator, List, TextIO, Tuple, Union
+
+from Client.ClientLibrary import BatchProcessingModeStub
+from src.ClientRequests import BaseRequest, commands, create_request
+from src.MessageHandlers import ClientMessageHandler
+
+
+class ScriptRunner(ClientMessageHandler):
+    """
+    Non-interactive client: commands are read from file or pipe, requests are pipelined to the server
+    and the results are written to the output file as lines "<line number>\t<result>" in the order of responses.
+    Not more than max_in_flight requests wait for response, the requests are sent by writes of max_write bytes
+    """
+    def __init__(self,
+                 client_socket: socket.socket,
+                 address: Union[Tuple[str, int], str],
+                 script: Iterable[str],
+                 output: TextIO,
+                 max_in_flight: int = 1024,
+                 timeout: float = 30.0):
+        """
+        :param client_socket: created socket descriptor
+        :param address: server address
+        :param script: lines with commands, for example opened file
+        :param output: opened text file for results
+        :param max_in_flight: maximum count of sent requests without response
+        :param timeout: maximum time without responses, when there are requests in flight, s
+        """
+        super(ScriptRunner, self).__init__(client_socket, address)
+        self.script: Iterator[str] = iter(script)  # lines with commands
+        self.output: TextIO = output  # output file
+        self.max_in_flight: int = max_in_flight  # window of requests in flight
+        self.timeout: float = timeout  # time without responses
+        self.max_write: int = 65536  # maximum bytes sent by one write
+        self.request_num: int = 0  # counter of requests (is used by request parsers)
+        self.batch_processing_mode = BatchProcessingModeStub()  # is used by request parsers
+        self.pending: Dict[int: int, ...] = dict()  # Dict[request identifier: line number]
+        self.line_num: int = 0  # number of last read line
+        self.is_script_finished: bool = False  # are all lines read
+        self.report: Dict[str: Union[int, float], ...] = {'commands': 0, 'responses': 0, 'errors': 0,
+                                                          'parse_errors': 0}  # counters of run
+
+    def write_result(self, line_num: int, text: str):
+        """write result line"""
+        self.output.write(f'{line_num}\t{text}\n')
+
+    def send_requests(self):
+        """
+        parse next lines and send requests by one write, while the window of requests in flight is not full
+        """
+        requests: List[bytes] = list()
+        size = 0
+        while not self.is_script_finished and len(self.pending) < self.max_in_flight and size < self.max_write:
+            try:
+                user_input = next(self.script)
+            except StopIteration:
+                self.is_script_finished = True
+                break
+            self.line_num += 1
+            if not user_input.strip() or user_input.lstrip().startswith('#'):  # skip empty lines and comments
+                continue
+            self.report['commands'] += 1
+            try:
+                request = create_request(user_input.rstrip('\r\n'), self)
+            except Exception as ex:  # write error of parsing as result of the line
+                self.report['parse_errors'] += 1
+                self.write_result(self.line_num, str(ex))
+                continue
+            self.pending[request.request_identifier_on_client] = self.line_num
+            if request.command == 'task' and request.is_batch_processing_mode:  # result of task will be sent too
+                self.pending[request.request_identifier_on_result] = self.line_num
+            if getattr(request, 'upload_path', None) is not None:  # uploaded file is sent by chunks after the batch
+                if requests:
+                    self.send_msg(b''.join(requests))
+                    requests, size = list(), 0
+                for message in request.iter_dumps():
+                    self.send_msg(message)
+                    self.read_responses()  # server doesn't wait for the client while the file is uploaded
+                continue
+            requests.append(request.dumps())
+            size += len(requests[-1])
+        if requests:
+            self.send_msg(b''.join(requests))
+
+    def handle_response(self, bytes_data: bytes):
+        """
+        write result of response
+        :param bytes_data: received message
+        """
+        decoded_data: list = BaseRequest.loads(bytes_data)
+        response: BaseRequest = commands[decoded_data[1]](self, *decoded_data)
+        line_num = self.pending.pop(response.request_identifier_on_client, None)
+        if line_num is None:
+            if response.request_identifier_on_client == 0 and response.error is not None:  # notice of server
+                self.write_result(0, response.show_result())
+            return
+        if response.command == 'task' and response.error is not None:  # result of task will not be sent
+            self.pending.pop(response.request_identifier_on_result, None)
+        self.report['responses'] += 1
+        if response.error is not None:
+            self.report['errors'] += 1
+        self.write_result(line_num, response.show_result())
+
+    def read_responses(self, timeout: float = 0) -> bool:
+        """
+        handle all received responses
+        :param timeout: maximum time of waiting for response, s
+        :return: was there a response
+        """
+        ready_to_read, ready_to_write, in_error = select.select([self.client_socket], [], [], timeout)
+        if not ready_to_read and not self.has_buffered_msg():
+            return False
+        self.handle_response(self.read_msg())
+        while self.has_buffered_msg():  # handle all received responses
+            self.handle_response(self.read_msg())
+        return True
+
+    def run(self) -> Dict[str, Union[int, float]]:
+        """
+        send all commands of script and wait for all responses
+        :return: report: count of commands, responses, errors, elapsed time
+        """
+        start = time.perf_counter()
+        last_response = start
+        while not self.is_script_finished or self.pending:
+            if len(self.pending) < self.max_in_flight:
+                self.send_requests()
+            can_send = not self.is_script_finished and len(self.pending) < self.max_in_flight
+            if self.read_responses(0 if can_send else self.loop_timeout):
+                last_response = time.perf_counter()
+            elif self.pending and time.perf_counter() - last_response > self.timeout:  # server doesn't respond
+                for line_num in sorted(set(self.pending.values())):
+                    self.write_result(line_num, f'No response in {self.timeout} s')
+                self.report['errors'] += len(set(self.pending.values()))
+                self.pending.clear()
+                break
+        self.output.flush()
+        self.report['elapsed'] = time.perf_counter() - start
+        return self.report
@@ -1,11 +1,33 @@
+import argparse
 import os
+from threading import Thread
 
-from Server.ServerEventLoops import ResultWindowEventLoop
-from Server.TCPServer import TCPServer
+from Server.ServerEventLoops import ResultWindowEventLoop, ResultWindowServer
+from src.Transport import notify_ready
+
+
+def read_commands(server: ResultWindowServer):
+    """
+    read commands of result window from user: paging and saving of large results
+    """
+    while server.is_active:
+        try:
+            server.sink.command(input())
+        except EOFError:  # there is no input
+            return
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Result window')
+    parser.add_argument('--address', default='tcp://0.0.0.0:12346',
+                        help='address to listen: tcp://ip:port, unix://path or shm://name')
+    parser.add_argument('--notify', default=None, help='address to send readiness notification to client')
+    args = parser.parse_args()
+
     os.system("title " + "Result Window")  # set windows title as "Result Window"
-    server = TCPServer(ResultWindowEventLoop)  # create server
+    server = ResultWindowServer(ResultWindowEventLoop)  # create server
     server.safe_print("This is RESULT WINDOW. All results will shown here.")
-    server.run('0.0.0.0', 12346)   # start server
+    if args.notify is not None:  # client waits for notification
+        server.on_listen = lambda: notify_ready(args.notify)
+    Thread(target=read_commands, args=(server,), daemon=True).start()  # thread, which get user commands
+    server.run_address(args.address)   # start server
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import ipaddress
+import os
+import socket
+import tempfile
+import time
+from threading import Thread
+from typing import Callable, Dict, List, TYPE_CHECKING, Union
+
+from Server.Memory import memory_report, snapshots
+from Server.Profiling import dump_stacks, profiler
+from src.LogSink import log_sink
+from src.Transport import create_socket, parse_address, remove_socket_file
+
+if TYPE_CHECKING:
+    from Server.ServerEventLoops import MainServer
+
+
+class AdminServer:
+    """
+    Control socket of server for the local administrator. It is served by daemon thread, so it doesn't
+    disturb the event loops, and it is bound only to unix domain socket (available only for the owner)
+    or to TCP on loopback interface.
+    Protocol: the client sends one command line, the server sends the text answer and closes the connection.
+    Commands:
+        help                                          - list of commands
+        stacks                                        - stacks of all threads
+        profile cprofile <seconds> [path]             - cProfile of worker and event loops, pstats file
+        profile sample <seconds> [path] [interval_ms] - sampling of all threads, collapsed stacks file
+        memory                                        - memory of task table, worker queues and connections
+        tracemalloc start [frames]                    - start tracing of allocations, take baseline snapshot
+        tracemalloc snapshot                          - take new baseline snapshot
+        tracemalloc diff [top] [key]                  - growth of allocations since baseline by key:
+                                                        lineno (default), filename or traceback
+        tracemalloc stop                              - stop tracing of allocations
+    """
+    max_duration: float = 600.0  # maximum duration of profiling, s
+
+    def __init__(self, address: str, server: MainServer = None):
+        """
+        :param address: unix://path or tcp://127.0.0.1:port
+        :param server: server, whose memory is reported
+        """
+        self.scheme, self.address = parse_address(address)  # scheme and address of control socket
+        if self.scheme == 'shm':
+            raise ValueError('ValueError. Admin address must be unix://path or tcp://127.0.0.1:port')
+        if self.scheme == 'tcp' and not is_loopback(self.address[0]):
+            raise ValueError(f'ValueError. Admin address must be on loopback interface, not {self.address[0]}')
+        self.server: Union[MainServer, None] = server  # server, whose memory is reported
+        self.server_socket: Union[socket.socket, None] = None  # listening socket
+        self.thread: Thread = Thread(target=self.run, name='AdminServer', daemon=True)  # thread of control socket
+        self.commands: Dict[str: Callable, ...] = {'help': self.help, 'stacks': self.stacks, 'profile': self.profile,
+                                                   'memory': self.memory,
+                                                   'tracemalloc': self.tracemalloc}  # Dict[command: handler]
+
+    def start(self):
+        """bind control socket and start its thread"""
+        if self.scheme == 'unix':
+            remove_socket_file(self.address)  # remove socket file of previous run, other files are not removed
+        self.server_socket = create_socket(self.scheme)
+        if self.scheme == 'unix':
+            old_umask = os.umask(0o177)  # socket file is created available only for the owner
+            try:
+                self.server_socket.bind(self.address)
+            finally:
+                os.umask(old_umask)
+            os.chmod(self.address, 0o600)
+        else:
+            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.server_socket.bind(self.address)
+        self.server_socket.listen(8)
+        self.thread.start()
+        log_sink.log('info', f'Admin socket listens on {self.scheme}://{self.address}')
+
+    def stop(self):
+        """close control socket, the thread waiting in accept is woken up by shutdown"""
+        if self.server_socket is not None:
+            try:
+                self.server_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:  # socket is not listening
+                pass
+            self.server_socket.close()
+            self.server_socket = None
+            if self.scheme == 'unix':
+                remove_socket_file(self.address, strict=False)
+
+    def run(self):
+        """serve admin connections one by one: profiling commands are long, but they are not run in parallel"""
+        server_socket = self.server_socket  # attribute is cleared by stop
+        while True:
+            try:
+                connection, address = server_socket.accept()
+            except OSError:  # socket is closed
+                return
+            with connection:
+                if self.scheme == 'tcp' and not is_loopback(address[0]):  # only local clients
+                    continue
+                try:
+                    connection.sendall(self.handle(read_line(connection)).encode('utf-8') + b'\n')
+                except OSError as ex:  # admin client disconnected
+                    log_sink.log('warning', f'Admin connection error: {ex}')
+
+    def handle(self, line: str) -> str:
+        """
+        run admin command
+        :param line: command line
+        :return: answer
+        """
+        words = line.split()
+        if not words:
+            return self.help()
+        handler = self.commands.get(words[0])
+        if handler is None:
+            return f'Unknown command "{words[0]}".\n' + self.help()
+        log_sink.log('info', f'Admin command: {line}')
+        try:
+            return handler(*words[1:])
+        except (TypeError, ValueError) as ex:  # wrong arguments
+            return f'Wrong arguments of "{words[0]}": {ex}.\n' + self.help()
+
+    def help(self) -> str:
+        """list of commands"""
+        return self.__doc__.split('Commands:\n', 1)[1].rstrip()
+
+    @staticmethod
+    def stacks() -> str:
+        """stacks of all threads"""
+        return dump_stacks()
+
+    def profile(self, mode: str, seconds: str, path: str = None, interval_ms: str = '5') -> str:
+        """
+        profile server
+        :param mode: cprofile or sample
+        :param seconds: duration of profiling
+        :param path: path of output file, file in temporary directory by default
+        :param interval_ms: time between samples of sampling profiler, ms
+        """
+        duration = float(seconds)
+        if not 0 < duration <= self.max_duration:
+            raise ValueError(f'duration must be from 0 to {self.max_duration} s')
+        if mode == 'cprofile':
+            return profiler.run_cprofile(duration, path or default_path('pstats'))
+        if mode == 'sample':
+            interval = float(interval_ms) / 1000
+            if interval <= 0:
+                raise ValueError('interval must be positive')
+            return profiler.run_sampling(duration, path or default_path('collapsed'), interval)
+        raise ValueError(f'unknown profiler "{mode}", use cprofile or sample')
+
+    def memory(self) -> str:
+        """memory report of server by subsystems"""
+        if self.server is None:
+            return 'Admin socket is not attached to server'
+        return memory_report(self.server)
+
+    @staticmethod
+    def tracemalloc(action: str, *args: str) -> str:
+        """
+        control tracemalloc snapshots
+        :param action: start, snapshot, diff or stop
+        :param args: count of frames for start, count of places and grouping for diff
+        """
+        if action == 'start':
+            return snapshots.start(*(int(arg) for arg in args))
+        if action == 'snapshot':
+            return snapshots.snapshot()
+        if action == 'diff':
+            top = int(args[0]) if args else 20
+            return snapshots.diff(top, *args[1:])
+        if action == 'stop':
+            return snapshots.stop()
+        raise ValueError(f'unknown action "{action}", use start, snapshot, diff or stop')
+
+
+def is_loopback(host: str) -> bool:
+    """is host loopback address"""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def read_line(connection: socket.socket, max_size: int = 4096) -> str:
+    """read one command line from admin client"""
+    connection.settimeout(5.0)
+    data = b''
+    while b'\n' not in data and len(data) < max_size:
+        chunk = connection.recv(max_size)
+        if not chunk:
+            break
+        data += chunk
+    return data.split(b'\n', 1)[0].decode('utf-8', 'replace').strip()
+
+
+def default_path(extension: str) -> str:
+    """path of profile in temporary directory, for example /tmp/server-20240101-120000.pstats"""
+    return os.path.join(tempfile.gettempdir(), f'server-{time.strftime("%Y%m%d-%H%M%S")}.{extension}')
+
+
+def send_command(address: str, line: str, timeout: float = AdminServer.max_duration + 30) -> str:
+    """
+    send command to admin socket of server and wait for answer
+    :param address: unix://path or tcp://127.0.0.1:port
+    :param line: command line
+    :param timeout: maximum time of waiting for answer, s
+    :return: answer of server
+    """
+    scheme, address = parse_address(address)
+    answer: List[bytes] = list()
+    with create_socket(scheme) as connection:
+        connection.settimeout(timeout)
+        connection.connect(address)
+        connection.sendall(line.encode('utf-8') + b'\n')
+        for chunk in iter(lambda: connection.recv(65536), b''):
+            answer.append(chunk)
+    return b''.join(answer).decode('utf-8', 'replace').rstrip('\n')
@@ -0,0 +1,179 @@
+"""
+Computational kernels of worker tasks.
+Every task type has pure python implementation and array-backed (numpy) implementation.
+Array-backed implementation is used automatically if numpy is installed and data is long enough
+(see Benchmarks/KernelsBenchmark.py for the measurements behind the thresholds).
+Pipeline of task types is run stage by stage: the intermediate result stays in memory of worker,
+and if it is array of code points, it is passed to the next stage without conversion to string.
+"""
+from __future__ import annotations
+
+from typing import List, Union
+
+try:  # numpy is optional dependency
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# minimal length of data, when array-backed implementation is used. None - array implementation is never used:
+# str slicing for reverse and str multiplication for symbol_repeat are faster than the round trip through UCS4 buffer
+array_thresholds: dict = {'symbol_repeat': None, 'pair_permutation': 512, 'reverse': None}
+codec: str = 'utf-32-le'  # UCS4 encoding of code points buffer
+involutions: tuple = ('pair_permutation', 'reverse',)  # task types, which are cancelled by repeating them
+
+
+def to_code_points(data: str):
+    """
+    convert string to numpy array of code points (UCS4)
+    :param data: string
+    """
+    # surrogatepass allows lone surrogates, which can be in python str
+    return np.frombuffer(data.encode(codec, 'surrogatepass'), dtype=np.uint32)
+
+
+def from_code_points(code_points) -> str:
+    """
+    convert numpy array of code points (UCS4) to string
+    :param code_points: numpy array of code points
+    """
+    return code_points.tobytes().decode(codec, 'surrogatepass')
+
+
+def symbol_repeat_python(data: str) -> str:
+    """repeat symbols according position"""
+    return ''.join(list(s*(num+1) for num, s in enumerate(data)))
+
+
+def pair_permutation_python(data: str) -> str:
+    """pairwise characters in a string"""
+    len_data = len(data)
+    return ''.join(
+        list(
+            data[num + 1] + data[num]
+            if num < len_data - 1
+            else data[num]
+            for num in range(0, len_data, 2)
+        )
+    )
+
+
+def reverse_python(data: str) -> str:
+    """reverse symbols in value"""
+    return data[::-1]
+
+
+def symbol_repeat_code_points(code_points):
+    """repeat symbols according position (numpy array of code points)"""
+    counts = np.arange(1, len(code_points) + 1)  # symbol with position num is repeated num+1 times
+    return np.repeat(code_points, counts)
+
+
+def pair_permutation_code_points(code_points):
+    """pairwise characters in a string (numpy array of code points)"""
+    len_pairs = len(code_points) - len(code_points) % 2  # length of the part, which is split to pairs
+    result = np.empty_like(code_points)
+    result[:len_pairs] = code_points[:len_pairs].reshape(-1, 2)[:, ::-1].ravel()  # swap symbols in pairs
+    result[len_pairs:] = code_points[len_pairs:]  # the last odd symbol stays in place
+    return result
+
+
+def reverse_code_points(code_points):
+    """reverse symbols in value (numpy array of code points)"""
+    return code_points[::-1]
+
+
+def symbol_repeat_array(data: str) -> str:
+    """repeat symbols according position (numpy implementation)"""
+    return from_code_points(symbol_repeat_code_points(to_code_points(data)))
+
+
+def pair_permutation_array(data: str) -> str:
+    """pairwise characters in a string (numpy implementation)"""
+    return from_code_points(pair_permutation_code_points(to_code_points(data)))
+
+
+def reverse_array(data: str) -> str:
+    """reverse symbols in value (numpy implementation)"""
+    return from_code_points(reverse_code_points(to_code_points(data)))
+
+
+python_kernels = {'symbol_repeat': symbol_repeat_python,
+                  'pair_permutation': pair_permutation_python,
+                  'reverse': reverse_python}
+
+code_point_kernels = {'symbol_repeat': symbol_repeat_code_points,
+                      'pair_permutation': pair_permutation_code_points,
+                      'reverse': reverse_code_points}
+
+array_kernels = {'symbol_repeat': symbol_repeat_array,
+                 'pair_permutation': pair_permutation_array,
+                 'reverse': reverse_array}
+
+
+def get_kernel(task_type: str, data: str) -> callable:
+    """
+    choose implementation of task according to the length of data
+    :param task_type: type of task without leading '--'
+    :param data: user input data for task
+    """
+    threshold = array_thresholds[task_type]
+    if np is not None and threshold is not None and len(data) >= threshold:
+        return array_kernels[task_type]
+    return python_kernels[task_type]
+
+
+def run_kernel(task_type: str, data: str) -> str:
+    """
+    calculate result of task
+    :param task_type: type of task without leading '--'
+    :param data: user input data for task
+    """
+    return get_kernel(task_type, data)(data)
+
+
+def split_pipeline(task_type: str) -> List[str]:
+    """
+    stages of pipeline
+    :param task_type: task type or pipeline of task types, for example '--reverse|--pair_permutation'
+    :return: task types without leading '--', for example ['reverse', 'pair_permutation']
+    """
+    return [stage.lstrip('-') for stage in task_type.split('|')]
+
+
+def fuse_stages(stages: List[str]) -> List[str]:
+    """
+    remove the stages, which don't change the data: two consecutive equal involutions (reverse|reverse,
+    pair_permutation|pair_permutation) are removed, it is repeated while there are such pairs
+    :param stages: task types without leading '--'
+    :return: stages to run
+    """
+    fused = list()
+    for stage in stages:
+        if fused and fused[-1] == stage and stage in involutions:
+            fused.pop()
+        else:
+            fused.append(stage)
+    return fused
+
+
+def run_stage(task_type: str, value, is_last: bool = True) -> Union[str, object]:
+    """
+    calculate one stage of pipeline
+    :param task_type: type of task without leading '--'
+    :param value: data of task or intermediate result of previous stage: string or numpy array of code points
+    :param is_last: is the stage last. Result of not last stage can be numpy array of code points
+    :return: result of stage
+    """
+    if not isinstance(value, str):  # array of code points from previous stage
+        result = code_point_kernels[task_type](value)
+        return from_code_points(result) if is_last else result
+    kernel = get_kernel(task_type, value)
+    if not is_last and kernel is array_kernels.get(task_type):  # keep array for the next stage
+        return code_point_kernels[task_type](to_code_points(value))
+    return kernel(value)
+
+
+def to_text(value) -> str:
+    """result of pipeline as string"""
+    return value if isinstance(value, str) else from_code_points(value)
@@ -0,0 +1,169 @@
+"""
+Memory accounting of the running server by subsystems: task table of worker (data and results by task types),
+intermediate results of pipelines, queues of worker and the connections (queues of responses, receive buffers
+and uploads). Leaks, which are not visible in the subsystems, are found by tracemalloc snapshots:
+the baseline snapshot is taken at one point in time and is compared with the current allocations later.
+It is controlled by admin commands (see Server/Admin.py).
+"""
+from __future__ import annotations
+
+import sys
+import threading
+import tracemalloc
+from typing import List, TYPE_CHECKING, Union
+
+from src.Transport import format_address
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+if TYPE_CHECKING:
+    from Server.ServerEventLoops import MainServer, UserEventLoop
+
+
+def format_size(size: Union[int, float]) -> str:
+    """size in bytes as human readable string, for example 1.5 MiB"""
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if abs(size) < 1024 or unit == 'GiB':
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+
+
+def response_size(response) -> int:
+    """approximate size of response object with its strings (data, result, error)"""
+    size = sys.getsizeof(response) + sys.getsizeof(getattr(response, '__dict__', None))
+    return size + sum(sys.getsizeof(value) for value in vars(response).values() if isinstance(value, (str, bytes)))
+
+
+def connection_usage(handler: UserEventLoop) -> dict:
+    """
+    memory of one connection
+    :param handler: event loop of client
+    :return: {'responses': count of not sent responses, 'queue': their size, 'buffer': receive buffer,
+              'uploads': received data of uploads, 'thread_alive': is event loop running}
+    """
+    responses = list(handler.data_to_send)  # copy, the deque is changed by event loop and worker
+    uploads = list(handler.uploads.values())
+    return {'responses': len(responses),
+            'queue': sum(response_size(response) for response in responses),
+            'buffer': sys.getsizeof(handler.receive_buffer),
+            'uploads': sum(upload.received for upload in uploads if upload.file is not None),
+            'thread_alive': handler.thread.is_alive()}
+
+
+def memory_report(server: MainServer) -> str:
+    """
+    memory report of server by subsystems
+    :param server: running server with worker
+    :return: text of report
+    """
+    lines: List[str] = list()
+    if resource is not None:  # peak resident memory of process, ru_maxrss is in KiB on linux and in bytes on macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        lines.append(f'peak RSS: {format_size(max_rss if sys.platform == "darwin" else max_rss * 1024)}')
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        lines.append(f'traced by tracemalloc: {format_size(current)} (peak {format_size(peak)})')
+
+    worker = server.worker.memory_report()
+    table = worker['table']
+    lines.append(f'task table: {format_size(table["total"])}')
+    lines.append(f'    columns: {format_size(table["columns"])}, task inputs: {format_size(table["data"])}, '
+                 f'task results: {format_size(table["results"])}, traces: {format_size(table["traces"])}')
+    task_types = sorted(worker['task_types'].items(), key=lambda item: -item[1]['data'] - item[1]['results'])
+    for task_type, usage in task_types:
+        lines.append(f'    {task_type}: {usage["tasks"]} tasks ({usage["alive"]} not finished), '
+                     f'inputs {format_size(usage["data"])}, results {format_size(usage["results"])}')
+    lines.append(f'intermediate results of pipelines: {format_size(worker["intermediates"])}')
+    lines.append('worker queues: ' + ', '.join(f'{name} {count}' for name, count in worker['queues'].items()))
+
+    handlers = list(server.sockets)  # copy, connections are added and removed by other threads
+    usages = [(handler, connection_usage(handler)) for handler in handlers]
+    total = {name: sum(usage[name] for handler, usage in usages)
+             for name in ('responses', 'queue', 'buffer', 'uploads')}
+    dead = [(handler, usage) for handler, usage in usages if not usage['thread_alive']]
+    lines.append(f'connections: {len(handlers)} open, {len(dead)} with stopped event loop')
+    lines.append(f'    not sent responses: {total["responses"]} ({format_size(total["queue"])}), '
+                 f'receive buffers: {format_size(total["buffer"])}, uploads: {format_size(total["uploads"])}')
+    largest = sorted(usages, key=lambda item: -item[1]['queue'] - item[1]['buffer'] - item[1]['uploads'])[:10]
+    for handler, usage in largest:
+        if not usage['responses'] and not usage['uploads'] and usage['buffer'] <= sys.getsizeof(bytearray()):
+            continue  # idle connection
+        lines.append(f'    {format_address(handler)}{"" if usage["thread_alive"] else " (event loop stopped)"}: '
+                     f'{usage["responses"]} responses ({format_size(usage["queue"])}), '
+                     f'buffer {format_size(usage["buffer"])}, uploads {format_size(usage["uploads"])}, '
+                     f'{worker["connections"].get(server.worker.connection_ids.get(handler), 0)} not finished tasks')
+    released = [owner for owner, handler in list(server.worker.connections.items()) if handler not in handlers]
+    if released:  # event loops which are closed, but referenced by worker
+        lines.append(f'    {len(released)} closed connections are still referenced by worker: {released[:10]}')
+    return '\n'.join(lines)
+
+
+class SnapshotDiff:
+    """
+    Search of leaks by tracemalloc: start tracing, take baseline snapshot and compare the current allocations
+    with it later. Tracing slows down allocations, so it is started only by admin command
+    """
+    def __init__(self):
+        self.baseline: Union[tracemalloc.Snapshot, None] = None  # snapshot to compare with
+        self.lock: threading.Lock = threading.Lock()  # guards baseline
+
+    @staticmethod
+    def take() -> tracemalloc.Snapshot:
+        """snapshot without allocations of tracemalloc and import machinery"""
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<unknown>'),))
+
+    def start(self, frames: int = 1) -> str:
+        """
+        start tracing of allocations and take baseline snapshot
+        :param frames: count of frames of allocation traceback
+        """
+        with self.lock:
+            if tracemalloc.is_tracing():
+                return 'tracemalloc is already started'
+            tracemalloc.start(frames)
+            self.baseline = self.take()
+        return f'tracemalloc started with {frames} frames, baseline snapshot taken'
+
+    def snapshot(self) -> str:
+        """replace baseline by the current snapshot"""
+        with self.lock:
+            if not tracemalloc.is_tracing():
+                return 'tracemalloc is not started'
+            self.baseline = self.take()
+            return f'baseline snapshot taken: {len(self.baseline.traces)} blocks'
+
+    def diff(self, top: int = 20, key_type: str = 'lineno') -> str:
+        """
+        compare the current allocations with baseline
+        :param top: count of shown places of allocation
+        :param key_type: group allocations by lineno, filename or traceback
+        """
+        with self.lock:
+            if not tracemalloc.is_tracing() or self.baseline is None:
+                return 'tracemalloc is not started'
+            current = self.take()
+            statistics = current.compare_to(self.baseline, key_type)
+        lines = [f'top {top} of {len(statistics)} places by growth of allocated memory since baseline:']
+        for statistic in statistics[:top]:
+            lines.append(str(statistic))  # place: size=... (+...), count=... (+...), average=...
+            if key_type == 'traceback':
+                lines.extend('    ' + line for line in statistic.traceback.format())
+        return '\n'.join(lines)
+
+    def stop(self) -> str:
+        """stop tracing and release snapshots"""
+        with self.lock:
+            self.baseline = None
+            if not tracemalloc.is_tracing():
+                return 'tracemalloc is not started'
+            tracemalloc.stop()
+        return 'tracemalloc stopped'
+
+
+snapshots = SnapshotDiff()  # tracemalloc snapshots of the process
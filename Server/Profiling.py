@@ -0,0 +1,186 @@
+"""
+Profiling of the running server: deterministic profiling by cProfile, sampling of thread stacks
+and dump of stacks of all threads. It is controlled by admin commands (see Server/Admin.py).
+
+cProfile profiles only the thread, which enabled it (before python 3.12), so the event loops of worker
+and clients call profiler.checkpoint() on every iteration: the thread enables its own profiler, when the session
+is started, and gives it to the session, when the session is finished. Since python 3.12 cProfile uses
+sys.monitoring, which covers all threads, so one profiler is enabled by the session itself.
+Sampling profiler needs no checkpoints: it reads the frames of all threads by sys._current_frames()
+and writes the collapsed stacks (the format of flamegraph.pl and speedscope).
+"""
+from __future__ import annotations
+
+import cProfile
+import linecache
+import pstats
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Dict, List, Union
+
+from src.Metrics import metrics
+
+
+profiling_sessions = metrics.counter('profiling_sessions_total', 'Finished profiling sessions', 'mode')
+
+global_cprofile: bool = sys.version_info >= (3, 12)  # one cProfile profiles all threads
+
+
+class ProfileSession:
+    """Started cProfile session: the profilers of threads are collected to one statistics"""
+    def __init__(self):
+        self.profiles: List[cProfile.Profile, ...] = list()  # profilers of threads
+        self.lock: threading.Lock = threading.Lock()  # guards profiles
+
+    def add(self, profile: cProfile.Profile):
+        """register profiler of thread"""
+        with self.lock:
+            self.profiles.append(profile)
+
+    def stats(self) -> Union[pstats.Stats, None]:
+        """merged statistics of all threads, None if no thread was profiled"""
+        with self.lock:
+            profiles = list(self.profiles)
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+
+class Profiler:
+    """
+    Profiling of event loop threads. Only one session (cProfile or sampling) can be active at once
+    """
+    def __init__(self):
+        self.session: Union[ProfileSession, None] = None  # active cProfile session
+        self.local: threading.local = threading.local()  # profiler and session of current thread
+        self.lock: threading.Lock = threading.Lock()  # only one session at once
+        self.checkpoint_interval: float = 0.2  # time, in which every event loop reaches checkpoint, s
+
+    def checkpoint(self):
+        """
+        is called by event loops on every iteration: enable profiler of thread, if session is started,
+        and disable it, if session is finished
+        """
+        session = self.session
+        profile = getattr(self.local, 'profile', None)
+        if profile is None:
+            if session is not None and not global_cprofile:
+                profile = cProfile.Profile()
+                self.local.profile, self.local.session = profile, session
+                session.add(profile)
+                profile.enable()
+        elif session is not self.local.session:  # session of this profiler is finished
+            profile.disable()
+            self.local.profile, self.local.session = None, None
+
+    def run_cprofile(self, duration: float, path: str) -> str:
+        """
+        profile event loops by cProfile and write statistics to file
+        :param duration: duration of profiling, s
+        :param path: path of pstats file
+        :return: report for admin
+        """
+        if not self.lock.acquire(blocking=False):
+            return 'Profiling is already running'
+        try:
+            session = ProfileSession()
+            global_profile = None
+            if global_cprofile:  # sys.monitoring based profiler covers all threads
+                global_profile = cProfile.Profile()
+                session.add(global_profile)
+                global_profile.enable()
+            self.session = session
+            time.sleep(duration)
+            self.session = None
+            if global_profile is not None:
+                global_profile.disable()
+            else:
+                time.sleep(self.checkpoint_interval)  # threads disable their profilers at checkpoints
+            stats = session.stats()
+            if stats is None:
+                return 'No thread reached checkpoint, nothing is profiled'
+            stats.dump_stats(path)
+            profiling_sessions.inc(label='cprofile')
+            return f'cProfile statistics of {len(session.profiles)} profilers written to {path}. ' \
+                   f'Show it by: python -m pstats {path}'
+        finally:
+            self.session = None
+            self.lock.release()
+
+    def run_sampling(self, duration: float, path: str, interval: float = 0.005) -> str:
+        """
+        sample stacks of all threads and write them as collapsed stacks: "thread;frame;frame count"
+        :param duration: duration of sampling, s
+        :param path: path of text file
+        :param interval: time between samples, s
+        :return: report for admin
+        """
+        if not self.lock.acquire(blocking=False):
+            return 'Profiling is already running'
+        try:
+            stacks: Counter = Counter()  # Counter[collapsed stack]
+            samples = 0
+            current = threading.get_ident()
+            deadline = time.perf_counter() + duration
+            while time.perf_counter() < deadline:
+                names = thread_names()
+                for ident, frame in sys._current_frames().items():
+                    if ident == current:  # don't sample the sampler
+                        continue
+                    stacks[collapse(names.get(ident, str(ident)), frame)] += 1
+                samples += 1
+                time.sleep(interval)
+            with open(path, 'w', encoding='utf-8') as file:
+                file.writelines(f'{stack} {count}\n' for stack, count in stacks.most_common())
+            profiling_sessions.inc(label='sampling')
+            return f'{samples} samples of {len(stacks)} different stacks written to {path} as collapsed stacks'
+        finally:
+            self.lock.release()
+
+
+def thread_names() -> Dict[int, str]:
+    """Dict[thread identifier: name of thread]"""
+    return {thread.ident: thread.name for thread in threading.enumerate()}
+
+
+def frame_name(frame) -> str:
+    """function and place of frame"""
+    code = frame.f_code
+    return f'{code.co_name} ({code.co_filename.rsplit("/", 1)[-1].rsplit(chr(92), 1)[-1]}:{frame.f_lineno})'
+
+
+def collapse(thread_name: str, frame) -> str:
+    """stack of thread as one line from the root to the current frame, separated by ';'"""
+    names = list()
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    names.append(thread_name)
+    return ';'.join(reversed(names))  # frames can contain spaces, the count is separated by the last space
+
+
+def dump_stacks() -> str:
+    """
+    stacks of all threads. The header of every stack shows the line, on which the thread is now,
+    for example select.select(...) of idle event loop or time.sleep(...) of idle worker
+    """
+    names = thread_names()
+    lines = list()
+    current = threading.get_ident()
+    for ident, frame in sys._current_frames().items():
+        if ident == current:  # the thread of admin command
+            continue
+        current_line = linecache.getline(frame.f_code.co_filename, frame.f_lineno).strip()
+        lines.append(f'Thread "{names.get(ident, ident)}" is in {frame_name(frame)}: {current_line}')
+        lines.extend(line.rstrip('\n') for line in traceback.format_stack(frame))
+        lines.append('')
+    return '\n'.join(lines)
+
+
+profiler = Profiler()  # profiler of the process
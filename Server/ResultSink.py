@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import hashlib
+import sys
+from collections import OrderedDict, deque
+from threading import Condition, Thread
+from typing import Deque, TextIO
+
+
+class ResultSink:
+    """
+    Buffered output of result window.
+    Event loops only put lines in buffer, the writer thread renders all buffered lines by one write
+    every flush_interval and not more than max_bytes_per_flush at once (the rest waits for next flush).
+    Results longer than summary_threshold are not printed: the summary (length, head, tail, hash) is printed
+    and the result is kept in memory for paging or saving to file by user command
+    """
+    def __init__(self,
+                 stream: TextIO = None,
+                 flush_interval: float = 0.05,
+                 max_bytes_per_flush: int = 64 * 1024,
+                 summary_threshold: int = 4096,
+                 page_size: int = 2000,
+                 stored_results: int = 100):
+        """
+        :param stream: output stream, sys.stdout by default
+        :param flush_interval: period of rendering, s
+        :param max_bytes_per_flush: maximum count of symbols rendered at once
+        :param summary_threshold: length of result, from which the summary is printed instead of the result
+        :param page_size: count of symbols on one page of stored result
+        :param stored_results: maximum count of stored large results, the oldest are removed
+        """
+        self.stream: TextIO = stream if stream is not None else sys.stdout  # output stream
+        self.flush_interval: float = flush_interval  # period of rendering
+        self.max_bytes_per_flush: int = max_bytes_per_flush  # rate limit of rendering
+        self.summary_threshold: int = summary_threshold  # length of large result
+        self.page_size: int = page_size  # count of symbols on one page
+        self.stored_results: int = stored_results  # maximum count of stored results
+        self.results: OrderedDict = OrderedDict()  # stored large results Dict[number: result]
+        self.result_num: int = 0  # counter of stored results
+        self.buffer: Deque[str] = deque()  # lines to render
+        self.condition: Condition = Condition()  # guards buffer, wakes up the writer thread
+        self.is_active: bool = True  # flag: is writer thread active
+        self.thread: Thread = Thread(target=self.run, daemon=True)  # writer thread
+
+    def start(self):
+        """start writer thread"""
+        self.thread.start()
+
+    def stop(self):
+        """render the rest of buffer and stop writer thread"""
+        with self.condition:
+            self.is_active = False
+            self.condition.notify()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def write(self, text: str, summarize: bool = True):
+        """
+        put line in buffer, large result is replaced by its summary
+        :param text: line to show
+        :param summarize: replace large text by summary (False for output of user commands, such as pages)
+        """
+        text = str(text)
+        if summarize and len(text) > self.summary_threshold:
+            text = self.store(text)
+        with self.condition:
+            self.buffer.append(text)
+
+    def store(self, text: str) -> str:
+        """
+        keep large result for paging and saving
+        :param text: large result
+        :return: summary of result
+        """
+        with self.condition:
+            self.result_num += 1
+            number = self.result_num
+            self.results[number] = text
+            while len(self.results) > self.stored_results:
+                self.results.popitem(last=False)
+        pages = (len(text) + self.page_size - 1) // self.page_size
+        digest = hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()  # text can contain lone surrogates
+        return (f'[result #{number}] {len(text)} symbols, sha256 {digest}\n'
+                f'    head: {text[:80]!r}\n'
+                f'    tail: {text[-80:]!r}\n'
+                f'    {pages} pages. Call "page {number} <page>" to show page or "save {number} <path>" to save it')
+
+    def page(self, number: int, page: int = 1) -> str:
+        """
+        page of stored result
+        :param number: number of stored result
+        :param page: number of page from 1
+        """
+        text = self.results.get(number)
+        if text is None:
+            return f'Result #{number} not found'
+        pages = (len(text) + self.page_size - 1) // self.page_size
+        if not 1 <= page <= pages:
+            return f'Page {page} not found. Result #{number} has {pages} pages'
+        return f'[result #{number}, page {page}/{pages}]\n' + text[(page - 1) * self.page_size:page * self.page_size]
+
+    def save(self, number: int, path: str) -> str:
+        """
+        save stored result to file
+        :param number: number of stored result
+        :param path: path of file
+        """
+        text = self.results.get(number)
+        if text is None:
+            return f'Result #{number} not found'
+        # surrogates of uploaded data (see ClientRequests.iter_dumps) are saved as the original bytes
+        with open(path, 'w', encoding='utf-8', errors='surrogateescape') as file:
+            file.write(text)
+        return f'Result #{number} saved to {path}'
+
+    def command(self, user_input: str):
+        """
+        execute user command of result window: page <number> [<page>] or save <number> <path>
+        :param user_input: user input
+        """
+        words = user_input.split(maxsplit=2)
+        try:
+            if words and words[0] == 'page' and len(words) >= 2:
+                self.write(self.page(int(words[1]), int(words[2]) if len(words) == 3 else 1), summarize=False)
+            elif words and words[0] == 'save' and len(words) == 3:
+                self.write(self.save(int(words[1]), words[2]), summarize=False)
+            elif words:
+                self.write('Commands: "page <number> [<page>]", "save <number> <path>"', summarize=False)
+        except ValueError:
+            self.write('Number of result and number of page must be integers', summarize=False)
+        except (OSError, UnicodeError) as ex:
+            self.write(f"Can't save result: {ex}", summarize=False)
+
+    def flush(self) -> bool:
+        """
+        render buffered lines by one write
+        :return: is there something left in buffer
+        """
+        with self.condition:
+            lines, size = list(), 0
+            while self.buffer and (not lines or size + len(self.buffer[0]) <= self.max_bytes_per_flush):
+                line = self.buffer.popleft()
+                lines.append(line)
+                size += len(line)
+            is_left = bool(self.buffer)
+        if lines:
+            text = '\n'.join(lines) + '\n'
+            try:
+                self.stream.write(text)
+            except UnicodeEncodeError:  # result contains symbols, which the stream can't encode (lone surrogates)
+                encoding = getattr(self.stream, 'encoding', None) or 'utf-8'
+                self.stream.write(text.encode(encoding, 'replace').decode(encoding))
+            self.stream.flush()
+        return is_left
+
+    def run(self):
+        """
+        writer thread: render buffer every flush_interval. If there is more than max_bytes_per_flush in buffer,
+        the rest waits for the next flush
+        """
+        while True:
+            with self.condition:
+                if self.is_active:
+                    self.condition.wait(self.flush_interval)
+                is_active = self.is_active
+            is_left = self.flush()
+            if not is_active:
+                while is_left:  # render the rest of buffer before stop
+                    is_left = self.flush()
+                return
@@ -2,20 +2,35 @@ from __future__ import annotations
 
 import select
 import socket
+import time
 from collections import deque
 from threading import Thread
-from typing import Tuple, TYPE_CHECKING, Union
+from typing import Dict, Tuple, TYPE_CHECKING, Union
 from json import loads
 
+from Server.Profiling import profiler
+from Server.ResultSink import ResultSink
 from Server.TCPServer import TCPServer
+from Server.Uploads import expired_uploads
+from src.Capture import CLOSE, REQUEST, RESPONSE, TrafficCapture
 from src.ClientRequests import BaseRequest
+from src.Exceptions import ServerBusy
 from src.MessageHandlers import ServerMessageHandler
+from src.Metrics import metrics
+from src.Tracing import checked_trace, tracer, hop
+from src.Transport import ShmRingTransfer, format_address, parse_address
 from src.ServerRequest import ServerTask, ServerInfoRequest, ServerResultRequest, ServerStatusRequest, commands
 
 if TYPE_CHECKING:
+    from Server.Uploads import Upload
     from Server.Worker import Worker
 
 
+requests_received = metrics.counter('requests_total', 'Requests received from clients', 'command')
+request_latency = metrics.histogram('request_latency_seconds',
+                                    'Time from the end of request reading to the end of request handling', 'command')
+
+
 class UserEventLoop(ServerMessageHandler):
     """
     The class handle the request from client on the server. One thread - one user.
@@ -29,8 +44,15 @@ class UserEventLoop(ServerMessageHandler):
         """
         super(UserEventLoop, self).__init__(server, client_socket, address)
         self.worker: Worker = server.worker  # worker, which do requested tasks
-        self.thread: Thread = Thread(target=self.run, daemon=False)  # thread, which run the event loop
+        self.thread: Thread = Thread(target=self.run, name=f'UserEventLoop {format_address(self)}',
+                                     daemon=False)  # thread, which run the event loop, the name is shown by profiler
         self.data_to_send: deque = deque()  # queue to send data from server to client
+        self.uploads: Dict[int: Upload, ...] = dict()  # not finished uploads Dict[identifier of upload: Upload]
+        self.msg_len = 65536  # uploaded data is received by large packages
+        self.push_timeout: float = 0.005  # event loop timeout, while worker can push result of task
+        self.capture: Union[TrafficCapture, None] = server.capture  # traffic capture log, None - no capture
+        # connection id in capture log
+        self.capture_id: int = self.capture.open_connection(format_address(self)) if self.capture is not None else 0
 
 
     # the decorator provides removing connection from server
@@ -40,60 +62,104 @@ class UserEventLoop(ServerMessageHandler):
         client event loop
         """
         while self.is_active:  # while server is alive or client is connected - event loop is alive
-            # checking if there is something to read or to write in socket
+            profiler.checkpoint()  # enable or disable profiling of the thread by admin command
+            # checking if there is something to read or to write in socket. Writing is checked only if there are
+            # responses, otherwise idle connection would spin. Results of tasks are put in data_to_send by worker,
+            # so the loop wakes up more often while the client has not finished tasks
             ready_to_read, ready_to_write, in_error = select.select(
-                [self.client_socket], [self.client_socket], [], self.loop_timeout)
+                [self.client_socket], [self.client_socket] if self.data_to_send else [], [],
+                self.push_timeout if self.worker.has_tasks(self) else self.loop_timeout)
 
             # if socket in the error, stop event loop
             if len(in_error) == 1:
                 return
 
+            if self.uploads:  # remove uploads, which the client has aborted
+                self.expire_uploads()
+
             # if there is data to read, read firstly
-            if len(ready_to_read) == 1:
+            if len(ready_to_read) == 1 or self.has_buffered_msg():
                 try:
                     bytes_data: bytes = self.read_msg()  # get bytes data from server
+                    read_time = time.perf_counter()  # start of request handling
+                    if self.capture is not None:  # record request for replay
+                        self.capture.write(self.capture_id, REQUEST, bytes_data)
                     decoded_data: list = BaseRequest.loads(bytes_data)  # convert bytes to list
                     command: str = decoded_data[1]  # get command
+                    # label values are known commands only, so the client can't add labels of any type
+                    requests_received.inc(label=command if isinstance(command, str) and command in commands
+                                          else 'invalid')
                     request: Union[ServerTask, ServerInfoRequest, ServerResultRequest, ServerStatusRequest] = \
                         commands[command](self, *decoded_data)  # create request object
+                    request.trace = checked_trace(request.trace)  # trace of client is used, only if it is valid
                 except TimeoutError:  # if TimeoutError occurred, clear request and continue
                     request = None
                 except UnicodeError as ex:  # if UnicodeError occurred, inform user and clear request
-                    self.safe_print(ex)
+                    self.safe_print(ex, level='warning')
                     request = None
                 except ConnectionError as ex:  # if ConnectionError occurred, inform user and stop event loop
-                    self.safe_print(ex)
+                    self.safe_print(ex, level='warning')
                     return
                 except Exception as ex:   # if another error occurred, inform user and stop event loop
-                    self.safe_print(ex)
+                    self.safe_print(ex, level='error')
                     return
 
                 if request is not None:  # if there is request, run it
+                    if request.trace is None:  # start trace on server, if client doesn't trace the request
+                        request.trace = tracer.start(request.command)
+                    hop(request.trace, 'server_read')
                     request.run()
+                    request_latency.observe(time.perf_counter() - read_time, request.command)
 
             # if there is data to send, send it
             if len(ready_to_write) == 1 and len(self.data_to_send) >= 1:
                 try:
                     response: Union[ServerTask, ServerInfoRequest, ServerResultRequest, ServerStatusRequest] = \
                         self.data_to_send.pop()
-                    self.send_msg(response.dumps())
+                    hop(response.trace, 'server_sent')
+                    tracer.finish(response.trace)
+                    encoded_data: bytes = response.dumps()
+                    if self.capture is not None:  # record response without the end of message
+                        self.capture.write(self.capture_id, RESPONSE, encoded_data[:-len(self.end_of_msg)])
+                    self.send_msg(encoded_data)
                 except TimeoutError:  # ignore TimeoutError
                     pass
                 except ConnectionError as ex:  # if ConnectionError occurred, inform user and stop event loop
-                    self.safe_print(ex)
+                    self.safe_print(ex, level='warning', request_id=response.request_identifier_on_client)
                     return
                 except Exception as ex:  # if another error occurred, inform user and stop event loop
-                    self.safe_print(ex)
+                    self.safe_print(ex, level='error', request_id=response.request_identifier_on_client)
                     return
 
 
+    def expire_uploads(self):
+        """remove not finished uploads without chunks for upload_timeout"""
+        deadline = time.monotonic() - self.server.upload_timeout
+        for identifier in [i for i, upload in self.uploads.items() if upload.last_write < deadline]:
+            self.uploads.pop(identifier).close()
+            expired_uploads.inc()
+
+    def release(self):
+        """
+        release responses, which will never be sent, and the tasks of the closed connection
+        """
+        super(UserEventLoop, self).release()
+        self.data_to_send.clear()
+        for upload in self.uploads.values():  # remove received data of not sent tasks
+            upload.close()
+        self.uploads.clear()
+        self.worker.release_connection(self)
+        if self.capture is not None:
+            self.capture.write(self.capture_id, CLOSE, b'')
+
+
 
 class ResultWindowEventLoop(ServerMessageHandler):
     """
     The class handle the request from client on the server of result window. One thread - one user.
     """
     def __init__(self,
-                 server: TCPServer,
+                 server: ResultWindowServer,
                  client_socket: socket.socket,
                  address: Tuple[str, int]):
         """
@@ -102,8 +168,15 @@ class ResultWindowEventLoop(ServerMessageHandler):
         :param address: tuple([ip: str, port: int])
         """
         super(ResultWindowEventLoop, self).__init__(server, client_socket, address)
+        self.server: ResultWindowServer
         self.thread: Thread = Thread(target=self.run, daemon=False)  # thread, which run the event loop
 
+    def safe_print(self, *args, level: str = 'info', **fields):
+        """
+        print through sink of server
+        """
+        self.server.safe_print(*args, level=level, **fields)
+
     @ServerMessageHandler.remove_connection_decorator
     def run(self):
         """
@@ -118,17 +191,11 @@ class ResultWindowEventLoop(ServerMessageHandler):
                 return
 
             # read and print data
-            if len(ready_to_read) == 1:
+            if len(ready_to_read) == 1 or self.has_buffered_msg():
                 try:
                     bytes_data: bytes = self.read_msg()  # get bytes data from server
-                    data = loads(bytes_data.decode('utf-8'))
-                    data_to_print = data[0]  # get str from bytes
-                    control_data = data[1]  # get control from bytes
-                    if data_to_print:
-                        self.safe_print(data_to_print)  # show data in terminal
-                    if control_data == 'shutdown':
+                    if self.server.show_frame(bytes_data):  # show data, shutdown if it is requested
                         self.client_socket.close()
-                        self.server.is_active = False
                         return
                 except TimeoutError:  # ignore TimeoutError
                     pass
@@ -143,6 +210,94 @@ class ResultWindowEventLoop(ServerMessageHandler):
 
 
 
+class ResultWindowServer(TCPServer):
+    """
+    The class ResultWindowServer accept the connection from client and show received results by buffered sink.
+    """
+    def __init__(self, handler: type, sink: ResultSink = None):
+        """
+        :param handler: class of client event loop
+        :param sink: buffered output of results, sink with default settings if None
+        """
+        super(ResultWindowServer, self).__init__(handler)
+        self.sink: ResultSink = sink if sink is not None else ResultSink()  # buffered output of results
+
+    def safe_print(self, *args, level: str = 'info', **fields):
+        """
+        print through sink, so the messages are not mixed with buffered results. Level and fields are not shown
+        """
+        self.sink.write(' '.join(str(i) for i in args))
+
+    def show_frame(self, bytes_data: bytes) -> bool:
+        """
+        show lines of frame from client
+        :param bytes_data: frame: JSON list of [text, control] pairs
+        :return: is shutdown requested
+        """
+        frame: list = loads(bytes_data.decode('utf-8'))  # list of [text, control] pairs
+        for text, control_data in frame:
+            if text:
+                self.sink.write(text)  # show data in terminal by writer thread
+        if frame and frame[-1][1] == 'shutdown':  # get control from the last line
+            self.is_active = False
+            return True
+        return False
+
+    def run_shm(self, name: str):
+        """
+        read frames from shared memory ring instead of socket
+        :param name: name of shared memory
+        """
+        reader = ShmRingTransfer(name)
+        try:
+            reader.listen()
+        except OSError as ex:
+            self.safe_print(f"Result window can't create shared memory {name}:", ex)
+            return
+        if self.on_listen is not None:  # inform that result window is ready
+            self.on_listen()
+        try:
+            while self.is_active:
+                if not reader.wait_readable(reader.loop_timeout):
+                    continue
+                try:
+                    if self.show_frame(reader.read_msg()):
+                        return
+                except TimeoutError:  # ignore TimeoutError
+                    pass
+                except (UnicodeError, ValueError) as ex:  # if frame is broken, inform user
+                    self.safe_print(ex)
+        except KeyboardInterrupt:  # if user press ctrl+C
+            pass
+        finally:
+            reader.close()
+            self.safe_print('Exit server')
+
+    def run_address(self, address: str):
+        """
+        run server on address with scheme tcp://, unix:// or shm://
+        """
+        scheme, name = parse_address(address)
+        if scheme != 'shm':
+            super(ResultWindowServer, self).run_address(address)
+            return
+        self.sink.start()
+        try:
+            self.run_shm(name)
+        finally:
+            self.sink.stop()
+
+    def run(self, ip: str, port: int):
+        """
+        run writer thread of sink and server, render the rest of results after the server stopped
+        """
+        self.sink.start()
+        try:
+            super(ResultWindowServer, self).run(ip, port)
+        finally:
+            self.sink.stop()
+
+
 class MainServer(TCPServer):
     """
     The class MainServer accept the connections from clients and put it in new thread.
@@ -154,6 +309,11 @@ class MainServer(TCPServer):
         """
         super(MainServer, self).__init__(handler)
         self.worker: Worker = None
+        self.capture: Union[TrafficCapture, None] = None  # traffic capture log of client connections, None - off
+        self.max_upload_size: Union[int, None] = 1024 * 1024 * 1024  # maximum size of uploaded data, None - no limit
+        self.upload_spool_size: int = 16 * 1024 * 1024  # uploaded data larger than this is spilled to disk
+        self.max_uploads_per_connection: int = 4  # maximum count of not finished uploads of one connection
+        self.upload_timeout: float = 60.0  # not finished upload is removed after this time without chunks, s
 
     def set_worker(self, worker: Worker):
         """
@@ -162,6 +322,14 @@ class MainServer(TCPServer):
         """
         self.worker = worker
 
+    def rejection_message(self, reason: str) -> bytes:
+        """
+        response with error to the rejected client, it has no request identifier
+        :param reason: max_connections or max_connections_per_ip
+        """
+        limit = self.max_connections if reason == 'max_connections' else self.max_connections_per_ip
+        return ServerInfoRequest(None, 0, 'help', str(ServerBusy(reason, limit)), None).dumps()
+
     def deactivate_threads(self):
         """
         deactivate client threads and worker thread
@@ -2,19 +2,37 @@ from __future__ import annotations
 
 import select
 import socket
-from threading import Semaphore
-from typing import List, TYPE_CHECKING, Union
+import time
+from threading import Lock
+from typing import Dict, List, Tuple, TYPE_CHECKING, Union
+
+from src.LogSink import log_sink
+from src.Metrics import metrics
+from src.Transport import create_socket, parse_address, remove_socket_file
 
 if TYPE_CHECKING:
     from Server.ServerEventLoops import UserEventLoop, ResultWindowEventLoop
 
 
+accepted_connections = metrics.counter('accepted_connections_total', 'Accepted client connections')
+rejected_connections = metrics.counter('rejected_connections_total', 'Connections closed without serving',
+                                       'reason')
+accept_latency = metrics.histogram('accept_latency_seconds',
+                                   'Time from readiness of listening socket to the start of connection event loop')
+accept_batch = metrics.histogram('accept_batch_size', 'Connections accepted on one readiness of listening socket',
+                                 buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+
+
 class TCPServer:
     """
     TCP Server always wait the connection from the client in main thread.
     If there is request for connection, server accept it.
     Server put the connection to a new thread and start it.
     All connections saves in attribute *threads*.
+    On every readiness of listening socket all pending connections are accepted at first (so the backlog is
+    released quickly, when many clients connect together) and then their threads are started.
+    The connections over max_connections or over max_connections_per_ip from one address are rejected:
+    the server sends the reason (see reject) and closes the connection
     """
     def __init__(self, event_loop: type):
         """
@@ -24,10 +42,15 @@ class TCPServer:
         self.ip: str = None  # server ip
         self.port: int = None  # server port
         self.server_socket: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)  # server socket
-        self.semaphore: Semaphore = Semaphore(1)  # semaphore for stdout
         self.sockets: List[Union[UserEventLoop, ResultWindowEventLoop], ...] = list()  # list of connections
-        self.listen = 10  # maximum connections
+        self.listen = 1024  # size of backlog of not accepted connections
+        self.max_connections: Union[int, None] = None  # maximum count of open connections, None - no limit
+        self.max_connections_per_ip: Union[int, None] = None  # maximum connections from one ip, None - no limit
+        self.connections_per_ip: Dict[str: int, ...] = dict()  # count of open connections Dict[ip: count]
+        self.connections_lock: Lock = Lock()  # guards connections_per_ip, connections are removed by their threads
+        self.on_listen: callable = None  # function without arguments, is called when server is ready for connections
         self.is_active = True
+        metrics.gauge('open_connections', 'Open client connections', lambda: len(self.sockets))
 
     def deactivate_threads(self):
         """
@@ -49,31 +72,36 @@ class TCPServer:
                 continue
 
 
-    def safe_print(self, *args, **kwargs):
+    def safe_print(self, *args, level: str = 'info', **fields):
         """
-        single thread access to print
+        put message in log, the message is printed by writer thread of log
+        :param args: parts of message
+        :param level: level of message: debug, info, warning or error
+        :param fields: structured fields, for example client address or request identifier
         """
-        self.semaphore.acquire()  # block access
-        print(*args, **kwargs)
-        self.semaphore.release()  # unblock access
+        log_sink.log(level, *args, **fields)
 
 
     def run(self, ip: str, port: int):
         """
         Main event loop of server
-        :param ip: server ip
-        :param port: server port
+        :param ip: server ip or path of unix socket
+        :param port: server port, None for unix socket
         """
+        log_sink.start()  # start writer thread of log
         self.ip: str = ip  # assignment ip
         self.port: int = port  # assignment port
         try:
-            self.server_socket.bind((self.ip, self.port))  # server bind address
+            self.server_socket.bind((self.ip, self.port) if self.port is not None else self.ip)  # server bind address
         except OSError as ex:
-            self.safe_print(f"Server can't bind address {self.ip}:{self.port}, OSError:", ex)
+            self.safe_print(f"Server can't bind address {self.ip}:{self.port}, OSError:", ex, level='error')
             self.stop_server()  # stop all threads and server
+            log_sink.stop()  # write the rest of log
             return
 
         self.server_socket.listen(self.listen)  # set limit of connections
+        if self.on_listen is not None:  # inform that server is ready
+            self.on_listen()
 
         try:
             while self.is_active:
@@ -83,13 +111,8 @@ class TCPServer:
                 )
                 if not ready_to_read:  # if no request for connections, continue to wait
                     continue
-                else:  # if there is request for connections, accept it
-                    client_socket, receiver_address = self.server_socket.accept()  # get socket descriptor and address
-                    # self.safe_print('Connected client:', receiver_address)
-                    client_socket.setblocking(0)  # set blocking False
-                    client_handler = self.event_loop(self, client_socket, receiver_address)  # create event loop
-                    self.sockets.append(client_handler)  # append client event loop in list
-                    client_handler.thread.start()  # start client event loop
+                else:  # if there are requests for connections, accept all of them
+                    self.accept_pending(time.perf_counter())
 
             self.stop_server()  # stop all threads and server
 
@@ -98,3 +121,120 @@ class TCPServer:
 
         finally:
             self.safe_print('Exit server')  # inform user
+            log_sink.stop()  # write the rest of log
+
+    def accept_pending(self, ready_time: float):
+        """
+        accept all pending connections, then create and start their event loops
+        :param ready_time: time.perf_counter() when listening socket became ready
+        """
+        accepted: List[Tuple[socket.socket, tuple], ...] = list()
+        self.server_socket.setblocking(False)  # accept returns immediately, when the backlog is empty
+        while True:
+            try:
+                client_socket, receiver_address = self.server_socket.accept()  # get socket descriptor and address
+            except (BlockingIOError, InterruptedError):  # backlog is empty
+                break
+            except OSError as ex:  # for example, too many open files: the rest waits for the next readiness
+                rejected_connections.inc(label='accept_error')
+                self.safe_print('Accept error:', ex, level='warning')
+                time.sleep(0.01)  # listening socket stays ready, don't spin
+                break
+            if self.port is None:  # client of unix socket has no address, use path and descriptor
+                receiver_address = (self.ip, client_socket.fileno())
+            reason = self.check_limits(receiver_address, len(accepted))
+            if reason is not None:
+                rejected_connections.inc(label=reason)
+                self.reject(client_socket, reason)
+                continue
+            self.add_ip(receiver_address)
+            accepted.append((client_socket, receiver_address))
+        if not accepted:
+            return
+        accept_batch.observe(len(accepted))
+
+        for client_socket, receiver_address in accepted:
+            client_socket.setblocking(0)  # set blocking False
+            accepted_connections.inc()
+            client_handler = self.event_loop(self, client_socket, receiver_address)  # create event loop
+            self.sockets.append(client_handler)  # append client event loop in list
+            client_handler.thread.start()  # start client event loop
+            accept_latency.observe(time.perf_counter() - ready_time)
+
+    def check_limits(self, address: tuple, pending: int) -> Union[str, None]:
+        """
+        check limits of connections for new connection
+        :param address: address of client
+        :param pending: count of accepted connections, whose event loops are not started yet
+        :return: reason of rejection: 'max_connections' or 'max_connections_per_ip', None - connection is allowed
+        """
+        if self.max_connections is not None and len(self.sockets) + pending >= self.max_connections:
+            return 'max_connections'
+        if self.max_connections_per_ip is not None and self.port is not None and \
+                self.connections_per_ip.get(address[0], 0) >= self.max_connections_per_ip:
+            return 'max_connections_per_ip'
+        return None
+
+    def add_ip(self, address: tuple):
+        """count connection of ip address"""
+        if self.port is not None:
+            with self.connections_lock:
+                self.connections_per_ip[address[0]] = self.connections_per_ip.get(address[0], 0) + 1
+
+    def remove_connection(self, client_handler: Union[UserEventLoop, ResultWindowEventLoop]):
+        """
+        remove closed connection
+        :param client_handler: event loop of connection
+        """
+        self.sockets.remove(client_handler)
+        if self.port is not None:
+            ip = client_handler.address[0]
+            with self.connections_lock:
+                count = self.connections_per_ip.get(ip, 0) - 1
+                if count > 0:
+                    self.connections_per_ip[ip] = count
+                else:
+                    self.connections_per_ip.pop(ip, None)
+
+    def rejection_message(self, reason: str) -> bytes:
+        """
+        message, which is sent to the rejected client. Server of the protocol overrides it
+        :param reason: max_connections or max_connections_per_ip
+        """
+        return b''
+
+    def reject(self, client_socket: socket.socket, reason: str):
+        """
+        inform the client, why the connection is rejected, and close the connection
+        :param client_socket: accepted socket
+        :param reason: max_connections or max_connections_per_ip
+        """
+        try:
+            client_socket.setblocking(False)
+            message = self.rejection_message(reason)
+            if message:
+                client_socket.send(message)  # best effort: the message is small and the send buffer is empty
+            client_socket.shutdown(socket.SHUT_RDWR)  # close gracefully, the client gets end of stream
+        except OSError:
+            pass
+        finally:
+            client_socket.close()
+
+    def run_address(self, address: str):
+        """
+        Main event loop of server on address with scheme
+        :param address: tcp://ip:port or unix://path
+        """
+        scheme, address = parse_address(address)
+        if scheme == 'tcp':
+            self.run(*address)
+            return
+        if scheme != 'unix':
+            raise ValueError(f'ValueError. Server can not listen on {scheme}:// address')
+        remove_socket_file(address)  # remove socket file of previous run, other files are not removed
+        self.server_socket.close()  # TCP socket created in constructor is not used
+        self.server_socket = create_socket(scheme)  # unix domain socket
+        try:
+            self.run(address, None)
+        finally:
+            remove_socket_file(address, strict=False)
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import math
+import sys
+import time
+from array import array
+from typing import BinaryIO, Dict, List, Union
+
+from Server.Kernels import fuse_stages, split_pipeline
+
+
+class TaskTable:
+    """
+    Columnar table of worker tasks.
+    Every task is a row, identifier of task is the number of row from 1, so the identifier indexes the columns directly.
+    The columns are typed arrays: status is byte, task type is index of interned type string,
+    owner is an integer connection id (0 - no owner), data and result are stored as utf-8 bytes
+    in append-only arenas and the columns keep their offsets.
+    Traces are kept only for sampled tasks and only until the task is finished.
+    Task type can be pipeline of task types ('--reverse|--pair_permutation'), its stages are fused once per task type
+    and the stage column keeps the number of current stage.
+    The table doesn't hold references to client event loops, so the rows of finished tasks are cheap
+    """
+    statuses: tuple = ('in queue', 'in work', 'done', 'cancelled', 'expired',)  # codes of status column
+    alive_statuses: tuple = (0, 1,)  # codes of statuses 'in queue' and 'in work'
+    copy_chunk_size: int = 1024 * 1024  # size of chunk, by which uploaded data is copied to data arena
+    max_task_types: int = 2 ** 16  # count of different task types, which fit the task type column
+
+    def __init__(self):
+        self.status: array = array('B')  # codes of statuses
+        self.task_type: array = array('H')  # indexes in task_types
+        self.stage: array = array('B')  # index of current stage in plan of task type
+        self.owner: array = array('I')  # connection id of client, 0 - client disconnected or task finished
+        self.request_identifier_on_client: array = array('q')  # identifier of task request on client
+        self.request_identifier_on_result: array = array('q')  # identifier of result response, -1 - not batch mode
+        self.deadline: array = array('d')  # time.monotonic() when the task is expired, nan - no deadline
+        self.submission_time: array = array('d')  # time.monotonic() when the task is created
+        self.data_end: array = array('Q')  # end of data in data_arena, data starts at the end of previous row
+        self.result_start: array = array('Q')  # start of result in result_arena
+        self.result_length: array = array('q')  # length of result in result_arena, -1 - no result
+        self.data_arena: bytearray = bytearray()  # data of all tasks
+        self.result_arena: bytearray = bytearray()  # results of done tasks
+        self.task_types: List[str] = list()  # task types, for example '--reverse'
+        self.type_indexes: Dict[str: int, ...] = dict()  # Dict[task type: index in task_types]
+        self.plans: List[List[str], ...] = list()  # fused stages of every task type, without leading '--'
+        self.traces: Dict[int: dict, ...] = dict()  # traces of sampled not finished tasks Dict[identifier: trace]
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    def __contains__(self, identifier: int) -> bool:
+        return isinstance(identifier, int) and 1 <= identifier <= len(self.status)
+
+    def identifiers(self) -> range:
+        """identifiers of all tasks"""
+        return range(1, len(self.status) + 1)
+
+    def add(self,
+            owner: int,
+            request_identifier_on_client: int,
+            task_type: str,
+            is_batch_processing_mode: bool,
+            request_identifier_on_result: int,
+            data: Union[str, BinaryIO],
+            deadline: float = None,
+            trace: dict = None) -> int:
+        """
+        add row of new task
+        :param owner: connection id of client
+        :param request_identifier_on_client: identifier of task request on client
+        :param task_type: type of task, for example '--reverse'
+        :param is_batch_processing_mode: is the result sent to the client, when the task is finished
+        :param request_identifier_on_result: identifier of result response
+        :param data: data of task or file with uploaded utf-8 data
+        :param deadline: time.monotonic() when the task is expired, None - no deadline
+        :param trace: continuation of trace of the task request
+        :return: identifier of task
+        """
+        type_index = self.type_indexes.get(task_type)
+        if type_index is None and len(self.task_types) >= self.max_task_types:  # checked before any column is changed
+            raise ValueError(f'ValueError. Server can not keep more than {self.max_task_types} different task types')
+        plan = fuse_stages(split_pipeline(task_type)) if type_index is None else None  # plan of new task type
+        row = len(self.status)
+        data_start = len(self.data_arena)
+        try:
+            if isinstance(data, str):
+                self.data_arena += data.encode('utf-8', 'surrogatepass')
+            else:  # uploaded data is copied from file by chunks
+                for chunk in iter(lambda: data.read(self.copy_chunk_size), b''):
+                    self.data_arena += chunk
+            row_values = (
+                (self.status, 0),
+                (self.task_type, type_index if type_index is not None else len(self.task_types)),
+                (self.stage, 0),
+                (self.owner, owner),
+                (self.request_identifier_on_client, request_identifier_on_client),
+                (self.request_identifier_on_result,
+                 request_identifier_on_result if is_batch_processing_mode and request_identifier_on_result is not None
+                 else -1),
+                (self.deadline, deadline if deadline is not None else math.nan),
+                (self.submission_time, time.monotonic()),
+                (self.data_end, len(self.data_arena)),
+                (self.result_start, 0),
+                (self.result_length, -1),
+            )
+            for column, value in row_values:
+                column.append(value)
+            if type_index is None:  # the new task type is interned, when the row is added
+                self.plans.append(plan)
+                self.type_indexes[task_type] = len(self.task_types)
+                self.task_types.append(task_type)
+        except (TypeError, OverflowError, ValueError) as ex:  # value doesn't fit column: the row is rolled back
+            self.rollback(row, data_start)
+            raise ValueError(f'ValueError. Task can not be stored: {ex}') from ex
+        identifier = len(self.status)
+        if trace is not None:
+            self.traces[identifier] = trace
+        return identifier
+
+    def rollback(self, row: int, data_start: int):
+        """
+        remove partially added row
+        :param row: number of removed row from 0, all columns are truncated to this length
+        :param data_start: length of data arena before the row
+        """
+        for column in self.columns():
+            del column[row:]
+        del self.data_arena[data_start:]
+
+    def columns(self) -> tuple:
+        """typed columns of table"""
+        return (self.status, self.task_type, self.stage, self.owner, self.request_identifier_on_client,
+                self.request_identifier_on_result, self.deadline, self.submission_time, self.data_end,
+                self.result_start, self.result_length)
+
+    def get_status(self, identifier: int) -> str:
+        """status of task: in queue, in work, done, cancelled or expired"""
+        return self.statuses[self.status[identifier - 1]]
+
+    def set_status(self, identifier: int, status: str):
+        """set status of task"""
+        self.status[identifier - 1] = self.statuses.index(status)
+
+    def describe_status(self, identifier: int) -> str:
+        """
+        status of task with current stage of pipeline, for example 'in work, stage 2/3 --pair_permutation'.
+        Status of task, which is not pipeline, and final status are returned as they are
+        """
+        status = self.get_status(identifier)
+        task_type = self.get_task_type(identifier)
+        if '|' not in task_type or not self.is_alive(identifier):
+            return status
+        plan = self.get_plan(identifier)
+        stage = self.stage[identifier - 1]
+        if stage < len(plan):
+            status += f', stage {stage + 1}/{len(plan)} --{plan[stage]}'
+        fused = task_type.count('|') + 1 - len(plan)
+        if fused:
+            status += f', {fused} stages fused'
+        return status
+
+    def get_plan(self, identifier: int) -> List[str]:
+        """fused stages of task, without leading '--'"""
+        return self.plans[self.task_type[identifier - 1]]
+
+    def is_alive(self, identifier: int) -> bool:
+        """task is not done, not cancelled and not expired"""
+        return self.status[identifier - 1] in self.alive_statuses
+
+    def get_task_type(self, identifier: int) -> str:
+        """type of task, for example '--reverse'"""
+        return self.task_types[self.task_type[identifier - 1]]
+
+    def get_deadline(self, identifier: int) -> Union[float, None]:
+        """time.monotonic() when the task is expired, None - no deadline"""
+        deadline = self.deadline[identifier - 1]
+        return None if math.isnan(deadline) else deadline
+
+    def get_data(self, identifier: int) -> str:
+        """data of task"""
+        row = identifier - 1
+        start = self.data_end[row - 1] if row > 0 else 0
+        return self.data_arena[start:self.data_end[row]].decode('utf-8', 'surrogatepass')
+
+    def get_result(self, identifier: int) -> Union[str, None]:
+        """result of task, None if the task is not done"""
+        row = identifier - 1
+        if self.result_length[row] < 0:
+            return None
+        start = self.result_start[row]
+        return self.result_arena[start:start + self.result_length[row]].decode('utf-8', 'surrogatepass')
+
+    def set_result(self, identifier: int, result: str):
+        """store result of task"""
+        encoded = result.encode('utf-8', 'surrogatepass')
+        self.result_start[identifier - 1] = len(self.result_arena)
+        self.result_length[identifier - 1] = len(encoded)
+        self.result_arena += encoded
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        memory of table in bytes
+        :return: {'columns': ..., 'data': ..., 'results': ..., 'traces': ..., 'total': ...}
+        """
+        columns = sum(column.buffer_info()[1] * column.itemsize for column in self.columns())
+        usage = {'columns': columns,
+                 'data': sys.getsizeof(self.data_arena),
+                 'results': sys.getsizeof(self.result_arena),
+                 'traces': sys.getsizeof(self.traces)}
+        usage['total'] = sum(usage.values())
+        return usage
+
+    def memory_by_task_type(self) -> Dict[str: Dict[str, int], ...]:
+        """
+        bytes of data and results in arenas by task types
+        :return: Dict[task type: {'tasks': ..., 'alive': ..., 'data': ..., 'results': ...}]
+        """
+        usage = [{'tasks': 0, 'alive': 0, 'data': 0, 'results': 0} for _ in self.task_types]
+        data_start = 0
+        for row in range(len(self.status)):
+            type_usage = usage[self.task_type[row]]
+            type_usage['tasks'] += 1
+            type_usage['alive'] += self.status[row] in self.alive_statuses
+            type_usage['data'] += self.data_end[row] - data_start
+            type_usage['results'] += max(self.result_length[row], 0)
+            data_start = self.data_end[row]
+        return dict(zip(self.task_types, usage))
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import time
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Union
+
+from src.Exceptions import UploadIncomplete, UploadTooLarge
+from src.Metrics import metrics
+
+
+uploaded_bytes = metrics.counter('uploaded_bytes_total', 'Bytes of task data received by chunks')
+rejected_uploads = metrics.counter('uploads_rejected_total', 'Uploads rejected because of size limit')
+expired_uploads = metrics.counter('uploads_expired_total', 'Not finished uploads removed after upload timeout')
+dropped_chunks = metrics.counter('upload_chunks_dropped_total',
+                                 'Chunks dropped because the connection has too many not finished uploads')
+
+
+class Upload:
+    """
+    Data of task, which is received by chunks before the task.
+    The chunks are written as utf-8 bytes to the spooled file: it is kept in memory while it is smaller than
+    spool_size and is moved to temporary file on disk after that. The upload is rejected as soon as the declared
+    or received size exceeds max_size: the next chunks are dropped and the task gets the error
+    """
+    def __init__(self, size: int, max_size: Union[int, None], spool_size: int):
+        """
+        :param size: declared size of upload, bytes
+        :param max_size: maximum size of upload, bytes. None - no limit
+        :param spool_size: maximum size of upload in memory, bytes
+        """
+        self.size: int = size  # declared size
+        self.max_size: Union[int, None] = max_size  # size limit
+        self.received: int = 0  # count of received bytes
+        self.file: Union[SpooledTemporaryFile, None] = None  # received data
+        self.error: Union[str, None] = None  # the reason of rejection
+        self.last_write: float = time.monotonic()  # time of the last chunk, the upload expires after upload timeout
+        if max_size is not None and size > max_size:  # reject before the first chunk is stored
+            self.reject(size)
+        else:
+            self.file = SpooledTemporaryFile(max_size=spool_size)
+
+    def reject(self, size: int):
+        """drop received data"""
+        self.error = str(UploadTooLarge(size, self.max_size))
+        rejected_uploads.inc()
+        self.close()
+
+    def write(self, chunk: str):
+        """
+        append chunk to upload
+        :param chunk: chunk of data
+        """
+        if self.error is not None:  # upload is rejected, chunk is dropped
+            return
+        self.last_write = time.monotonic()
+        data = chunk.encode('utf-8', 'surrogatepass')
+        self.received += len(data)
+        uploaded_bytes.inc(len(data))
+        if self.max_size is not None and self.received > self.max_size:
+            self.reject(self.received)
+            return
+        self.file.write(data)
+
+    def get_data(self) -> BinaryIO:
+        """
+        received data, is called when the task is received
+        :return: file with utf-8 data at position 0
+        """
+        if self.error is not None:
+            raise ValueError(self.error)
+        if self.received < self.size:  # not whole file is received, for example it was changed while uploading
+            raise ValueError(str(UploadIncomplete(self.received, self.size)))
+        self.file.seek(0)
+        return self.file
+
+    def close(self):
+        """remove received data"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
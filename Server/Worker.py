@@ -1,10 +1,20 @@
 from __future__ import annotations
 
+import heapq
+import sys
 import time
+import uuid
 from collections import deque
 from threading import Semaphore
 from threading import Thread
-from typing import Dict, TYPE_CHECKING
+from typing import Dict, TYPE_CHECKING, List, Tuple, Union, Set
+
+from Server.Kernels import run_stage, to_text
+from Server.Profiling import profiler
+from Server.TaskTable import TaskTable
+from src.Exceptions import TaskNotCompleted
+from src.Metrics import metrics
+from src.Tracing import tracer, hop, copy_trace
 from src.ServerRequest import ServerResultRequest
 
 if TYPE_CHECKING:
@@ -12,136 +22,333 @@ if TYPE_CHECKING:
     from src.ServerRequest import ServerTask
 
 
+finished_tasks = metrics.counter('worker_finished_tasks_total', 'Tasks finished by worker', 'status')
+orphaned_tasks = metrics.counter('worker_orphaned_tasks_total', 'Not finished tasks of disconnected clients')
+task_wait_time = metrics.histogram('worker_task_wait_seconds',
+                                   'Time from task submission to the start of compute phase', 'task_type')
+task_run_time = metrics.histogram('worker_task_run_seconds', 'Duration of compute phase of task', 'task_type')
+
+
 class Worker:
     """
     Class contains thread which calculate tasks.
     Any server thread can add task.
     Semaphore is used to add task.
+    Task is executed in two phases:
+        delay phase - simulated latency of task. The task waits in the heap of delayed tasks and doesn't hold the thread,
+            so any number of tasks can wait at the same time
+        compute phase - calculation of the result in the worker thread
+    Cancelled and expired tasks are not removed from the queue and the heap, they are skipped when popped.
+    Tasks are stored in the columnar TaskTable, the queue, the heap and the connections keep only identifiers.
+    Pipeline of task types ('--reverse|--pair_permutation') is executed stage by stage: every stage has its own delay
+    and compute phases, the intermediate result stays in the worker and the next stage starts without the client.
+    Orphaned task is the task, whose client has disconnected. It is handled according to orphan_policy:
+        cancel - orphaned task is cancelled
+        deprioritize - orphaned task is computed only when there is no other ready task
+        keep - orphaned task is computed as usual, its result is available by "result" request
     """
-    def __init__(self):
+    orphan_policies: tuple = ('cancel', 'deprioritize', 'keep',)
+    delays: dict = {'symbol_repeat': 7, 'pair_permutation': 5, 'reverse': 2}  # simulated latency of task types, s
+
+    def __init__(self, orphan_policy: str = 'keep'):
+        """
+        :param orphan_policy: cancel, deprioritize or keep orphaned tasks
+        """
+        if orphan_policy not in self.orphan_policies:
+            raise ValueError(f'ValueError. Orphan policy must be one of {self.orphan_policies}')
         self.semaphore = Semaphore(1)  # add task semaphore
+        self.instance: str = uuid.uuid4().hex  # identifier of worker instance, task identifiers are unique within it
         self.current_identifier = 0  # counter of task identifier
-        self.tasks: Dict[int: WorkerTask, ...] = dict()  # dictionary of tasks Dict[identifier: WorkerTask]
+        self.tasks: TaskTable = TaskTable()  # table of tasks, identifier indexes it
         self.deque = deque()  # queue of task identifiers
+        self.delayed: List[Tuple[float, int], ...] = list()  # heap of delayed tasks [(ready time, identifier)]
+        self.orphan_policy: str = orphan_policy  # what to do with tasks of disconnected clients
+        self.orphans: deque = deque()  # queue of deprioritized orphaned tasks, which are ready to compute
+        self.intermediates: dict = dict()  # results of not last stages of pipelines Dict[identifier: result]
+        self.connection_counter: int = 0  # counter of connection ids
+        self.connection_ids: Dict[UserEventLoop: int, ...] = dict()  # Dict[event loop of client: connection id]
+        self.connections: Dict[int: UserEventLoop, ...] = dict()  # Dict[connection id: event loop of client]
+        # identifiers of not finished tasks of every connection Dict[connection id: Set[identifier]]
+        self.connection_tasks: Dict[int: Set[int], ...] = dict()
+        self.loop_timeout: float = 0.1  # maximum sleep time of worker event loop
         self.is_active = True  # is thread active
-        self.thread = Thread(target=self.run, daemon=False)  # worker Thread
+        self.thread = Thread(target=self.run, name='Worker', daemon=False)  # worker Thread
+        metrics.gauge('worker_queued_tasks', 'Tasks in queue of worker', lambda: len(self.deque))
+        metrics.gauge('worker_delayed_tasks', 'Tasks in delay phase (including dropped ones)', lambda: len(self.delayed))
+        metrics.gauge('worker_deprioritized_tasks', 'Orphaned tasks waiting for compute', lambda: len(self.orphans))
+        metrics.gauge('worker_task_table_bytes', 'Memory of task table: columns, data, results and traces',
+                      lambda: self.tasks.memory_usage()['total'])
 
     def start(self):
         """star worker"""
         self.thread.start()  # start Thread
 
+    def connection_id(self, event_handler: UserEventLoop) -> int:
+        """
+        integer id of client connection, which is stored in the task table instead of reference to the event loop
+        :param event_handler: event loop of client
+        """
+        connection_id = self.connection_ids.get(event_handler)
+        if connection_id is None:
+            self.connection_counter += 1
+            connection_id = self.connection_ids[event_handler] = self.connection_counter
+            self.connections[connection_id] = event_handler
+        return connection_id
+
+    def has_tasks(self, event_handler: UserEventLoop) -> bool:
+        """has the client not finished tasks"""
+        return self.connection_ids.get(event_handler) in self.connection_tasks
+
     def add_task(self, task: ServerTask) -> int:
         """
         Create task for Worker
         :param task: task generated by UserEventLoop class
         :return: task identifier
         """
-        self.current_identifier += 1  # increase counter
+        owner = self.connection_id(task.event_handler)
+        trace = copy_trace(task.trace)
+        hop(trace, 'worker_queued')
 
-        # create worker task
-        worker_task = WorkerTask(
-            task.event_handler,
+        # add row of task in task table
+        identifier = self.tasks.add(
+            owner,
             task.request_identifier_on_client,
-            task.command,
-            task.error,
             task.task_type,
             task.is_batch_processing_mode,
             task.request_identifier_on_result,
             task.data,
-            self.current_identifier)
-
-        self.tasks[self.current_identifier] = worker_task  # add worker task in tasks container
-        self.deque.appendleft(self.current_identifier)  # add worker task identifier in queue
-        return self.current_identifier
+            time.monotonic() + task.deadline if task.deadline is not None else None,
+            trace)
+        self.current_identifier = identifier
 
-    def run(self):
-        """worker event loop"""
-        while self.is_active:
-            if len(self.deque) > 0:  # run task if there is task to run
-                identifier = self.deque.pop()  # pop identifier from queue
-                self.tasks[identifier].run()  # get task from dictionary of tasks and run
-            else:  # sleep if there is task to run
-                time.sleep(0.1)
+        self.connection_tasks.setdefault(owner, set()).add(identifier)
+        self.deque.appendleft(identifier)  # add task identifier in queue
+        return identifier
 
+    def cancel_task(self, identifier: int) -> str:
+        """
+        Cancel task, if it is not done. Semaphore must be acquired.
+        :param identifier: task identifier
+        :return: status of task after cancellation
+        """
+        if self.tasks.is_alive(identifier):
+            self.finish_task(identifier, 'cancelled')
+        return self.tasks.get_status(identifier)
 
-class WorkerTask:
-    def __init__(self,
-                 event_handler: UserEventLoop,
-                 request_identifier_on_client: int,
-                 command: str,
-                 error: str,
-                 task_type: str,
-                 is_batch_processing_mode: bool,
-                 request_identifier_on_result: int,
-                 data: str,
-                 identifier: str):
-        """create new worker task"""
-
-        self.event_handler: UserEventLoop = event_handler
-        self.request_identifier_on_client: int = request_identifier_on_client
-        self.command: str = command
-        self.error: str = error
-        self.task_type: str = task_type
-        self.is_batch_processing_mode = is_batch_processing_mode
-        self.request_identifier_on_result = request_identifier_on_result
-        self.data = data
-        self.identifier = identifier
+    def finish_task(self, identifier: int, status: str, result: str = None):
+        """
+        Set final status of task and send result in batch processing mode. Semaphore must be acquired.
+        :param identifier: task identifier
+        :param status: final status: done, cancelled or expired
+        :param result: result of done task
+        """
+        tasks = self.tasks
+        row = identifier - 1
+        owner = tasks.owner[row]
+        if owner:
+            connection_tasks = self.connection_tasks[owner]
+            connection_tasks.discard(identifier)
+            if not connection_tasks:  # the set doesn't shrink, so the empty set is released
+                del self.connection_tasks[owner]
+        tasks.set_status(identifier, status)
+        if result is not None:
+            tasks.set_result(identifier, result)
+        trace = tasks.traces.pop(identifier, None)
+        self.intermediates.pop(identifier, None)
+        hop(trace, 'worker_finished')
+        request_identifier_on_result = tasks.request_identifier_on_result[row]
+        # if request was in batch processing mode and client is connected, create response
+        if request_identifier_on_result >= 0 and owner:
+            event_handler = self.connections[owner]
+            # create result response
+            result_response = ServerResultRequest(
+                event_handler,
+                request_identifier_on_result,
+                'result',
+                None if status == 'done' else str(TaskNotCompleted(identifier, status)),
+                identifier,
+                result,
+                trace)
 
-        self.result = None
-        self.status: str = 'in queue'
+            event_handler.data_to_send.appendleft(result_response)  # add response in data_to_send queue
+        else:  # trace of the task is finished in the worker
+            tracer.finish(trace)
+        tasks.owner[row] = 0  # finished task doesn't need the client
+        finished_tasks.inc(label=status)
 
+    def release_connection(self, event_handler: UserEventLoop):
+        """
+        Release references to the disconnected client and apply orphan policy to its not finished tasks
+        :param event_handler: event loop of disconnected client
+        """
+        self.semaphore.acquire()
+        owner = self.connection_ids.pop(event_handler, None)
+        if owner is not None:
+            del self.connections[owner]
+            for identifier in self.connection_tasks.pop(owner, set()):
+                self.tasks.owner[identifier - 1] = 0  # nobody will read the response, so it is not created
+                orphaned_tasks.inc()
+                if self.orphan_policy == 'cancel':
+                    self.finish_task(identifier, 'cancelled')
+        self.semaphore.release()
 
-    def symbol_repeat(self):
+    def check_task(self, identifier: int) -> bool:
         """
-        repeat symbols according position
+        checkpoint of task: expire task if its deadline passed
+        :param identifier: task identifier
+        :return: True if task must be continued
         """
-        time.sleep(7)
-        self.result = ''.join(list(s*(num+1) for num, s in enumerate(self.data)))
+        if not self.tasks.is_alive(identifier):  # task was cancelled
+            return False
+        deadline = self.tasks.get_deadline(identifier)
+        if deadline is not None and deadline <= time.monotonic():
+            self.semaphore.acquire()
+            if self.tasks.is_alive(identifier):
+                self.finish_task(identifier, 'expired')
+            self.semaphore.release()
+            return False
+        return True
 
+    def start_task(self, identifier: int) -> bool:
+        """
+        start delay phase of task. The status is checked and set under the semaphore,
+        so the task cancelled after check_task is not switched back to 'in work'
+        :param identifier: task identifier
+        :return: True if task is started, False if it is not in queue anymore
+        """
+        self.semaphore.acquire()
+        try:
+            if self.tasks.get_status(identifier) != 'in queue':  # cancelled or expired meanwhile
+                return False
+            self.tasks.set_status(identifier, 'in work')  # update status
+            hop(self.tasks.traces.get(identifier), 'worker_delay_start')
+            self.schedule_stage(identifier)
+            return True
+        finally:
+            self.semaphore.release()
 
-    def pair_permutation(self):
+    def schedule_stage(self, identifier: int):
         """
-        pairwise characters in a string
+        put task in the heap of delayed tasks for simulated latency of its current stage
+        :param identifier: task identifier
         """
-        time.sleep(5)
-        len_data = len(self.data)
-        self.result = ''.join(
-            list(
-                self.data[num + 1] + self.data[num]
-                if num < len_data - 1
-                else self.data[num]
-                for num in range(0, len_data, 2)
-            )
-        )
+        plan = self.tasks.get_plan(identifier)
+        stage = self.tasks.stage[identifier - 1]
+        ready_time: float = time.monotonic() + (self.delays[plan[stage]] if stage < len(plan) else 0)
+        deadline = self.tasks.get_deadline(identifier)
+        if deadline is not None:  # task leaves the heap at deadline if it is earlier than ready time
+            ready_time = min(ready_time, deadline)
+        heapq.heappush(self.delayed, (ready_time, identifier))
 
+    def delay_tasks(self):
+        """move all queued tasks to the delay phase"""
+        while len(self.deque) > 0:
+            identifier = self.deque.pop()  # pop identifier from queue
+            if not self.check_task(identifier):  # drop cancelled and expired tasks
+                continue
+            self.start_task(identifier)  # task is 'in work' since the delay phase
 
-    def reverse(self):
+    def pop_ready_task(self) -> Union[int, None]:
         """
-         reverse symbols in value
+        get task, which finished the delay phase
+        :return: task identifier or None if there is no ready task
         """
-        time.sleep(2)
-        self.result = self.data[::-1]
+        while self.delayed and self.delayed[0][0] <= time.monotonic():
+            identifier = heapq.heappop(self.delayed)[1]
+            if not self.check_task(identifier):  # drop cancelled and expired tasks
+                continue
+            if self.tasks.owner[identifier - 1] == 0 and self.orphan_policy == 'deprioritize':
+                self.orphans.appendleft(identifier)  # postpone orphaned task
+                continue
+            return identifier
+
+        # orphaned tasks are computed only when there is no other ready task
+        while len(self.orphans) > 0:
+            identifier = self.orphans.pop()
+            if self.check_task(identifier):
+                return identifier
+        return None
 
+    def get_sleep_time(self) -> float:
+        """time before the next delayed task will be ready, but not more than loop_timeout"""
+        if len(self.orphans) > 0:  # don't sleep if there are postponed orphaned tasks
+            return 0
+        if not self.delayed:
+            return self.loop_timeout
+        return min(max(self.delayed[0][0] - time.monotonic(), 0), self.loop_timeout)
 
     def run(self):
+        """worker event loop"""
+        while self.is_active:
+            profiler.checkpoint()  # enable or disable profiling of the thread by admin command
+            self.delay_tasks()
+            identifier = self.pop_ready_task()
+            if identifier is not None:  # run compute phase of current stage if there is ready task
+                self.compute_stage(identifier)
+            else:  # sleep if there is no ready task
+                time.sleep(self.get_sleep_time())
+
+    def compute_stage(self, identifier: int):
         """
-        start worker task
+        compute phase of current stage of task. Intermediate result of pipeline stays in memory of worker
+        and the task is delayed for the next stage, only the result of the last stage is stored in task table
+        :param identifier: task identifier
         """
-        self.status = 'in work'  # update status
-        self.__getattribute__(self.task_type.lstrip('-'))()  # run method corresponding to the task_type
-        self.status = 'done'  # update status
+        tasks = self.tasks
+        row = identifier - 1
+        plan = tasks.get_plan(identifier)
+        stage = tasks.stage[row]
+        trace = tasks.traces.get(identifier)
+        start_time = time.monotonic()
+        if stage == 0:
+            task_type = tasks.get_task_type(identifier)
+            task_wait_time.observe(start_time - tasks.submission_time[row], task_type if '|' not in task_type
+                                   else 'pipeline')
+        hop(trace, 'worker_compute_start')
+        value = self.intermediates.pop(identifier, None)
+        if value is None:  # the first stage gets data of task
+            value = tasks.get_data(identifier)
+        is_last = stage + 1 >= len(plan)
+        if plan:
+            value = run_stage(plan[stage], value, is_last)
+            task_run_time.observe(time.monotonic() - start_time, '--' + plan[stage])
+        hop(trace, 'worker_compute_end')
 
-        if self.is_batch_processing_mode:  # if request was in batch processing mode, create response
-            # create result response
-            result_response = ServerResultRequest(
-                self.event_handler,
-                self.request_identifier_on_result,
-                'result',
-                None,
-                self.identifier,
-                self.result)
+        self.semaphore.acquire()
+        if tasks.is_alive(identifier):  # the last checkpoint: task could be cancelled while computing
+            deadline = tasks.get_deadline(identifier)
+            if deadline is not None and deadline <= time.monotonic():  # deadline passed while computing
+                self.finish_task(identifier, 'expired')
+            elif is_last:
+                self.finish_task(identifier, 'done', to_text(value))
+            else:
+                self.intermediates[identifier] = value
+                tasks.stage[row] = stage + 1
+                self.schedule_stage(identifier)
+        # result of cancelled and expired task is dropped
+        self.semaphore.release()
+
+    def memory_usage(self) -> Dict[str, int]:
+        """memory of task table in bytes"""
+        self.semaphore.acquire()
+        usage = self.tasks.memory_usage()
+        self.semaphore.release()
+        return usage
 
-            self.event_handler.data_to_send.appendleft(result_response)  # add response in data_to_send queue
+    def memory_report(self) -> dict:
+        """
+        memory of worker by parts: task table, data and results by task types, intermediate results of pipelines
+        and queues. It is consistent, because the worker doesn't change the tasks while the semaphore is acquired
+        """
+        self.semaphore.acquire()
+        try:
+            return {'table': self.tasks.memory_usage(),
+                    'task_types': self.tasks.memory_by_task_type(),
+                    'intermediates': sum(sys.getsizeof(value) for value in self.intermediates.values()),
+                    'queues': {'queue': len(self.deque), 'delayed': len(self.delayed), 'orphans': len(self.orphans)},
+                    'connections': {owner: len(identifiers) for owner, identifiers in self.connection_tasks.items()}}
+        finally:
+            self.semaphore.release()
 
 
 worker = Worker()  # create worker, which do requested tasks
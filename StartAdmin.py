@@ -0,0 +1,22 @@
+import argparse
+import sys
+
+from Server.Admin import send_command
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Admin commands of running server through its control socket (StartServer.py --admin-address)',
+        epilog='commands: help | stacks | profile cprofile <seconds> [path] | '
+               'profile sample <seconds> [path] [interval_ms] | memory | tracemalloc start [frames] | '
+               'tracemalloc snapshot | tracemalloc diff [top] [lineno|filename|traceback] | tracemalloc stop')
+    parser.add_argument('--admin-address', required=True, help='control socket: unix://path or tcp://127.0.0.1:port')
+    parser.add_argument('command', nargs='+', help='admin command with arguments')
+    args = parser.parse_args()
+
+    try:
+        answer = send_command(args.admin_address, ' '.join(args.command))
+    except OSError as ex:  # server is not running or admin socket is disabled
+        print(f'Admin socket {args.admin_address} is not available: {ex}', file=sys.stderr)
+        sys.exit(1)
+    print(answer)
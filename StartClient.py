@@ -1,23 +1,84 @@
+import argparse
 import os
-import socket
+import sys
+import time
 
 from Client.ClientEventLoops import ClientEventLoop
-from src.MessageHandlers import ClientMessageHandler
+from Client.Queues import ResultCache
+from Client.ScriptRunner import ScriptRunner
+from src.ClientRequests import Task
+from src.Tracing import tracer
+from src.Transport import create_client_handler, create_socket, parse_address
 
 if __name__ == '__main__':
-    os.system("title " + "Client Window (input commands)")  # set windows title as "Client Window (input commands)"
+    start_time = time.perf_counter()  # start of client, the startup phases are measured from it
+    parser = argparse.ArgumentParser(description='Task client')
+    parser.add_argument('--server', default='tcp://127.0.0.1:12345',
+                        help='address of server: tcp://ip:port or unix://path')
+    parser.add_argument('--result-window', default='tcp://127.0.0.1:12346',
+                        help='address of result window: tcp://ip:port, unix://path or shm://name')
+    parser.add_argument('--script', default=None,
+                        help='file with commands (one command per line, "-" - stdin). The commands are sent '
+                             'without result window, the results are written to the output file')
+    parser.add_argument('--output', default='results.txt', help='file for results of script, "-" - stdout')
+    parser.add_argument('--max-in-flight', type=int, default=1024,
+                        help='maximum count of requests of script waiting for response')
+    parser.add_argument('--trace-sample-rate', type=float, default=tracer.sample_rate,
+                        help='part of requests from 0 to 1, which are traced')
+    parser.add_argument('--trace-file', default=None, help='file to export traces as JSON lines on exit')
+    parser.add_argument('--startup-report', action='store_true',
+                        help='print time of startup phases (server connected, result window ready, first command) '
+                             'on exit')
+    parser.add_argument('--cache-size', type=int, default=64, help='memory limit of result cache, MB')
+    parser.add_argument('--cache-dir', default=None, help='directory for disk backing of result cache')
+    parser.add_argument('--request-timeout', type=float, default=10.0, help='time of waiting for response, s')
+    parser.add_argument('--retries', type=int, default=3, help='retries of status, result and identifiers requests')
+    parser.add_argument('--max-waiting', type=int, default=10000, help='maximum count of requests waiting for response')
+    parser.add_argument('--batch-timeout', type=float, default=300.0,
+                        help='time of waiting for result in batch processing mode, s')
+    parser.add_argument('--max-upload-size', type=float, default=1024,
+                        help='maximum size of file uploaded by "task ... -f path", MB. 0 - no limit')
+    args = parser.parse_args()
+    tracer.sample_rate = args.trace_sample_rate  # set trace sampling
+    Task.max_upload_size = int(args.max_upload_size * 1024 * 1024) if args.max_upload_size > 0 else None
+
+    server_scheme, server_address = parse_address(args.server)  # INPUT SERVER ADDRESS
+    if server_scheme == 'shm':
+        parser.error('shared memory is available only for result window')
+    client_socket = create_socket(server_scheme)  # create socket for server
 
-    client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)  # create socket for server
-    result_window_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)  # create socket for result window
+    if args.script is not None:  # non-interactive mode
+        script = sys.stdin if args.script == '-' else open(args.script, encoding='utf-8')
+        output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+        runner = ScriptRunner(client_socket, server_address, script, output, max_in_flight=args.max_in_flight,
+                              timeout=args.request_timeout)
+        runner.connect(n_max=10)
+        if not runner.is_connected:
+            sys.exit(f"Can't connect to {args.server}")
+        report = runner.run()
+        for file in (script, output):
+            if file not in (sys.stdin, sys.stdout):
+                file.close()
+        print(f'{report["commands"]} commands, {report["responses"]} responses, {report["errors"]} errors, '
+              f'{report["parse_errors"]} parse errors in {report["elapsed"]:.2f} s', file=sys.stderr)
+        sys.exit(0)
 
-    server_address = ('127.0.0.1', 12345)  # INPUT SERVER ADDRESS
-    result_window_address = ('127.0.0.1', 12346)  # INPUT RESULT WINDOW ADDRESS
+    os.system("title " + "Client Window (input commands)")  # set windows title as "Client Window (input commands)"
 
     # create sender of messages to result window
-    result_window_sender = ClientMessageHandler(result_window_socket, result_window_address)
+    result_window_sender = create_client_handler(args.result_window)  # INPUT RESULT WINDOW ADDRESS
     # create client
-    client = ClientEventLoop(client_socket, server_address, result_window_sender, is_start_result_window=True)
+    result_cache = ResultCache(args.cache_size * 1024 * 1024, args.cache_dir)  # create cache of results
+    client = ClientEventLoop(client_socket, server_address, result_window_sender, is_start_result_window=True,
+                             result_cache=result_cache, start_time=start_time, request_timeout=args.request_timeout,
+                             max_retries=args.retries, max_waiting=args.max_waiting, batch_timeout=args.batch_timeout)
     # try to connect to server as many times as needed
     client.connect(n_max=None)
     # start main event loop after connection with server
     client.run()
+    if args.startup_report:  # print startup phases
+        for phase, seconds in client.startup.items():
+            print(f'{phase}: {seconds * 1000:.1f} ms')
+    if args.trace_file is not None:  # export traces
+        with open(args.trace_file, 'w') as file:
+            tracer.export(file)
@@ -0,0 +1,26 @@
+import argparse
+
+from Client.LoadGenerator import LoadGenerator, command_templates, default_mix, format_report, dump_report
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Headless load generator for the task server')
+    parser.add_argument('--ip', default='127.0.0.1', help='server ip')
+    parser.add_argument('--port', type=int, default=12345, help='server port')
+    parser.add_argument('--connections', type=int, default=10, help='count of concurrent connections')
+    parser.add_argument('--duration', type=float, default=10.0, help='duration of load, s')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='total target rate, operations/s (open loop). Without rate - closed loop')
+    parser.add_argument('--mix', default=default_mix,
+                        help='weights of commands: ' + ', '.join(command_templates) + f'. Default: {default_mix}')
+    parser.add_argument('--data-size', type=int, default=16, help='length of task data')
+    parser.add_argument('--timeout', type=float, default=10.0,
+                        help='time to wait for responses after the end of load, s')
+    parser.add_argument('--json', default=None, help='file to write report as JSON')
+    args = parser.parse_args()
+
+    generator = LoadGenerator((args.ip, args.port), args.connections, args.duration, args.rate, args.mix,
+                              args.data_size, args.timeout)
+    report = generator.run()
+    print(format_report(report))
+    if args.json is not None:
+        dump_report(report, args.json)
@@ -0,0 +1,25 @@
+import argparse
+
+from Client.Replay import Replayer, dump_report, format_report
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Replay of traffic captured by StartServer.py --capture-file with check of responses')
+    parser.add_argument('capture_file', help='capture log, gzip compressed if the path ends with .gz')
+    parser.add_argument('--server', default='tcp://127.0.0.1:12345',
+                        help='server address: tcp://ip:port or unix://path')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='speed of replay relative to capture: 1 - original pace, 10 - 10 times faster, '
+                             '0 - as fast as possible')
+    parser.add_argument('--max-in-flight', type=int, default=1024,
+                        help='maximum count of requests without response in all connections')
+    parser.add_argument('--timeout', type=float, default=30.0,
+                        help='time to wait for responses after the last request, s')
+    parser.add_argument('--json', default=None, help='file to write report as JSON')
+    args = parser.parse_args()
+
+    replayer = Replayer(args.capture_file, args.server, args.speed, args.max_in_flight, args.timeout)
+    report = replayer.run()
+    print(format_report(report))
+    if args.json is not None:
+        dump_report(report, args.json)
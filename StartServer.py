@@ -1,10 +1,75 @@
+import argparse
 import os
 
+from Server.Admin import AdminServer
 from Server.ServerEventLoops import MainServer, UserEventLoop
 from Server.Worker import worker
+from src.Capture import TrafficCapture
+from src.LogSink import levels, log_sink
+from src.Metrics import start_http_server
+from src.Tracing import tracer
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Task server')
+    parser.add_argument('--address', default='tcp://0.0.0.0:12345',
+                        help='address to listen: tcp://ip:port or unix://path')
+    parser.add_argument('--backlog', type=int, default=1024, help='size of queue of not accepted connections')
+    parser.add_argument('--max-connections', type=int, default=None,
+                        help='maximum count of open connections, the next ones are rejected')
+    parser.add_argument('--max-connections-per-ip', type=int, default=None,
+                        help='maximum count of open connections from one ip address')
+    parser.add_argument('--orphan-policy', choices=worker.orphan_policies, default=worker.orphan_policy,
+                        help='what to do with tasks of disconnected clients')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='port of local HTTP listener of metrics in Prometheus format (GET /metrics) '
+                             'and traces as JSON lines (GET /traces)')
+    parser.add_argument('--trace-sample-rate', type=float, default=tracer.sample_rate,
+                        help='part of requests from 0 to 1, which are traced if client does not trace them')
+    parser.add_argument('--trace-file', default=None, help='file to export traces as JSON lines on exit')
+    parser.add_argument('--max-upload-size', type=float, default=1024,
+                        help='maximum size of task data uploaded from file, MB. 0 - no limit')
+    parser.add_argument('--upload-spool-size', type=float, default=16,
+                        help='uploaded data larger than this size is kept in temporary file, MB')
+    parser.add_argument('--max-uploads-per-connection', type=int, default=4,
+                        help='maximum count of not finished uploads of one connection')
+    parser.add_argument('--upload-timeout', type=float, default=60.0,
+                        help='not finished upload is removed after this time without chunks, s')
+    parser.add_argument('--admin-address', default=None,
+                        help='local control socket for profiling and stack dumps (see StartAdmin.py): '
+                             'unix://path or tcp://127.0.0.1:port. Disabled by default')
+    parser.add_argument('--capture-file', default=None,
+                        help='record requests and responses of clients to binary log for StartReplay.py, '
+                             'gzip compressed if the path ends with .gz')
+    parser.add_argument('--log-level', choices=levels.keys(), default='info', help='minimum level of log messages')
+    args = parser.parse_args()
+
     os.system("title " + "Server Window")  # set windows title as "Server Window"
+    worker.orphan_policy = args.orphan_policy  # set orphan policy
+    if args.metrics_port is not None:  # start metrics listener if it is needed
+        start_http_server(args.metrics_port)
+    tracer.sample_rate = args.trace_sample_rate  # set trace sampling
+    log_sink.set_level(args.log_level)  # set log level
     server = MainServer(UserEventLoop)  # create server
     server.set_worker(worker)  # set worker in server
-    server.run('0.0.0.0', 12345)  # start server
+    server.listen = args.backlog  # set size of backlog
+    server.max_connections = args.max_connections  # set limits of connections
+    server.max_connections_per_ip = args.max_connections_per_ip
+    server.max_upload_size = int(args.max_upload_size * 1024 * 1024) if args.max_upload_size > 0 else None
+    server.upload_spool_size = int(args.upload_spool_size * 1024 * 1024)
+    server.max_uploads_per_connection = args.max_uploads_per_connection
+    server.upload_timeout = args.upload_timeout
+    if args.capture_file is not None:  # start traffic capture
+        server.capture = TrafficCapture(args.capture_file)
+    admin = AdminServer(args.admin_address, server) if args.admin_address is not None else None
+    if admin is not None:  # start control socket
+        admin.start()
+    try:
+        server.run_address(args.address)  # start server
+    finally:
+        if admin is not None:
+            admin.stop()
+        if server.capture is not None:  # flush traffic capture
+            server.capture.close()
+    if args.trace_file is not None:  # export traces
+        with open(args.trace_file, 'w') as file:
+            tracer.export(file)
@@ -0,0 +1,28 @@
+import argparse
+import json
+from collections import defaultdict
+
+from src.Tracing import breakdown
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Per-request latency breakdown of exported traces')
+    parser.add_argument('trace_file', help='file with traces as JSON lines')
+    parser.add_argument('--summary', action='store_true', help='show mean time between hops instead of every trace')
+    args = parser.parse_args()
+
+    with open(args.trace_file) as file:
+        traces = [json.loads(line) for line in file if line.strip()]
+
+    if not args.summary:  # show every trace
+        for trace in traces:
+            print('\n'.join(breakdown(trace)))
+    else:  # show mean time between consecutive hops for every command
+        durations = defaultdict(list)  # Dict[(command, previous hop, hop): [duration, ...]]
+        for trace in traces:
+            hops = trace['hops']
+            for (previous_name, previous_time), (name, timestamp) in zip(hops, hops[1:]):
+                durations[(trace['command'], previous_name, name)].append(timestamp - previous_time)
+        for (command, previous_name, name), values in durations.items():
+            print(f'{command}: {previous_name} -> {name}: '
+                  f'mean {sum(values) / len(values) * 1000:.3f} ms, max {max(values) * 1000:.3f} ms, count {len(values)}')
@@ -0,0 +1,105 @@
+"""
+Capture of server traffic to binary log and reading of the log for replay (see Client/Replay.py).
+The log starts with the magic bytes and contains records:
+    header: time since the start of capture (double, s), connection id (uint32), kind (uint8), length (uint32)
+    payload: message without the end of message (JSON list) or address of connection for kind 'open'
+The messages are written as they are received and sent, so the capture doesn't decode them again.
+The log is compressed by gzip, if its path ends with .gz
+"""
+from __future__ import annotations
+
+import gzip
+import struct
+import time
+from threading import Lock
+from typing import BinaryIO, Iterator, Tuple
+
+from src.Metrics import metrics
+
+
+captured_bytes = metrics.counter('captured_bytes_total', 'Bytes of messages written to traffic capture', 'kind')
+
+magic: bytes = b'TSTCAP1\n'  # first bytes of capture log
+header: struct.Struct = struct.Struct('<dIBI')  # time, connection id, kind, length of payload
+kinds: tuple = ('open', 'close', 'request', 'response',)  # kinds of records, the index is written to the log
+OPEN, CLOSE, REQUEST, RESPONSE = range(len(kinds))
+
+
+def open_log(path: str, mode: str) -> BinaryIO:
+    """open capture log for binary reading or writing, gzip if path ends with .gz"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 'b', compresslevel=1)  # fast compression, capture must not slow down server
+    return open(path, mode + 'b', buffering=1024 * 1024)
+
+
+class TrafficCapture:
+    """
+    Writer of capture log. It is shared by all event loops of server, the records are written under lock
+    to the buffered file, so the event loops are not blocked by disk
+    """
+    def __init__(self, path: str):
+        """
+        :param path: path of capture log
+        """
+        self.path: str = path  # path of capture log
+        self.file: BinaryIO = open_log(path, 'w')  # capture log
+        self.file.write(magic)
+        self.lock: Lock = Lock()  # guards file and connection counter
+        self.start_time: float = time.perf_counter()  # time of the first record
+        self.connection_counter: int = 0  # counter of connection ids
+
+    def write(self, connection: int, kind: int, payload: bytes):
+        """
+        write record
+        :param connection: connection id from open_connection
+        :param kind: OPEN, CLOSE, REQUEST or RESPONSE
+        :param payload: message without the end of message
+        """
+        with self.lock:
+            if self.file is None:  # capture is closed
+                return
+            self.file.write(header.pack(time.perf_counter() - self.start_time, connection, kind, len(payload)))
+            self.file.write(payload)
+        captured_bytes.inc(header.size + len(payload), kinds[kind])
+
+    def open_connection(self, address: str) -> int:
+        """
+        write record of new connection
+        :param address: address of client
+        :return: connection id
+        """
+        with self.lock:
+            self.connection_counter += 1
+            connection = self.connection_counter
+        self.write(connection, OPEN, address.encode('utf-8'))
+        return connection
+
+    def close(self):
+        """flush and close capture log"""
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def read_log(path: str) -> Iterator[Tuple[float, int, int, bytes]]:
+    """
+    read records of capture log one by one
+    :param path: path of capture log
+    :return: iterator of (time, connection id, kind, payload)
+    """
+    with open_log(path, 'r') as file:
+        if file.read(len(magic)) != magic:
+            raise ValueError(f'ValueError. {path} is not traffic capture log')
+        while True:
+            try:
+                data = file.read(header.size)
+                if len(data) < header.size:  # end of log, the last record can be cut, if server was killed
+                    return
+                timestamp, connection, kind, length = header.unpack(data)
+                payload = file.read(length)
+            except EOFError:  # compressed log is cut, if server was killed
+                return
+            if len(payload) < length:
+                return
+            yield timestamp, connection, kind, payload
@@ -1,15 +1,23 @@
 from __future__ import annotations
 
+import os
 import re
 from json import dumps, loads
-from typing import TYPE_CHECKING, Union
-from src.Exceptions import CommandNotFound, IdentifierNotFound, TaskTypeNotFound, BatchProcessingTaskIdentifierNotFound
+from typing import TYPE_CHECKING, Iterator, Union, List
+from src.Exceptions import CommandNotFound, IdentifierNotFound, TaskTypeNotFound, BatchProcessingTaskIdentifierNotFound, \
+    UploadTooLarge
 
 if TYPE_CHECKING:
     from Client.ClientEventLoops import ClientEventLoop
     from Server.ServerEventLoops import UserEventLoop
 
 
+# parsers of user input are compiled once. The command and the task type are checked before by split(),
+# so they are matched as any word
+command_prefix = re.compile(r'^\s*\S+\s+')  # command and spaces after it
+task_prefix = re.compile(r'^\s*\S+\s+\S+\s+(-b\s+|)(-d\s+(\S*)\s+|)')  # command, task type and options
+identifier_separator = re.compile(r'[\s,]+')  # separator of identifiers in cancel request
+
 
 class BaseRequest:
     """
@@ -19,17 +27,20 @@ class BaseRequest:
                  event_handler: Union[ClientEventLoop, UserEventLoop],
                  request_identifier_on_client: int,
                  command: str,
-                 error: str):
+                 error: str,
+                 trace: dict = None):
         """
         :param event_handler: event loop class on server or client side
         :param request_identifier_on_client: registered identifier of request on client side
         :param command: request type
         :param error: error occurred when creating the request
+        :param trace: trace context of request (see src.Tracing), None - request is not traced
         """
         self.event_handler: Union[ClientEventLoop, UserEventLoop] = event_handler
         self.request_identifier_on_client: int = request_identifier_on_client
         self.command: str = command
         self.error: str = error
+        self.trace: dict = trace
 
     def __str__(self) -> str:
         """string representation of request (user input form)"""
@@ -41,7 +52,8 @@ class BaseRequest:
         serialization message to json and then encode to the bytes
         :param value: list of all parameters
         """
-        return (dumps(value) + 'endofmsg').encode('utf-8')
+        # the end of message can be only inside json string, where the escaped symbol has the same meaning
+        return (dumps(value).replace('endofmsg', 'endofms\\u0067') + 'endofmsg').encode('utf-8')
 
     @classmethod
     def loads(cls, value: bytes) -> tuple:
@@ -67,6 +79,10 @@ class BaseRequest:
         """serialization of self to list"""
         return bytes()
 
+    def iter_dumps(self) -> Iterator[bytes]:
+        """messages of request, which are sent one after another. Request is one message, if it doesn't upload data"""
+        yield self.dumps()
+
 
 class StatusAndResult(BaseRequest):
     """Base class for status and result request"""
@@ -76,11 +92,12 @@ class StatusAndResult(BaseRequest):
                  request_identifier_on_client: int,
                  command: str,
                  error: str,
-                 identifier: int):
+                 identifier: int,
+                 trace: dict = None):
         """
         :param identifier: identifier of task
         """
-        super(StatusAndResult, self).__init__(event_handler, request_identifier_on_client, command, error)
+        super(StatusAndResult, self).__init__(event_handler, request_identifier_on_client, command, error, trace)
         self.identifier: int = identifier  # identifier of requested status  or result
 
     def __str__(self) -> str:
@@ -104,7 +121,7 @@ class StatusAndResult(BaseRequest):
                 raise BatchProcessingTaskIdentifierNotFound()
         # get identifier from user input if batch processing mode is False
         else:
-            re_obj = re.search(f'^\s*{command}\s\s*', user_input)
+            re_obj = command_prefix.search(user_input)
             if re_obj is None:
                 raise IdentifierNotFound(None)
             identifier = user_input[re_obj.end():]
@@ -118,7 +135,8 @@ class StatusAndResult(BaseRequest):
 
     def dumps(self) -> bytes:
         self.result: property
-        return self.dump([self.request_identifier_on_client, self.command, self.error, self.identifier, self.result])
+        return self.dump([self.request_identifier_on_client, self.command, self.error, self.identifier, self.result,
+                          self.trace])
 
 
 class StatusRequest(StatusAndResult):
@@ -129,12 +147,13 @@ class StatusRequest(StatusAndResult):
                  command: str,
                  error: str,
                  identifier: int,
-                 result: str
+                 result: str,
+                 trace: dict = None
                  ):
         """
         :param result: status of task
         """
-        super(StatusRequest, self).__init__(event_handler, request_identifier_on_client, command, error, identifier)
+        super(StatusRequest, self).__init__(event_handler, request_identifier_on_client, command, error, identifier, trace)
         self.result = result  # is the descriptor of _status
 
     @property
@@ -155,12 +174,13 @@ class ResultRequest(StatusAndResult):
                  command: str,
                  error: str,
                  identifier: int,
-                 result: str
+                 result: str,
+                 trace: dict = None
                  ):
         """
         :param result: result of task
         """
-        super(ResultRequest, self).__init__(event_handler, request_identifier_on_client, command, error, identifier)
+        super(ResultRequest, self).__init__(event_handler, request_identifier_on_client, command, error, identifier, trace)
         self.result = result  # is the descriptor of _result
 
     @property
@@ -173,29 +193,88 @@ class ResultRequest(StatusAndResult):
         self._result = value
 
 
+class CancelRequest(BaseRequest):
+    """
+    Cancel request class. One request can cancel several tasks: cancel 1 2 3
+    """
+    def __init__(self,
+                 event_handler: ClientEventLoop,
+                 request_identifier_on_client: int,
+                 command: str,
+                 error: str,
+                 identifier: List[int],
+                 result: List[list],
+                 trace: dict = None
+                 ):
+        """
+        :param identifier: identifiers of tasks to cancel
+        :param result: list of pairs [identifier, status of task after cancellation]
+        """
+        super(CancelRequest, self).__init__(event_handler, request_identifier_on_client, command, error, trace)
+        self.identifier: List[int] = identifier  # identifiers of tasks to cancel
+        self.result = result  # is the descriptor of _statuses
+
+    @property
+    def result(self) -> List[list]:
+        """statuses of tasks after cancellation"""
+        return self._statuses
+    @result.setter
+    def result(self, value):
+        """statuses of tasks after cancellation"""
+        self._statuses = value
+
+    def __str__(self) -> str:
+        return str(self.command) + ' ' + ' '.join(str(i) for i in self.identifier)
+
+    def show_result(self) -> str:
+        if self.error is not None:
+            return str(self.error)
+        return str(self.command) + ': ' + ', '.join(f'{identifier}: {status}' for identifier, status in self.result)
+
+    def dumps(self) -> bytes:
+        return self.dump([self.request_identifier_on_client, self.command, self.error, self.identifier, self.result,
+                          self.trace])
+
+    @classmethod
+    def get_data_from_str(cls, event_handler, command: str, user_input: str) -> tuple:
+        request_identifier_on_client: int = super().get_data_from_str(event_handler, command, user_input)
+        error = None
+        result = None
+        re_obj = command_prefix.search(user_input)
+        if re_obj is None:
+            raise IdentifierNotFound(None)
+        try:  # identifiers are separated by spaces or commas
+            identifier = [int(i) for i in identifier_separator.split(user_input[re_obj.end():].strip())]
+        except ValueError:
+            raise ValueError('ValueError. Identifier must be integer')
+
+        return event_handler, request_identifier_on_client, command, error, identifier, result
+
+
 class InfoRequest(BaseRequest):
     """
-    Class for requests: help, identifiers
+    Class for requests: help, identifiers, stats, instance
     """
     def __init__(self,
                  event_handler: ClientEventLoop,
                  request_identifier_on_client: int,
                  command: str,
                  error: str,
-                 result: str):
+                 result: str,
+                 trace: dict = None):
         """
-        :param result: help or identifiers
+        :param result: help, identifiers, stats or identifier of server instance
         """
-        super(InfoRequest, self).__init__(event_handler, request_identifier_on_client, command, error)
+        super(InfoRequest, self).__init__(event_handler, request_identifier_on_client, command, error, trace)
         self.result = result
 
     @property
     def result(self) -> str:
-        """help or identifiers"""
+        """help, identifiers or stats"""
         return self._info
     @result.setter
     def result(self, value):
-        """help or identifiers"""
+        """help, identifiers or stats"""
         self._info = value
 
     def show_result(self) -> str:
@@ -203,7 +282,7 @@ class InfoRequest(BaseRequest):
         return string
 
     def dumps(self) -> bytes:
-        return self.dump([self.request_identifier_on_client, self.command, self.error, self.result])
+        return self.dump([self.request_identifier_on_client, self.command, self.error, self.result, self.trace])
 
     @classmethod
     def get_data_from_str(cls, event_handler, command: str, user_input: str) -> tuple:
@@ -214,11 +293,47 @@ class InfoRequest(BaseRequest):
 
 
 
+class UploadChunk(BaseRequest):
+    """
+    Chunk of data of task, which is uploaded from file. Chunks are sent before the task and have no response.
+    The identifier of upload is the identifier of task request on client
+    """
+    def __init__(self,
+                 event_handler: Union[ClientEventLoop, UserEventLoop],
+                 request_identifier_on_client: int,
+                 command: str,
+                 error: str,
+                 size: int,
+                 data: str,
+                 trace: dict = None):
+        """
+        :param event_handler: event loop class on server or client side
+        :param request_identifier_on_client: identifier of upload (identifier of task request on client)
+        :param command: request type
+        :param error: error occurred when creating the request
+        :param size: size of file, bytes. Server rejects upload early, if it is larger than limit
+        :param data: chunk of data
+        :param trace: trace context of request (see src.Tracing), None - request is not traced
+        """
+        super(UploadChunk, self).__init__(event_handler, request_identifier_on_client, command, error, trace)
+        self.size: int = size
+        self.data: str = data
+
+    def dumps(self) -> bytes:
+        return self.dump([self.request_identifier_on_client, self.command, self.error, self.size, self.data,
+                          self.trace])
+
+
 class Task(BaseRequest):
     """
     Class for task. Task type can be: --symbol_repeat, --pair_permutation, --reverse
+    or pipeline of them, for example --reverse|--pair_permutation.
+    Data of task can be uploaded from file (task --reverse -f path): the file is sent by chunks before the task
     """
     task_types: tuple = ('--symbol_repeat', '--pair_permutation', '--reverse',)
+    max_stages: int = 16  # maximum count of stages of pipeline
+    upload_chunk_size: int = 256 * 1024  # count of symbols in one chunk of uploaded file
+    max_upload_size: int = None  # maximum size of uploaded file on client side, bytes. None - no limit
     def __init__(self,
                  event_handler: ClientEventLoop,
                  request_identifier_on_client: int,
@@ -228,31 +343,43 @@ class Task(BaseRequest):
                  is_batch_processing_mode: bool,
                  request_identifier_on_result: int,
                  data: str,
-                 result: str):
+                 result: str,
+                 deadline: float = None,
+                 trace: dict = None,
+                 upload: int = None,
+                 upload_path: str = None):
         """
         :param event_handler: event loop class on server or client side
         :param request_identifier_on_client: registered identifier of request on client side
         :param command: request type
         :param error: error occurred when creating the request
-        :param task_type: type of task: --symbol_repeat, --pair_permutation, --reverse
+        :param task_type: type of task: --symbol_repeat, --pair_permutation, --reverse or pipeline of them
         :param is_batch_processing_mode: is activated or not
         :param request_identifier_on_result: registered identifier of response with result
         :param data: user input data for task
         :param result: identifier on the server side
+        :param deadline: seconds after submission, when the task is expired if it is not done. None - no deadline
+        :param trace: trace context of request (see src.Tracing), None - request is not traced
+        :param upload: identifier of upload with data of task, None - data is in the request
+        :param upload_path: path of uploaded file on client side
         """
-        super(Task, self).__init__(event_handler, request_identifier_on_client, command, error)
+        super(Task, self).__init__(event_handler, request_identifier_on_client, command, error, trace)
         self.task_type: str = task_type
         self.is_batch_processing_mode: bool = is_batch_processing_mode
         self.request_identifier_on_result: int = request_identifier_on_result
         self.data: str = data
         self.result: int = result
+        self.deadline: float = deadline
+        self.upload: int = upload
+        self.upload_path: str = upload_path
 
 
     def __str__(self) -> str:
         string = str(self.command) + ' ' + \
                  str(self.task_type) + ' ' + \
                  ('-b ' if self.is_batch_processing_mode else '') + \
-                 str(self.data)
+                 ('-d ' + str(self.deadline) + ' ' if self.deadline is not None else '') + \
+                 ('-f ' + str(self.upload_path) if self.upload_path is not None else str(self.data))
         return string
 
     def generate_result_request(self) -> ResultRequest:
@@ -276,24 +403,70 @@ class Task(BaseRequest):
     def dumps(self) -> bytes:
         return self.dump(
             [self.request_identifier_on_client, self.command, self.error, self.task_type,
-             self.is_batch_processing_mode, self.request_identifier_on_result, self.data, self.result]
+             self.is_batch_processing_mode, self.request_identifier_on_result, self.data, self.result, self.deadline,
+             self.trace, self.upload]
         )
 
+    def iter_dumps(self) -> Iterator[bytes]:
+        """
+        messages of task: chunks of uploaded file and then the task.
+        The file is read by chunks, so only one chunk is in memory
+        """
+        if self.upload_path is not None:
+            size = os.path.getsize(self.upload_path)
+            # not utf-8 bytes are read as lone surrogates U+DC80..U+DCFF (surrogateescape). The server stores
+            # them by surrogatepass as any lone surrogate of task data, so they stay code points, not the original bytes
+            with open(self.upload_path, 'r', encoding='utf-8', errors='surrogateescape', newline='') as file:
+                while True:
+                    chunk = file.read(self.upload_chunk_size)
+                    if not chunk:
+                        break
+                    yield UploadChunk(self.event_handler, self.upload, 'upload', None, size, chunk).dumps()
+        yield self.dumps()
+
+    @classmethod
+    def check_upload(cls, path: str) -> int:
+        """
+        check file, which is uploaded as data of task
+        :param path: path of file
+        :return: size of file, bytes
+        """
+        try:
+            size = os.path.getsize(path)
+        except OSError as ex:
+            raise ValueError(f"ValueError. Can't read file {path}: {ex.strerror}")
+        if cls.max_upload_size is not None and size > cls.max_upload_size:
+            raise UploadTooLarge(size, cls.max_upload_size)
+        return size
+
+    @classmethod
+    def check_task_type(cls, task_type: str) -> str:
+        """
+        check task type or pipeline of task types
+        :param task_type: for example --reverse or --reverse|--pair_permutation
+        :return: checked task type
+        """
+        stages = task_type.split('|')
+        for stage in stages:
+            if stage not in cls.task_types:
+                raise TaskTypeNotFound(stage)
+        if len(stages) > cls.max_stages:
+            raise ValueError(f'ValueError. Pipeline can contain not more than {cls.max_stages} stages')
+        return task_type
+
     @classmethod
     def get_data_from_str(cls, event_handler, command: str, user_input: str) -> list:
         request_identifier_on_client: int = super().get_data_from_str(event_handler, command, user_input)
         request_identifier_on_result: int = None
         user_input_split: list = user_input.split()
         result = None
-        error, data, task_type = None, None, None
+        error, data, task_type, deadline = None, None, None, None
         is_batch_processing_mode = False
 
         # seek for task type
         if len(user_input_split) < 2:
             raise TaskTypeNotFound(None)
-        task_type = user_input_split[1]
-        if task_type not in cls.task_types:
-            raise TaskTypeNotFound(task_type)
+        task_type = cls.check_task_type(user_input_split[1])
 
         # seek for batch processing mode
         if len(user_input_split) >= 3:
@@ -302,18 +475,37 @@ class Task(BaseRequest):
                 request_identifier_on_result: int = super().get_data_from_str(event_handler, command, user_input)
 
         # seek for data
-        re_obj = re.search(f'^\s*{command}\s\s*{task_type}\s\s*(-b\s\s*|)', user_input)
+        re_obj = task_prefix.search(user_input)
         if re_obj is None:
             raise ValueError('ValueError. The data for task is not correct')
         else:
             data = user_input[re_obj.end():]
+
+        # seek for uploaded file
+        upload, upload_path = None, None
+        if data == '-f' or data.startswith('-f '):
+            upload_path = data[2:].strip()
+            if not upload_path:
+                raise ValueError('ValueError. Path of file must be after -f')
+            cls.check_upload(upload_path)
+            upload, data = request_identifier_on_client, None
+
+        # seek for deadline
+        if re_obj.group(3) is not None:
+            try:
+                deadline = float(re_obj.group(3))
+            except ValueError:
+                raise ValueError('ValueError. Deadline must be number of seconds')
+            if deadline <= 0:
+                raise ValueError('ValueError. Deadline must be positive')
         return event_handler, request_identifier_on_client, command, error, \
-               task_type, is_batch_processing_mode, request_identifier_on_result, data, result
+               task_type, is_batch_processing_mode, request_identifier_on_result, data, result, deadline, None, \
+               upload, upload_path
 
 
 commands = {'status': StatusRequest, 'result': ResultRequest,
-            'help': InfoRequest, 'identifiers': InfoRequest,
-            'task': Task}
+            'help': InfoRequest, 'identifiers': InfoRequest, 'stats': InfoRequest, 'instance': InfoRequest,
+            'task': Task, 'cancel': CancelRequest}
 
 
 def create_request(user_input: str, event_handler: ClientEventLoop) -> \
@@ -50,3 +50,96 @@ class BatchProcessingTaskIdentifierNotFound(Exception):
     """
     def __init__(self):
         super().__init__(f'Task identifier of batch processing mode not found.')
+
+
+class TaskNotCompleted(Exception):
+    """
+    Exception raised when the task was stopped before completion (cancelled or expired).
+    """
+    def __init__(self, identifier, status: str):
+        """
+        *identifier* is the identifier of the task
+        *status* is the final status of the task
+        """
+        super().__init__(f'Task "{identifier}" is not completed. Status: {status}')
+
+
+class ResponseError(Exception):
+    """
+    Exception raised when the server responded with error.
+    """
+    def __init__(self, error: str):
+        """*error* is the error of the response"""
+        super().__init__(error)
+
+
+class RequestTimeout(Exception):
+    """
+    Exception raised when there is no response to the request in time.
+    """
+    def __init__(self, request: str, timeout: float, attempts: int = 1):
+        """
+        *request* is the request which was not answered
+        *timeout* is the time of waiting for the response, s
+        *attempts* is the count of sent attempts
+        """
+        super().__init__(f'No response to "{request}" in {timeout} s (attempts: {attempts})')
+
+
+class WaitTableOverflow(Exception):
+    """
+    Exception raised when too many requests are waiting for response.
+    """
+    def __init__(self, limit: int):
+        """*limit* is the maximum count of requests waiting for response"""
+        super().__init__(f'Too many requests are waiting for response (limit {limit}). '
+                         f'Please wait for responses and try again')
+
+
+class UploadTooLarge(Exception):
+    """
+    Exception raised when the uploaded data of task is larger than the limit.
+    """
+    def __init__(self, size: int, limit: int):
+        """
+        *size* is the size of uploaded data, bytes
+        *limit* is the maximum size of uploaded data, bytes
+        """
+        super().__init__(f'Uploaded data is too large: {size} bytes (limit {limit} bytes)')
+
+
+class UploadIncomplete(Exception):
+    """
+    Exception raised when the task refers to the upload, which is not received completely.
+    """
+    def __init__(self, received: int, size: int):
+        """
+        *received* is the count of received bytes
+        *size* is the declared size of upload, bytes
+        """
+        super().__init__(f'Uploaded data is not complete: {received} of {size} bytes received')
+
+
+class UploadAborted(Exception):
+    """
+    Exception raised on client when the file of task can't be read or sent, the task is not sent.
+    """
+    def __init__(self, path: str, reason: Exception):
+        """
+        *path* is the path of uploaded file
+        *reason* is the error of reading or sending
+        """
+        super().__init__(f'Upload of file {path} is aborted, task is not sent: {reason}')
+
+
+class ServerBusy(Exception):
+    """
+    Exception raised when the server rejects the connection because of connection limit.
+    """
+    def __init__(self, reason: str, limit: int):
+        """
+        *reason* is the exceeded limit: max_connections or max_connections_per_ip
+        *limit* is the value of the limit
+        """
+        what = 'connections' if reason == 'max_connections' else 'connections from your address'
+        super().__init__(f'Server is busy: too many {what} (limit {limit}). Please try again later')
@@ -0,0 +1,145 @@
+"""
+Asynchronous logging.
+Threads of event loops only put the record in bounded queue, the writer thread formats records and writes them
+by batches. If the queue is full, the record is dropped and counted, so slow terminal doesn't stall event loops.
+"""
+from __future__ import annotations
+
+import sys
+import time
+from queue import Queue, Empty, Full
+from threading import Lock, Thread
+from typing import List, TextIO, Union
+
+from src.Metrics import metrics
+
+
+levels: dict = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}  # Dict[level name: severity]
+
+dropped_records = metrics.counter('log_records_dropped_total', 'Log records dropped because log queue is full')
+
+
+class LogSink:
+    """
+    Queue of log records and writer thread.
+    Record is the tuple (timestamp, level, message parts, fields), it is formatted by writer thread:
+    2024-01-01 12:00:00.000 ERROR message key=value key=value
+    """
+    def __init__(self, stream: TextIO = None, level: str = 'info', capacity: int = 10000, batch_size: int = 256):
+        """
+        :param stream: output stream, sys.stdout by default
+        :param level: minimum level of written records
+        :param capacity: maximum count of records in queue
+        :param batch_size: maximum count of records written by one write
+        """
+        self.stream: TextIO = stream  # output stream, None - current sys.stdout
+        self.level: int = levels[level]  # minimum severity of written records
+        self.queue: Queue = Queue(capacity)  # queue of records
+        self.batch_size: int = batch_size  # maximum count of records in one write
+        self.dropped: int = 0  # count of dropped records, which are not reported yet
+        self.lock: Lock = Lock()  # lock for dropped counter and start, is not used on hot path
+        self.thread: Union[Thread, None] = None  # writer thread
+        metrics.gauge('log_queue_length', 'Log records waiting for writing', self.queue.qsize)
+
+    def log(self, level: str, *args, **fields):
+        """
+        put record in queue, is not blocked
+        :param level: level of record: debug, info, warning or error
+        :param args: parts of message, they are joined by space
+        :param fields: structured fields of record, for example client address or request identifier
+        """
+        if levels[level] < self.level:
+            return
+        try:
+            self.queue.put_nowait((time.time(), level, args, fields))
+        except Full:  # writer falls behind, drop record
+            with self.lock:
+                self.dropped += 1
+            dropped_records.inc()
+
+    def debug(self, *args, **fields):
+        self.log('debug', *args, **fields)
+
+    def info(self, *args, **fields):
+        self.log('info', *args, **fields)
+
+    def warning(self, *args, **fields):
+        self.log('warning', *args, **fields)
+
+    def error(self, *args, **fields):
+        self.log('error', *args, **fields)
+
+    def set_level(self, level: str):
+        """
+        set minimum level of written records
+        :param level: debug, info, warning or error
+        """
+        self.level = levels[level]
+
+    @staticmethod
+    def format(record: tuple) -> str:
+        """string representation of record"""
+        timestamp, level, args, fields = record
+        line = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp)) + \
+            f'.{int(timestamp % 1 * 1000):03d} {level.upper()} ' + ' '.join(str(i) for i in args)
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        return line
+
+    def write(self, records: List[tuple]):
+        """format and write records by one write"""
+        lines = [self.format(record) for record in records]
+        with self.lock:
+            dropped, self.dropped = self.dropped, 0
+        if dropped:  # report dropped records
+            lines.append(self.format((time.time(), 'warning', (f'{dropped} log records dropped',), {})))
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write('\n'.join(lines) + '\n')
+        stream.flush()
+
+    def run(self):
+        """
+        writer thread: wait for record, take all queued records (not more than batch_size) and write them.
+        None in queue stops the thread
+        """
+        while True:
+            record = self.queue.get()
+            records = list()
+            while record is not None:
+                records.append(record)
+                if len(records) >= self.batch_size:
+                    break
+                try:
+                    record = self.queue.get_nowait()
+                except Empty:
+                    break
+            if records:
+                try:
+                    self.write(records)
+                except (OSError, ValueError):  # output is closed, records are lost
+                    pass
+            if record is None:
+                return
+
+    def start(self):
+        """start writer thread, if it is not started"""
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """
+        write queued records and stop writer thread
+        :param timeout: maximum time of waiting for writer thread, s
+        """
+        if self.thread is None or not self.thread.is_alive():
+            return
+        try:
+            self.queue.put(None, timeout=timeout)
+        except Full:
+            return
+        self.thread.join(timeout)
+
+
+log_sink = LogSink()  # log of the process
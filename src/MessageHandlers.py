@@ -6,11 +6,19 @@ import time
 from functools import wraps
 from typing import Tuple, TYPE_CHECKING, Union
 
+from src.Metrics import metrics
+
 if TYPE_CHECKING:
     from Server.ServerEventLoops import MainServer, UserEventLoop, ResultWindowEventLoop
     from Server.TCPServer import TCPServer
 
 
+bytes_received = metrics.counter('bytes_received_total', 'Bytes received from sockets')
+bytes_sent = metrics.counter('bytes_sent_total', 'Bytes sent to sockets')
+messages_received = metrics.counter('messages_received_total', 'Messages received from sockets')
+messages_sent = metrics.counter('messages_sent_total', 'Messages sent to sockets')
+
+
 class DataTransfer:
     """
     class gives methods for send and receive bytes data using socket
@@ -28,6 +36,16 @@ class DataTransfer:
         self.send_timeout: float = 5.0  # timeout to send message
         self.read_timeout: float = 5.0  # timeout to receive message
         self.loop_timeout: float = 0.1  # event loop timeout
+        self.receive_buffer: bytearray = bytearray()  # received bytes, which are not returned by read_msg yet
+        self.end_of_msg: bytes = b'endofmsg'  # special characters meaning end of message
+
+
+    def has_buffered_msg(self) -> bool:
+        """
+        is there whole message in receive buffer. Several messages can be received by one recv,
+        in this case socket is not ready to read, but read_msg returns next message without waiting
+        """
+        return self.end_of_msg in self.receive_buffer
 
 
     def read_msg(self) -> bytes:
@@ -35,8 +53,17 @@ class DataTransfer:
         function is used to read data from socket
         :return data: received bytes
         """
-        data = bytes(0)  # create empty bytes container
+        search_start = 0  # position in receive buffer, from which the end of message is searched
         while True:
+            end = self.receive_buffer.find(self.end_of_msg, search_start)
+            if end >= 0:  # there is whole message in receive buffer
+                data = bytes(self.receive_buffer[:end])  # get message without special characters
+                del self.receive_buffer[:end + len(self.end_of_msg)]  # remove message from receive buffer
+                messages_received.inc()
+                return data
+            # the end of message can be split between packages
+            search_start = max(len(self.receive_buffer) - len(self.end_of_msg) + 1, 0)
+
             ready_to_read, ready_to_write, in_error = select.select(
                 [self.client_socket], [], [], self.read_timeout)  # wait before socket will be ready to read
 
@@ -47,14 +74,8 @@ class DataTransfer:
             if not package:  # if 0 bytes received, raise ConnectionError
                 raise ConnectionError(f'Connection lost with {self.address}. 0 bytes received')
 
-            data += package  # add received data
-            try:  # check for the special characters "endofmsg" meaning end of message
-                if data[-8:].decode('utf-8') == 'endofmsg':
-                    data = data[0:-8]  # remove special characters from message
-                    break  # exit from loop
-            except UnicodeError:  # if UnicodeError, it is not end of message
-                pass  # continue loop
-        return data
+            self.receive_buffer += package  # add received data
+            bytes_received.inc(len(package))
 
 
     def send_msg(self, encoded_data: bytes) -> None:
@@ -74,12 +95,17 @@ class DataTransfer:
             if sent == 0:  # if sent 0 raise ConnectionError
                 raise ConnectionError(f"Connection lost with {self.address}. 0 bytes sent")
             total_sent = total_sent + sent  # update counter
+            bytes_sent.inc(sent)
+        messages_sent.inc()
 
 
 class ClientMessageHandler(DataTransfer):
     """
     class gives methods for client connection
     """
+    connect_backoff: float = 0.01  # first pause between tries to connect, s
+    connect_backoff_cap: float = 1.0  # maximum pause between tries to connect, s
+
     def __init__(self,
                  client_socket: socket.socket,
                  address: Tuple[str, int]):
@@ -96,6 +122,7 @@ class ClientMessageHandler(DataTransfer):
         :param n_max:  max count of tries to connect. If n_max = None then n_max is infinite
         """
         n = 0  # current connection try count
+        backoff = self.connect_backoff  # pause before next try, is doubled after every try
         if n_max is None:
             _n_max = n + 1  # private max count is always more then current connection try count
         else:
@@ -105,10 +132,11 @@ class ClientMessageHandler(DataTransfer):
             try:  # try to connect
                 self.client_socket.connect(self.address)
                 self.is_connected = True  # connection is successful
-            except ConnectionError as ex:  # if ConnectionError
+            except (ConnectionError, FileNotFoundError) as ex:  # if ConnectionError or unix socket is not created
                 if n >= _n_max:  # if current connection try count more then private max count raise connection error
                     raise ConnectionError(f"Can't connect to {self.address}. Connection error: {str(ex)}")
-                time.sleep(1)  # wait for server and try again
+                time.sleep(backoff)  # wait for server and try again
+                backoff = min(backoff * 2, self.connect_backoff_cap)
 
             n += 1  # update count
             if n_max is None:
@@ -137,21 +165,34 @@ class ServerMessageHandler(DataTransfer):
         """
         the function is the decorator of client event loop
         :param fun: event loop of client connection
-        :return: wrapped function, that remove event loop class from server
+        :return: wrapped function, that remove event loop class from server, even if the event loop fails
         """
         @wraps(fun)
         def wrapper(self: Union[UserEventLoop, ResultWindowEventLoop], *args, **kwargs):
-            fun(self, *args, **kwargs)  # call decorated function
-            self.server.sockets.remove(self)  # remove event loop class from server
+            try:
+                fun(self, *args, **kwargs)  # call decorated function
+            finally:
+                try:
+                    self.server.remove_connection(self)  # remove event loop class from server
+                finally:
+                    self.release()  # release resources of the connection
         return wrapper
 
 
-    def safe_print(self, *args, **kwargs):
+    def release(self):
+        """
+        release resources of the closed connection
+        """
+        self.client_socket.close()
+
+
+    def safe_print(self, *args, level: str = 'info', **fields):
         """
-        single thread access to print
+        put message in log of server with address of client
+        :param args: parts of message
+        :param level: level of message: debug, info, warning or error
+        :param fields: structured fields, for example request identifier
         """
-        self.server.semaphore.acquire()  # block access
-        print(*args, **kwargs)
-        self.server.semaphore.release()  # unblock access
+        self.server.safe_print(*args, level=level, client=f'{self.address[0]}:{self.address[1]}', **fields)
 
     remove_connection_decorator = staticmethod(remove_connection_decorator)  # wrap in staticmethod
@@ -0,0 +1,304 @@
+"""
+Low-overhead metrics: counters, gauges and latency histograms.
+Counters and histograms are sharded by thread: every thread writes only in its own shard without lock,
+the shards are summed up when metrics are collected.
+"""
+from __future__ import annotations
+
+import bisect
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread, current_thread, local
+from typing import Dict, List, Tuple, Union
+
+from src.Tracing import tracer
+
+
+latency_buckets: tuple = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def escape_label(label) -> str:
+    """label value as string with escaped backslash, quote and new line (Prometheus text format)"""
+    return str(label).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def sorted_items(values: dict) -> list:
+    """items of Dict[label: value] sorted by label, labels of any type are compared as strings"""
+    return sorted(values.items(), key=lambda item: str(item[0]))
+
+
+class Metric:
+    """
+    Base class of metric
+    """
+    type: str = 'untyped'  # type of metric in Prometheus text format
+
+    def __init__(self, name: str, documentation: str, label_name: str = None):
+        """
+        :param name: name of metric
+        :param documentation: description of metric
+        :param label_name: name of label, if the metric is split by label values (for example by command)
+        """
+        self.name: str = name
+        self.documentation: str = documentation
+        self.label_name: str = label_name
+
+    def labels(self, label: str) -> str:
+        """label part of the sample in Prometheus text format"""
+        if self.label_name is None:
+            return ''
+        return '{' + f'{self.label_name}="{escape_label(label)}"' + '}'
+
+    def collect(self) -> dict:
+        """current values Dict[label: value]"""
+        return dict()
+
+    def render_prometheus(self) -> List[str]:
+        """lines of metric in Prometheus text format"""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        for label, value in sorted_items(self.collect()):
+            lines.append(f'{self.name}{self.labels(label)} {value}')
+        return lines
+
+    def render_text(self) -> List[str]:
+        """lines of metric in human readable form"""
+        return [f'{self.name}{self.labels(label)}: {value}' for label, value in sorted_items(self.collect())]
+
+
+class ShardedMetric(Metric):
+    """
+    Metric, which values are written in the shard of current thread without lock.
+    Shards of finished threads are merged in one retired shard on collection.
+    """
+    def __init__(self, name: str, documentation: str, label_name: str = None):
+        super(ShardedMetric, self).__init__(name, documentation, label_name)
+        self.local: local = local()  # shard of current thread
+        self.shards: List[Tuple[Thread, dict], ...] = list()  # shards of all threads
+        self.retired: dict = dict()  # merged shards of finished threads
+        self.lock: Lock = Lock()  # lock for registration of the shard and collection, is not used on hot path
+
+    def get_shard(self) -> dict:
+        """shard of current thread Dict[label: value]"""
+        try:
+            return self.local.shard
+        except AttributeError:  # first write in this thread
+            shard = self.local.shard = dict()
+            with self.lock:
+                self.shards.append((current_thread(), shard))
+            return shard
+
+    def merge(self, target: dict, shard: dict):
+        """add values of shard to the target"""
+        pass
+
+    def collect(self) -> dict:
+        with self.lock:
+            alive_shards = list()
+            for thread, shard in self.shards:
+                if thread.is_alive():
+                    alive_shards.append((thread, shard))
+                else:  # the thread will not write in its shard anymore
+                    self.merge(self.retired, shard)
+            self.shards = alive_shards
+            result = dict()
+            self.merge(result, self.retired)
+            for thread, shard in alive_shards:
+                self.merge(result, shard.copy())
+        return result
+
+
+class Counter(ShardedMetric):
+    """
+    Monotonically increasing counter
+    """
+    type: str = 'counter'
+
+    def inc(self, amount: Union[int, float] = 1, label: str = ''):
+        """
+        increase counter
+        :param amount: increment
+        :param label: label value
+        """
+        shard = self.get_shard()
+        shard[label] = shard.get(label, 0) + amount
+
+    def merge(self, target: dict, shard: dict):
+        for label, value in shard.items():
+            target[label] = target.get(label, 0) + value
+
+
+class Histogram(ShardedMetric):
+    """
+    Histogram of values (latencies in seconds by default).
+    Value of the shard is list: [count in bucket 1, ..., count in bucket N, count above last bucket, sum, count]
+    """
+    type: str = 'histogram'
+
+    def __init__(self, name: str, documentation: str, label_name: str = None, buckets: tuple = latency_buckets):
+        """
+        :param buckets: upper bounds of buckets
+        """
+        super(Histogram, self).__init__(name, documentation, label_name)
+        self.buckets: tuple = buckets
+
+    def observe(self, value: float, label: str = ''):
+        """
+        add value to histogram
+        :param value: observed value
+        :param label: label value
+        """
+        shard = self.get_shard()
+        counts = shard.get(label)
+        if counts is None:
+            counts = shard[label] = [0] * (len(self.buckets) + 3)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-2] += value
+        counts[-1] += 1
+
+    def merge(self, target: dict, shard: dict):
+        for label, counts in shard.items():
+            target_counts = target.get(label)
+            if target_counts is None:
+                target[label] = list(counts)
+            else:
+                target[label] = [i + j for i, j in zip(target_counts, counts)]
+
+    def quantile(self, counts: list, q: float) -> float:
+        """
+        upper bound of bucket, which contains quantile q
+        :param counts: merged value of histogram
+        :param q: quantile from 0 to 1
+        """
+        rank = q * counts[-1]
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float('inf')
+
+    def render_prometheus(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        for label, counts in sorted_items(self.collect()):
+            label_part = '' if self.label_name is None else f'{self.label_name}="{escape_label(label)}",'
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_part}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label_part}le="+Inf"}} {counts[-1]}')
+            lines.append(f'{self.name}_sum{self.labels(label)} {counts[-2]}')
+            lines.append(f'{self.name}_count{self.labels(label)} {counts[-1]}')
+        return lines
+
+    def render_text(self) -> List[str]:
+        lines = list()
+        for label, counts in sorted_items(self.collect()):
+            mean = counts[-2] / counts[-1] if counts[-1] else 0
+            lines.append(f'{self.name}{self.labels(label)}: count {counts[-1]}, mean {mean:.6f}, '
+                         f'p50 <= {self.quantile(counts, 0.5)}, p99 <= {self.quantile(counts, 0.99)}')
+        return lines
+
+
+class Gauge(Metric):
+    """
+    Gauge, which value is calculated by function on collection
+    """
+    type: str = 'gauge'
+
+    def __init__(self, name: str, documentation: str, function: callable, label_name: str = None):
+        """
+        :param function: function without arguments, which returns value or Dict[label: value]
+        """
+        super(Gauge, self).__init__(name, documentation, label_name)
+        self.function: callable = function
+
+    def collect(self) -> dict:
+        value = self.function()
+        return value if isinstance(value, dict) else {'': value}
+
+
+class MetricsRegistry:
+    """
+    Container of all metrics of the process
+    """
+    def __init__(self):
+        self.metrics: Dict[str: Metric, ...] = dict()  # Dict[name: metric]
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        add metric in registry. If there is metric with the same name, it is replaced
+        :param metric: metric
+        """
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, label_name: str = None) -> Counter:
+        """create and register counter"""
+        return self.register(Counter(name, documentation, label_name))
+
+    def histogram(self, name: str, documentation: str, label_name: str = None,
+                  buckets: tuple = latency_buckets) -> Histogram:
+        """create and register histogram"""
+        return self.register(Histogram(name, documentation, label_name, buckets))
+
+    def gauge(self, name: str, documentation: str, function: callable, label_name: str = None) -> Gauge:
+        """create and register gauge"""
+        return self.register(Gauge(name, documentation, function, label_name))
+
+    def render_prometheus(self) -> str:
+        """all metrics in Prometheus text format"""
+        lines = list()
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render_prometheus())
+        return '\n'.join(lines) + '\n'
+
+    def render_text(self) -> str:
+        """all metrics in human readable form"""
+        lines = list()
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render_text())
+        return '\n'.join(lines)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """
+    HTTP handler, which returns metrics in Prometheus text format on GET /metrics
+    and finished traces as JSON lines on GET /traces
+    """
+    registry: MetricsRegistry = None  # registry to expose
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            body = self.registry.render_prometheus().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        elif self.path == '/traces':
+            body = tracer.dumps().encode('utf-8')
+            content_type = 'application/x-ndjson; charset=utf-8'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """requests are not logged"""
+        pass
+
+
+def start_http_server(port: int, ip: str = '127.0.0.1', registry: MetricsRegistry = None) -> ThreadingHTTPServer:
+    """
+    start HTTP listener of metrics in daemon thread
+    :param port: port of listener
+    :param ip: ip of listener, local only by default
+    :param registry: registry to expose, global registry by default
+    :return: HTTP server, call shutdown() to stop it
+    """
+    handler = type('Handler', (MetricsHandler,), {'registry': registry if registry is not None else metrics})
+    http_server = ThreadingHTTPServer((ip, port), handler)
+    Thread(target=http_server.serve_forever, daemon=True).start()
+    return http_server
+
+
+metrics = MetricsRegistry()  # registry of metrics of the process
@@ -1,30 +1,40 @@
 from __future__ import annotations
 
+import math
 from functools import wraps
 from typing import TYPE_CHECKING, Union
 
-from src.ClientRequests import ResultRequest, StatusRequest, InfoRequest, Task
-from src.Exceptions import IdentifierNotFound
+from src.ClientRequests import ResultRequest, StatusRequest, InfoRequest, Task, CancelRequest, UploadChunk
+from Server.Uploads import Upload, dropped_chunks
+from src.Exceptions import IdentifierNotFound, TaskTypeNotFound
+from src.Metrics import metrics
+from src.Tracing import hop
 
 if TYPE_CHECKING:
     from Server.ServerEventLoops import UserEventLoop
-    from Server.Worker import WorkerTask
 
 
 application_help = """
-    You can use 5 commands to control server
-        task [option] [batch processing mode] [value]
+    You can use 8 commands to control server
+        task [option] [batch processing mode] [deadline] [value]
             create task on server
         
             options                   : type of task
                 --reverse             : to reverse symbols in value
                 --pair_permutation    : to pairwise characters in a string
                 --symbol_repeat       : to repeat symbols according their positions
+                --reverse|--pair_permutation|--symbol_repeat
+                                      : pipeline: the stages are executed on server one after another,
+                                        the result of stage is the data of next stage
             
             batch processing mode:
                 -b                    : to start task in batch processing mode
             
+            deadline:
+                -d seconds            : task is expired, if it is not done in this time after submission
+            
             value                     : any symbols
+                -f path               : to upload the file as value, it is sent by chunks
             
             
         status [identifier]
@@ -33,6 +43,7 @@ application_help = """
             identifier                : unique identifier, that was generated by task request            
             
             in batch processing mode identifier not taken into account
+            status of pipeline contains its current stage
             
         result [identifier]
             get task result
@@ -41,9 +52,20 @@ application_help = """
             
             in batch processing mode identifier not taken into account
             
+        cancel [identifier] [identifier] ...
+            cancel tasks, which are not done yet
+            
+            identifier                : unique identifier, that was generated by task request
+            
         identifiers
             get identifiers all task
             
+        instance
+            get identifier of server instance: task identifiers are unique only within the instance
+            
+        stats
+            get server metrics: requests, queue depth, task wait and run times, traffic, connections
+            
         help
             get help
     """
@@ -61,10 +83,14 @@ def semaphore_decorator(func: callable) -> callable:
     def wrapper(self: Union[ServerResultRequest, ServerInfoRequest, ServerStatusRequest, ServerTask],
                 *args,
                 **kwargs):
-        """semaphore.acquire before func() and semaphore.release before exit"""
+        """semaphore.acquire before func() and semaphore.release before exit, even if func() raised exception"""
         self.event_handler.worker.semaphore.acquire()  # block
-        func(self, *args, **kwargs)
-        self.event_handler.worker.semaphore.release()  # unblock
+        try:
+            hop(self.trace, 'worker_semaphore')
+            func(self, *args, **kwargs)
+        finally:
+            self.event_handler.worker.semaphore.release()  # unblock
+        hop(self.trace, 'server_handled')
         self.event_handler.data_to_send.appendleft(self)  # add data to the data_to_send container
     return wrapper
 
@@ -77,13 +103,12 @@ class ServerResultRequest(ResultRequest):
     def run(self):
         self.event_handler: UserEventLoop
         # add error info if requested identifier not exit
-        if self.identifier not in self.event_handler.worker.tasks.keys():
+        if self.identifier not in self.event_handler.worker.tasks:
             self.error = str(IdentifierNotFound(self.identifier))
             self.result = None
         else:  # add result of task if requested identifier exit
-            task: WorkerTask = self.event_handler.worker.tasks[self.identifier]
             self.error = None
-            self.result: str = task.result
+            self.result: str = self.event_handler.worker.tasks.get_result(self.identifier)
 
 
 class ServerStatusRequest(StatusRequest):
@@ -94,13 +119,45 @@ class ServerStatusRequest(StatusRequest):
     def run(self):
         self.event_handler: UserEventLoop
         # add error info if requested identifier not exit
-        if self.identifier not in self.event_handler.worker.tasks.keys():
+        if self.identifier not in self.event_handler.worker.tasks:
             self.error = str(IdentifierNotFound(self.identifier))
             self.result = None
         else:  # add status of task if requested identifier exit
-            task: WorkerTask = self.event_handler.worker.tasks[self.identifier]
             self.error = None
-            self.result: str = task.status
+            self.result: str = self.event_handler.worker.tasks.describe_status(self.identifier)
+
+
+class ServerCancelRequest(CancelRequest):
+    """
+    cancel request class on server side.
+    """
+    max_identifiers: int = 10000  # maximum count of tasks cancelled by one request
+
+    def check(self):
+        """check identifiers received from client: list of integers"""
+        if not isinstance(self.identifier, list) or \
+                any(isinstance(i, bool) or not isinstance(i, int) for i in self.identifier):
+            raise ValueError('ValueError. Identifiers of cancel must be list of integers')
+        if len(self.identifier) > self.max_identifiers:
+            raise ValueError(f'ValueError. Cancel request can contain not more than {self.max_identifiers} '
+                             f'identifiers')
+
+    @semaphore_decorator
+    def run(self):
+        self.event_handler: UserEventLoop
+        try:
+            self.check()
+        except ValueError as ex:
+            self.error = str(ex)
+            self.result = None
+            return
+        self.error = None
+        self.result = list()
+        for identifier in self.identifier:
+            if identifier not in self.event_handler.worker.tasks:  # requested identifier not exit
+                self.result.append([identifier, 'not found'])
+            else:  # cancel task and add its status
+                self.result.append([identifier, self.event_handler.worker.cancel_task(identifier)])
 
 
 class ServerInfoRequest(InfoRequest):
@@ -114,21 +171,106 @@ class ServerInfoRequest(InfoRequest):
             self.result: str = application_help  # add help info
         elif self.command == 'identifiers':
             # add list of identifiers
-            self.result: str = str(list(self.event_handler.worker.tasks.keys()))[1:-1]
+            self.result: str = str(list(self.event_handler.worker.tasks.identifiers()))[1:-1]
+        elif self.command == 'stats':
+            self.result: str = '\n' + metrics.render_text()  # add metrics
+        elif self.command == 'instance':
+            self.result: str = self.event_handler.worker.instance  # add identifier of server instance
 
 
 class ServerTask(Task):
     """
     create task request class on server side.
     """
+    def check(self):
+        """check task type, which can be pipeline, data and deadline of task received from client"""
+        if not isinstance(self.task_type, str):
+            raise TaskTypeNotFound(self.task_type)
+        self.check_task_type(self.task_type)
+        if self.upload is None and not isinstance(self.data, str):
+            raise ValueError('ValueError. Data of task must be string')
+        if self.upload is not None and not isinstance(self.upload, int):
+            raise ValueError('ValueError. Identifier of upload must be integer')
+        if self.deadline is not None and (isinstance(self.deadline, bool) or
+                                          not isinstance(self.deadline, (int, float)) or
+                                          not 0 <= self.deadline < math.inf):
+            raise ValueError('ValueError. Deadline must be non-negative number of seconds')
+
     @semaphore_decorator
     def run(self):
         self.event_handler: UserEventLoop
 
-        task_identifier = self.event_handler.worker.add_task(self)  # get st
-        self.result = task_identifier
+        try:  # the request is checked on server too, the worker runs only known stages
+            self.check()
+        except (TaskTypeNotFound, ValueError) as ex:
+            self.error = str(ex)
+            upload = self.event_handler.uploads.pop(self.upload, None) if isinstance(self.upload, int) else None
+            if upload is not None:  # uploaded data is not needed
+                upload.close()
+            return
+        upload = None
+        if self.upload is not None:  # data of task was uploaded by chunks
+            upload = self.event_handler.uploads.pop(self.upload, None)
+            if upload is None:
+                self.error = 'ValueError. Uploaded data of task not found: upload is expired or dropped by server'
+                return
+            try:
+                self.data = upload.get_data()
+            except ValueError as ex:  # upload is rejected or not complete
+                self.error = str(ex)
+                upload.close()
+                return
+        try:
+            self.result = self.event_handler.worker.add_task(self)  # data is copied to task table
+        except ValueError as ex:  # task doesn't fit task table, the table is not changed
+            self.error = str(ex)
+        finally:
+            if upload is not None:
+                upload.close()
+                self.data = None  # uploaded data is not sent back
+
+
+class ServerUploadChunk(UploadChunk):
+    """
+    chunk of uploaded data on server side. It is added to the upload of connection, there is no response.
+    Connection can have not more than max_uploads_per_connection not finished uploads, the chunks of other uploads
+    are dropped and their tasks get the error. Wrong chunk is answered by notice of server (response without
+    request identifier), because chunks have no responses, and the upload is removed
+    """
+    def check(self):
+        """check chunk received from client: identifier of upload, declared size and data"""
+        identifier = self.request_identifier_on_client
+        if isinstance(identifier, bool) or not isinstance(identifier, int):
+            raise ValueError('ValueError. Identifier of upload must be integer')
+        if isinstance(self.size, bool) or not isinstance(self.size, int) or self.size < 0:
+            raise ValueError('ValueError. Size of upload must be non-negative integer')
+        if not isinstance(self.data, str):
+            raise ValueError('ValueError. Chunk of upload must be string')
+
+    def run(self):
+        self.event_handler: UserEventLoop
+        server = self.event_handler.server
+        uploads = self.event_handler.uploads
+        try:
+            self.check()
+        except ValueError as ex:
+            upload = uploads.pop(self.request_identifier_on_client, None) \
+                if isinstance(self.request_identifier_on_client, int) else None
+            if upload is not None:  # task of upload gets the error, that upload is not found
+                upload.close()
+            self.event_handler.data_to_send.appendleft(ServerInfoRequest(self.event_handler, 0, 'help', str(ex), None))
+            return
+        upload = uploads.get(self.request_identifier_on_client)
+        if upload is None:  # the first chunk
+            if len(uploads) >= server.max_uploads_per_connection:
+                dropped_chunks.inc()
+                return
+            upload = uploads[self.request_identifier_on_client] = Upload(
+                self.size, server.max_upload_size, server.upload_spool_size)
+        upload.write(self.data)
 
 
 commands = {'status': ServerStatusRequest, 'result': ServerResultRequest,
-            'help': ServerInfoRequest, 'identifiers': ServerInfoRequest,
-            'task': ServerTask}
+            'help': ServerInfoRequest, 'identifiers': ServerInfoRequest, 'stats': ServerInfoRequest,
+            'instance': ServerInfoRequest,
+            'task': ServerTask, 'cancel': ServerCancelRequest, 'upload': ServerUploadChunk}
@@ -0,0 +1,110 @@
+"""
+Request tracing.
+Trace is the dictionary {'id': trace id, 'command': command, 'hops': [[hop name, timestamp], ...]},
+which travels inside of the request envelope. Every process adds timestamps of the hops, which the request passes:
+client queue, client select loop, server reading, worker semaphore, worker queue, task, relay to the result window.
+Finished traces are collected in the ring buffer of the process.
+"""
+from __future__ import annotations
+
+import json
+import random
+import time
+import uuid
+from collections import deque
+from typing import Deque, List, TextIO, Union
+
+
+class Tracer:
+    """
+    Sampler of new traces and ring buffer of finished traces
+    """
+    def __init__(self, sample_rate: float = 0.0, capacity: int = 10000):
+        """
+        :param sample_rate: part of requests from 0 to 1, which are traced
+        :param capacity: maximum count of traces in ring buffer
+        """
+        self.sample_rate: float = sample_rate  # part of traced requests
+        self.traces: Deque[dict] = deque(maxlen=capacity)  # ring buffer of finished traces
+
+    def start(self, command: str) -> Union[dict, None]:
+        """
+        start new trace, if the request is sampled
+        :param command: command of request
+        :return: trace or None if the request is not sampled
+        """
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        return {'id': uuid.uuid4().hex[:16], 'command': command, 'hops': list()}
+
+    def finish(self, trace: Union[dict, None]):
+        """
+        put copy of trace in ring buffer
+        :param trace: trace or None
+        """
+        if trace is not None:
+            self.traces.append({'id': trace['id'], 'command': trace['command'], 'hops': list(trace['hops'])})
+
+    def export(self, file: TextIO):
+        """
+        write finished traces as JSON lines
+        :param file: opened text file
+        """
+        for trace in list(self.traces):
+            file.write(json.dumps(trace) + '\n')
+
+    def dumps(self) -> str:
+        """finished traces as JSON lines"""
+        return ''.join(json.dumps(trace) + '\n' for trace in list(self.traces))
+
+
+def hop(trace: Union[dict, None], name: str):
+    """
+    add timestamp of the hop to the trace
+    :param trace: trace or None if the request is not sampled
+    :param name: name of the hop
+    """
+    if trace is not None:
+        trace['hops'].append([name, time.time()])
+
+
+def checked_trace(trace, max_hops: int = 64) -> Union[dict, None]:
+    """
+    trace received from another process: the peer can send any value instead of trace
+    :param trace: value from request envelope
+    :param max_hops: maximum count of hops of received trace
+    :return: trace with id, command and hops [[name, timestamp], ...], None if the value is not such trace
+    """
+    if not isinstance(trace, dict) or not isinstance(trace.get('id'), str) or \
+            not isinstance(trace.get('command'), str) or not isinstance(trace.get('hops'), list) or \
+            len(trace['hops']) > max_hops:
+        return None
+    for item in trace['hops']:
+        if not isinstance(item, list) or len(item) != 2 or not isinstance(item[0], str) or \
+                isinstance(item[1], bool) or not isinstance(item[1], (int, float)):
+            return None
+    return {'id': trace['id'], 'command': trace['command'], 'hops': trace['hops']}
+
+
+def copy_trace(trace: Union[dict, None]) -> Union[dict, None]:
+    """copy of trace, which continues independently (for example, the task after response with identifier)"""
+    if trace is None:
+        return None
+    return {'id': trace['id'], 'command': trace['command'], 'hops': [list(i) for i in trace['hops']]}
+
+
+def breakdown(trace: dict) -> List[str]:
+    """
+    per-hop latency breakdown of trace
+    :param trace: trace
+    :return: lines: time between consecutive hops
+    """
+    hops = trace['hops']
+    lines = [f'trace {trace["id"]} {trace["command"]}: '
+             f'total {(hops[-1][1] - hops[0][1]) * 1000 if hops else 0:.3f} ms']
+    for (previous_name, previous_time), (name, timestamp) in zip(hops, hops[1:]):
+        lines.append(f'    {previous_name} -> {name}: {(timestamp - previous_time) * 1000:.3f} ms')
+    return lines
+
+
+tracer = Tracer()  # tracer of the process
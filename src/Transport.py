@@ -0,0 +1,349 @@
+"""
+Transports of local and remote links. Transport is selected by scheme of address:
+    tcp://127.0.0.1:12345 (or 127.0.0.1:12345) - TCP socket
+    unix:///tmp/server.sock                     - unix domain stream socket, for the processes on the same host
+    shm://result_window                         - shared memory ring buffer, only for client -> result window stream
+"""
+from __future__ import annotations
+
+import os
+import socket
+import stat
+import struct
+import time
+from typing import Tuple, Union
+
+from src.MessageHandlers import ClientMessageHandler, DataTransfer, bytes_received, bytes_sent, messages_received, \
+    messages_sent
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # python without shared memory
+    shared_memory = None
+
+
+schemes: tuple = ('tcp', 'unix', 'shm',)  # supported schemes of address
+owned_rings: set = set()  # names of rings created by this process
+
+
+def parse_address(address: str) -> Tuple[str, Union[Tuple[str, int], str]]:
+    """
+    parse address with scheme
+    :param address: address, for example tcp://127.0.0.1:12345, unix:///tmp/server.sock or shm://name
+    :return: (scheme, address of socket or name of shared memory)
+    """
+    scheme, separator, rest = address.partition('://')
+    if not separator:  # address without scheme is TCP address
+        scheme, rest = 'tcp', address
+    if scheme not in schemes:
+        raise ValueError(f'ValueError. Unknown scheme "{scheme}" of address "{address}". '
+                         f'Available schemes: {", ".join(schemes)}')
+    if scheme == 'tcp':
+        host, _, port = rest.rpartition(':')
+        if not host or not port.isdigit():
+            raise ValueError(f'ValueError. Address "{address}" must be like tcp://host:port')
+        return scheme, (host, int(port))
+    if not rest:
+        raise ValueError(f'ValueError. Address "{address}" must contain path or name')
+    if scheme == 'unix' and not hasattr(socket, 'AF_UNIX'):
+        raise ValueError('ValueError. Unix domain sockets are not supported on this platform')
+    if scheme == 'shm' and shared_memory is None:
+        raise ValueError('ValueError. Shared memory is not supported by this python')
+    return scheme, rest
+
+
+def format_address(handler: DataTransfer) -> str:
+    """
+    address with scheme of connected handler.
+    Accepted unix socket connections have address (path, descriptor), they are formatted as unix://path#descriptor
+    """
+    if isinstance(handler, ShmRingTransfer):
+        return 'shm://' + handler.address
+    if hasattr(socket, 'AF_UNIX') and handler.client_socket.family == socket.AF_UNIX:
+        if isinstance(handler.address, tuple):  # connection accepted by server
+            return f'unix://{handler.address[0]}#{handler.address[1]}'
+        return 'unix://' + handler.address
+    return f'tcp://{handler.address[0]}:{handler.address[1]}'
+
+
+def remove_socket_file(path: str, strict: bool = True):
+    """
+    remove unix socket file of previous run before bind or after stop. Other files are not removed,
+    so the mistyped address doesn't delete data of user
+    :param path: path of unix socket
+    :param strict: raise ValueError, if the path is not socket (before bind), else keep the file silently
+    """
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        if strict:
+            raise ValueError(f'ValueError. {path} exists and is not unix socket, it is not removed. '
+                             f'Choose another path of unix socket')
+        return
+    os.remove(path)
+
+
+def create_socket(scheme: str) -> socket.socket:
+    """create stream socket of scheme tcp or unix"""
+    if scheme == 'unix':
+        return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    if scheme == 'tcp':
+        return socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    raise ValueError(f'ValueError. There is no socket for scheme "{scheme}"')
+
+
+def create_client_handler(address: str) -> Union[ClientMessageHandler, ShmRingTransfer]:
+    """
+    create not connected message sender to address with scheme
+    :param address: address with scheme
+    """
+    scheme, address = parse_address(address)
+    if scheme == 'shm':
+        return ShmRingTransfer(address)
+    return ClientMessageHandler(create_socket(scheme), address)
+
+
+class ReadinessListener:
+    """
+    Listener of readiness notification. The started process (for example, result window) gets the address of
+    listener in arguments, connects to it and sends b'ready', when it is ready to accept connections.
+    TCP on local interface is used, because the process can be started by terminal emulator,
+    which doesn't pass inherited descriptors
+    """
+    def __init__(self):
+        self.listener: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(('127.0.0.1', 0))  # any free port
+        self.listener.listen(1)
+        self.address: str = 'tcp://127.0.0.1:{}'.format(self.listener.getsockname()[1])  # address for notification
+
+    def wait(self, timeout: float) -> bool:
+        """
+        wait for notification
+        :param timeout: maximum time of waiting, s
+        :return: is the process ready
+        """
+        self.listener.settimeout(timeout)
+        try:
+            connection, _ = self.listener.accept()
+            with connection:
+                connection.settimeout(timeout)
+                return connection.recv(5) == b'ready'
+        except OSError:  # timeout or closed listener
+            return False
+
+    def close(self):
+        """close listener"""
+        self.listener.close()
+
+
+def notify_ready(address: str):
+    """
+    send readiness notification to the listener of parent process
+    :param address: address of ReadinessListener
+    """
+    scheme, address = parse_address(address)
+    try:
+        with create_socket(scheme) as notify_socket:
+            notify_socket.settimeout(5.0)
+            notify_socket.connect(address)
+            notify_socket.sendall(b'ready')
+    except OSError:  # parent process doesn't wait for notification
+        pass
+
+
+class ShmRing:
+    """
+    Single-producer/single-consumer byte ring buffer in shared memory.
+    Header contains two counters: total count of written bytes and total count of read bytes.
+    Only producer changes the first counter and only consumer changes the second one, so there are no locks.
+    Producer writes data before the counter, consumer reads the counter before data
+    """
+    header: struct.Struct = struct.Struct('QQ')  # written bytes, read bytes
+
+    def __init__(self, name: str, capacity: int = None):
+        """
+        :param name: name of shared memory
+        :param capacity: size of ring in bytes for consumer, which creates the ring. None - attach to existing ring
+        """
+        if capacity is None:  # producer attaches to the ring of consumer
+            self.memory = shared_memory.SharedMemory(name)
+            if name not in owned_rings:  # the ring is removed by its owner, not by resource tracker of producer
+                try:
+                    from multiprocessing import resource_tracker
+                    resource_tracker.unregister(self.memory._name, 'shared_memory')
+                except (ImportError, AttributeError, KeyError):
+                    pass
+        else:
+            self.memory = shared_memory.SharedMemory(name, create=True, size=self.header.size + capacity)
+            self.header.pack_into(self.memory.buf, 0, 0, 0)
+            owned_rings.add(name)
+        self.name: str = name  # name of shared memory
+        self.is_owner: bool = capacity is not None  # consumer owns and removes the ring
+        self.capacity: int = self.memory.size - self.header.size  # size of data region
+        self.offset: int = self.header.size  # start of data region
+
+    def counters(self) -> Tuple[int, int]:
+        """(written bytes, read bytes)"""
+        return self.header.unpack_from(self.memory.buf, 0)
+
+    def write(self, data: bytes) -> int:
+        """
+        write as many bytes as there is free space
+        :param data: bytes to write
+        :return: count of written bytes
+        """
+        written, read = self.counters()
+        count = min(len(data), self.capacity - (written - read))
+        if count <= 0:
+            return 0
+        start = self.offset + written % self.capacity
+        first = min(count, self.offset + self.capacity - start)  # part before the end of ring
+        self.memory.buf[start:start + first] = data[:first]
+        if count > first:  # part from the beginning of ring
+            self.memory.buf[self.offset:self.offset + count - first] = data[first:count]
+        struct.pack_into('Q', self.memory.buf, 0, written + count)
+        return count
+
+    def read(self, max_count: int) -> bytes:
+        """
+        read available bytes
+        :param max_count: maximum count of bytes
+        :return: read bytes, empty if ring is empty
+        """
+        written, read = self.counters()
+        count = min(written - read, max_count)
+        if count <= 0:
+            return b''
+        start = self.offset + read % self.capacity
+        first = min(count, self.offset + self.capacity - start)
+        data = bytes(self.memory.buf[start:start + first])
+        if count > first:
+            data += bytes(self.memory.buf[self.offset:self.offset + count - first])
+        struct.pack_into('Q', self.memory.buf, 8, read + count)
+        return data
+
+    def readable(self) -> bool:
+        """is there data to read"""
+        written, read = self.counters()
+        return written > read
+
+    def close(self):
+        """detach from shared memory, the owner also removes it"""
+        self.memory.close()
+        if self.is_owner:
+            self.memory.unlink()
+            owned_rings.discard(self.name)
+
+
+class ShmRingTransfer(DataTransfer):
+    """
+    Message transfer through shared memory ring: the messages are framed as in sockets.
+    Producer calls connect and send_msg, consumer creates the ring by listen and calls read_msg.
+    The ring has no readiness notification, so waiting sides poll it with growing sleep (50 us to 1 ms)
+    """
+    min_poll: float = 0.00005  # first sleep of polling, s
+    max_poll: float = 0.001  # maximum sleep of polling, s
+
+    def __init__(self, name: str):
+        """
+        :param name: name of shared memory
+        """
+        super(ShmRingTransfer, self).__init__(None, name)
+        self.ring: Union[ShmRing, None] = None  # ring buffer
+        self.is_connected: bool = False  # is attached to the ring
+        self.msg_len: int = 65536  # maximum count of bytes of one read
+
+    def listen(self, capacity: int = 4 * 1024 * 1024):
+        """
+        create the ring, is called by consumer
+        :param capacity: size of ring in bytes
+        """
+        self.ring = ShmRing(self.address, capacity)
+        self.is_connected = True
+
+    def connect(self, n_max=10):
+        """
+        attach to the ring of consumer
+        :param n_max: max count of tries to attach. If n_max = None then n_max is infinite
+        """
+        n = 0  # current try count
+        backoff = ClientMessageHandler.connect_backoff  # pause before next try, is doubled after every try
+        while not self.is_connected and (n_max is None or n < n_max):
+            try:
+                self.ring = ShmRing(self.address)
+                self.is_connected = True
+            except FileNotFoundError as ex:  # consumer has not created the ring yet
+                n += 1
+                if n_max is not None and n >= n_max:
+                    raise ConnectionError(f"Can't attach to shared memory {self.address}: {str(ex)}")
+                time.sleep(backoff)  # wait for consumer and try again
+                backoff = min(backoff * 2, ClientMessageHandler.connect_backoff_cap)
+
+    def poll(self, is_ready: callable, timeout: float) -> bool:
+        """
+        wait until is_ready() returns True
+        :param is_ready: check of readiness
+        :param timeout: maximum time of waiting, s
+        :return: readiness
+        """
+        if is_ready():
+            return True
+        deadline = time.perf_counter() + timeout
+        delay = self.min_poll
+        while time.perf_counter() < deadline:
+            time.sleep(delay)
+            if is_ready():
+                return True
+            delay = min(delay * 2, self.max_poll)
+        return False
+
+    def wait_readable(self, timeout: float) -> bool:
+        """wait for data in ring or whole message in receive buffer"""
+        return self.has_buffered_msg() or self.poll(self.ring.readable, timeout)
+
+    def read_msg(self) -> bytes:
+        """
+        read message from ring
+        :return data: received bytes
+        """
+        search_start = 0  # position in receive buffer, from which the end of message is searched
+        while True:
+            end = self.receive_buffer.find(self.end_of_msg, search_start)
+            if end >= 0:  # there is whole message in receive buffer
+                data = bytes(self.receive_buffer[:end])
+                del self.receive_buffer[:end + len(self.end_of_msg)]
+                messages_received.inc()
+                return data
+            search_start = max(len(self.receive_buffer) - len(self.end_of_msg) + 1, 0)
+            if not self.poll(self.ring.readable, self.read_timeout):
+                raise TimeoutError(f'Timeout to get data from shared memory {self.address}')
+            package = self.ring.read(self.msg_len)
+            self.receive_buffer += package
+            bytes_received.inc(len(package))
+
+    def send_msg(self, encoded_data: bytes) -> None:
+        """
+        write message to ring, wait while ring is full
+        :param encoded_data: bytes data to send
+        """
+        data = memoryview(encoded_data)
+        total_sent = 0
+        while total_sent < len(data):
+            sent = self.ring.write(data[total_sent:])
+            if sent == 0:  # consumer falls behind
+                if not self.poll(lambda: self.ring.counters()[0] - self.ring.counters()[1] < self.ring.capacity,
+                                 self.send_timeout):
+                    raise TimeoutError(f'Timeout to send message to shared memory {self.address}')
+                continue
+            total_sent += sent
+            bytes_sent.inc(sent)
+        messages_sent.inc()
+
+    def close(self):
+        """detach from the ring"""
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        self.is_connected = False
@@ -0,0 +1,86 @@
+"""
+Helpers of tests: server with its own worker in background threads and raw protocol connection to it
+"""
+from __future__ import annotations
+
+import socket
+import threading
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Iterator
+
+from Server.ServerEventLoops import MainServer, UserEventLoop
+from Server.Worker import Worker
+from src.ClientRequests import BaseRequest
+from src.MessageHandlers import ClientMessageHandler
+
+
+def free_port() -> int:
+    """free TCP port on loopback interface"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def task(data: str = 'abc') -> SimpleNamespace:
+    """task request of client without connection"""
+    return SimpleNamespace(event_handler=object(), request_identifier_on_client=1, task_type='--reverse',
+                           is_batch_processing_mode=False, request_identifier_on_result=None, data=data,
+                           deadline=None, trace=None)
+
+
+@contextmanager
+def running_server(delay: float = 0.05, handler: type = UserEventLoop, address: str = None,
+                   **attributes) -> Iterator[MainServer]:
+    """
+    server with new worker, whose tasks are delayed by delay seconds
+    :param delay: simulated latency of every task type, s
+    :param handler: class of client event loop
+    :param address: address with scheme to listen, free TCP port on loopback interface if None
+    :param attributes: attributes of server, for example max_connections_per_ip=1
+    """
+    worker = Worker()
+    worker.delays = {task_type: delay for task_type in Worker.delays}
+    server = MainServer(handler)
+    server.set_worker(worker)
+    for name, value in attributes.items():
+        setattr(server, name, value)
+    listening = threading.Event()
+    server.on_listen = listening.set
+    if address is None:
+        thread = threading.Thread(target=server.run, args=('127.0.0.1', free_port()), daemon=True)
+    else:
+        thread = threading.Thread(target=server.run_address, args=(address,), daemon=True)
+    thread.start()
+    if not listening.wait(5):
+        raise RuntimeError('server is not started')
+    try:
+        yield server
+    finally:
+        server.is_active = False
+        thread.join(10)
+
+
+class RawConnection(ClientMessageHandler):
+    """connection, which sends and receives messages of protocol as lists"""
+    def __init__(self, server: MainServer):
+        super(RawConnection, self).__init__(socket.socket(socket.AF_INET, socket.SOCK_STREAM),
+                                            (server.ip, server.port))
+        self.connect()
+
+    def send(self, message: list):
+        """send message"""
+        self.send_msg(BaseRequest.dump(message))
+
+    def receive(self) -> list:
+        """receive message"""
+        return list(BaseRequest.loads(self.read_msg()))
+
+    def request(self, message: list) -> list:
+        """send message and receive response"""
+        self.send(message)
+        return self.receive()
+
+    def close(self):
+        """close connection"""
+        self.client_socket.close()
@@ -0,0 +1,111 @@
+import os
+import socket
+import stat
+import sys
+import tempfile
+import threading
+import unittest
+
+from Server.Admin import AdminServer, is_loopback, send_command
+from Server.Profiling import collapse, profiler
+from tests.Support import free_port
+
+
+def inner_frame():
+    return sys._getframe()
+
+
+def outer_frame():
+    return inner_frame()
+
+
+class ProfilingTest(unittest.TestCase):
+    def test_collapse_from_root_to_current_frame(self):
+        names = collapse('worker', outer_frame()).split(';')
+        self.assertEqual(names[0], 'worker')
+        self.assertTrue(names[-1].startswith('inner_frame (test_Admin.py:'))
+        self.assertTrue(names[-2].startswith('outer_frame (test_Admin.py:'))
+
+    def test_cprofile_collects_profilers_of_threads_at_checkpoints(self):
+        is_active = True
+
+        def event_loop():
+            while is_active:
+                profiler.checkpoint()
+                sum(range(1000))
+
+        thread = threading.Thread(target=event_loop)
+        thread.start()
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'server.pstats')
+                answer = profiler.run_cprofile(0.05, path)
+                self.assertTrue(answer.startswith('cProfile statistics of'), answer)
+                self.assertTrue(os.path.getsize(path) > 0)
+        finally:
+            is_active = False
+            thread.join(5)
+
+
+class AdminServerTest(unittest.TestCase):
+    def test_is_loopback(self):
+        for host in ('localhost', '127.0.0.1', '127.0.0.2', '::1'):
+            self.assertTrue(is_loopback(host), host)
+        for host in ('0.0.0.0', '192.168.1.1', 'example.com'):
+            self.assertFalse(is_loopback(host), host)
+
+    def test_only_local_addresses(self):
+        for address in ('tcp://0.0.0.0:1', 'tcp://192.168.1.1:1', 'shm://admin'):
+            with self.assertRaises(ValueError):
+                AdminServer(address)
+
+    def test_handle(self):
+        admin = AdminServer('tcp://127.0.0.1:1')
+        self.assertEqual(admin.handle(''), admin.help())
+        self.assertTrue(admin.handle('unknown').startswith('Unknown command "unknown".'))
+        self.assertTrue(admin.handle('profile sample x').startswith('Wrong arguments of "profile"'))
+        self.assertTrue(admin.handle('profile sample 0').startswith('Wrong arguments of "profile"'))
+        self.assertTrue(admin.handle('profile flame 1').startswith('Wrong arguments of "profile"'))
+        self.assertEqual(admin.handle('memory'), 'Admin socket is not attached to server')
+
+    def test_commands_through_socket(self):
+        address = f'tcp://127.0.0.1:{free_port()}'
+        admin = AdminServer(address)
+        admin.start()
+        try:
+            self.assertEqual(send_command(address, 'help', timeout=5), admin.help())
+            self.assertIn('Thread "MainThread"', send_command(address, 'stacks', timeout=5))
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'server.collapsed')
+                answer = send_command(address, f'profile sample 0.05 {path} 5', timeout=5)
+                self.assertIn('written to', answer)
+                with open(path, encoding='utf-8') as file:
+                    self.assertTrue(any(line.startswith('MainThread;') for line in file))
+        finally:
+            admin.stop()
+        admin.thread.join(5)
+        self.assertFalse(admin.thread.is_alive())
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'unix domain sockets are not supported')
+    def test_unix_socket_is_available_only_for_owner(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'admin.sock')
+            admin = AdminServer('unix://' + path)
+            admin.start()
+            try:
+                self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o600)
+                self.assertEqual(send_command('unix://' + path, 'help', timeout=5), admin.help())
+            finally:
+                admin.stop()
+            self.assertFalse(os.path.exists(path))
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'unix domain sockets are not supported')
+    def test_file_at_admin_address_is_not_removed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'data.txt')
+            with open(path, 'w') as file:
+                file.write('data of user')
+            with self.assertRaises(ValueError):
+                AdminServer('unix://' + path).start()
+            with open(path) as file:
+                self.assertEqual(file.read(), 'data of user')
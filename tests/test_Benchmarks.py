@@ -0,0 +1,19 @@
+import unittest
+from unittest import mock
+
+from Benchmarks import Suite
+
+
+class SuiteTest(unittest.TestCase):
+    def test_compare_reports_only_slowdown_over_threshold(self):
+        regressions = Suite.compare({'a': 1.2, 'b': 1.05, 'c': 0.5, 'new': 1.0},
+                                    {'a': 1.0, 'b': 1.0, 'c': 1.0, 'zero': 0.0}, 0.1)
+        self.assertEqual(list(regressions), ['a'])
+        self.assertAlmostEqual(regressions['a'], 0.2)
+
+    def test_benchmarks_run_current_code(self):
+        with mock.patch.object(Suite, 'measure', lambda function, repeat=5: function() or 1.0):
+            results = Suite.dispatch_benchmarks()
+            results.update(Suite.serialization_benchmarks())
+        self.assertEqual(set(name for name in results if name.startswith('dispatch.')),
+                         {'dispatch.status', 'dispatch.result', 'dispatch.identifiers', 'dispatch.task'})
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import time
+import unittest
+
+from Client.Replay import Replayer, format_report
+from src.Capture import CLOSE, OPEN, REQUEST, RESPONSE, TrafficCapture, read_log
+from tests.Support import RawConnection, running_server
+
+
+class CaptureLogTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_log(self, name: str, count: int) -> str:
+        path = os.path.join(self.directory.name, name)
+        capture = TrafficCapture(path)
+        connection = capture.open_connection('tcp://127.0.0.1:1')
+        for number in range(count):
+            capture.write(connection, REQUEST, b'[%d, "status", null, 1, null, null]' % number)
+        capture.write(connection, CLOSE, b'')
+        capture.close()
+        capture.write(connection, RESPONSE, b'[]')  # record after close is ignored
+        return path
+
+    def test_round_trip(self):
+        for name in ('capture.bin', 'capture.bin.gz'):
+            with self.subTest(name=name):
+                records = list(read_log(self.write_log(name, 3)))
+                self.assertEqual([(connection, kind) for timestamp, connection, kind, payload in records],
+                                 [(1, OPEN), (1, REQUEST), (1, REQUEST), (1, REQUEST), (1, CLOSE)])
+                self.assertEqual(records[0][3], b'tcp://127.0.0.1:1')
+                self.assertEqual(records[2][3], b'[1, "status", null, 1, null, null]')
+                timestamps = [record[0] for record in records]
+                self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_cut_log(self):
+        for name in ('capture.bin', 'capture.bin.gz'):
+            with self.subTest(name=name):
+                path = self.write_log(name, 5000)
+                count = len(list(read_log(path)))
+                with open(path, 'rb') as file:
+                    data = file.read()
+                with open(path, 'wb') as file:
+                    file.write(data[:len(data) // 2])  # server is killed while the log is written
+                records = list(read_log(path))
+                self.assertTrue(0 < len(records) < count)
+                self.assertEqual(records[-1][2], REQUEST)
+
+    def test_not_capture_log(self):
+        path = os.path.join(self.directory.name, 'other.bin')
+        with open(path, 'wb') as file:
+            file.write(b'not a capture log')
+        with self.assertRaises(ValueError):
+            list(read_log(path))
+
+
+class ReplayTest(unittest.TestCase):
+    @staticmethod
+    def session(server, connection: RawConnection):
+        """captured session: tasks and requests, which refer to task identifiers"""
+        identifier = connection.request([1, 'task', None, '--reverse', False, None, 'abc', None, None, None,
+                                         None])[7]
+        connection.request([2, 'task', None, '--reverse', True, 3, 'xyz', None, None, None, None])
+        connection.receive()  # result of task in batch processing mode
+        deadline = time.monotonic() + 5
+        while server.worker.tasks.get_status(identifier) != 'done' and time.monotonic() < deadline:
+            time.sleep(0.01)  # result is requested, when the task is finished
+        connection.request([4, 'result', None, identifier, None, None])
+        connection.request([5, 'status', None, identifier, None, None])
+
+    def test_replay_of_captured_traffic(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'capture.bin.gz')
+            capture = TrafficCapture(path)
+            with running_server(delay=0, capture=capture) as server:
+                connection = RawConnection(server)
+                try:
+                    self.session(server, connection)
+                finally:
+                    connection.close()
+                time.sleep(0.2)  # server writes close of connection
+            capture.close()
+
+            with running_server(delay=0) as server:
+                connection = RawConnection(server)  # identifiers of replayed tasks differ from the captured ones
+                try:
+                    connection.request([1, 'task', None, '--reverse', False, None, 'abc', None, None, None, None])
+                finally:
+                    connection.close()
+                report = Replayer(path, f'tcp://{server.ip}:{server.port}', timeout=5).run()  # pace of capture
+
+        counters = report['counters']
+        self.assertEqual(counters.get('mismatched', 0), 0, report['mismatches'])
+        self.assertEqual((counters['requests'], counters['responses']), (4, 5))
+        self.assertEqual((counters['matched'], counters['unchecked']), (4, 1))
+        self.assertEqual(counters.get('missing', 0) + counters.get('connection_errors', 0), 0)
+        self.assertEqual(report['not_compared'], 0)
+        self.assertIn('matched 4, mismatched 0', format_report(report))
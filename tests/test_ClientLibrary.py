@@ -0,0 +1,99 @@
+import asyncio
+import socket
+import time
+import unittest
+from concurrent.futures import Future
+
+from Client.ClientLibrary import AsyncTaskClient, ClientConnection, TaskClient
+from src.ClientRequests import BaseRequest, StatusRequest
+from tests.Support import running_server
+
+
+def message(value: list) -> bytes:
+    """received message without the end of message, as it is returned by read_msg"""
+    return BaseRequest.dump(value)[:-len(b'endofmsg')]
+
+
+class HandleResponseTest(unittest.TestCase):
+    def setUp(self):
+        self.connection = ClientConnection(('127.0.0.1', 1))
+
+    def tearDown(self):
+        self.connection.client_socket.close()
+
+    def test_response_to_cancelled_future_is_dropped(self):
+        future = Future()
+        self.connection.futures[5] = future
+        future.cancel()
+        self.connection.handle_response(message([5, 'status', None, 1, 'done', None]))
+        self.assertTrue(future.cancelled())
+        self.assertNotIn(5, self.connection.futures)
+
+    def test_response_resolves_future(self):
+        future = Future()
+        self.connection.futures[5] = future
+        self.connection.handle_response(message([5, 'status', None, 1, 'done', None]))
+        self.assertEqual(future.result(0), 'done')
+
+
+class BrokenConnectionTest(unittest.TestCase):
+    def test_malformed_response_fails_futures(self):
+        with socket.socket() as listener:
+            listener.bind(('127.0.0.1', 0))
+            listener.listen(1)
+            connection = ClientConnection(listener.getsockname())
+            connection.open()
+            server_side = listener.accept()[0]
+            try:
+                future = connection.send(StatusRequest, 'status', None, 1, None)
+                server_side.sendall(b'[1, "unknown command"]endofmsg')
+                with self.assertRaises(ConnectionError):
+                    future.result(5)
+                with self.assertRaises(ConnectionError):  # IO thread is stopped, new request fails at once
+                    connection.send(StatusRequest, 'status', None, 1, None).result(0)
+            finally:
+                server_side.close()
+                connection.close()
+
+
+class WaitTest(unittest.TestCase):
+    def test_timeout_of_silent_server(self):
+        with socket.socket() as listener:
+            listener.bind(('127.0.0.1', 0))
+            listener.listen(1)
+            with TaskClient(listener.getsockname()) as client:
+                server_side = listener.accept()[0]  # server accepts requests, but does not respond
+                try:
+                    start = time.monotonic()
+                    with self.assertRaises(TimeoutError):
+                        client.wait([1], timeout=0.3)
+                    self.assertLess(time.monotonic() - start, 1)
+                finally:
+                    server_side.close()
+
+
+class AsyncWaitTest(unittest.TestCase):
+    def test_timeout_is_one_deadline_for_pushed_results(self):
+        async def wait(client: AsyncTaskClient) -> float:
+            first, second = Future(), Future()
+            client.client.pushed_results.update({1: first, 2: second})
+            asyncio.get_running_loop().call_later(0.25, first.set_result, 'a')
+            start = time.monotonic()
+            with self.assertRaises(TimeoutError):
+                await client.wait([1, 2], timeout=0.3)
+            return time.monotonic() - start
+
+        client = AsyncTaskClient(('127.0.0.1', 1))
+        try:
+            self.assertLess(asyncio.run(wait(client)), 0.45)
+        finally:
+            client.client.connection.connections[0].client_socket.close()
+
+    def test_pushed_results_over_server(self):
+        async def run(address) -> dict:
+            async with AsyncTaskClient(address) as client:
+                identifiers = [await client.submit('reverse', data, push_result=True) for data in ('ab', 'cd')]
+                return await client.wait(identifiers, timeout=5)
+
+        with running_server() as server:
+            self.assertEqual(sorted(asyncio.run(run((server.ip, server.port))).values()), ['ba', 'dc'])
@@ -0,0 +1,54 @@
+import unittest
+
+from Client.ClientLibrary import ClientConnection, ConnectionPool, TaskClient
+from src.ClientRequests import StatusRequest
+from tests.Support import running_server
+
+
+class InFlightWindowTest(unittest.TestCase):
+    def setUp(self):
+        self.connection = ClientConnection(('127.0.0.1', 1), max_in_flight=3)
+        self.sent = list()
+        self.connection.send_msg = self.sent.append
+
+    def tearDown(self):
+        for connection_socket in (self.connection.client_socket, self.connection.wakeup_reader,
+                                  self.connection.wakeup_writer):
+            connection_socket.close()
+
+    def test_not_more_than_max_in_flight_requests_are_sent(self):
+        for identifier in range(5):
+            self.connection.send(StatusRequest, 'status', None, identifier, None)
+        self.connection.send_requests()
+        self.assertEqual(len(self.sent), 1)  # requests are sent by one write
+        self.assertEqual(self.sent[0].count(b'endofmsg'), 3)
+        self.assertEqual((len(self.connection.in_flight), len(self.connection.data_to_send)), (3, 2))
+        self.assertEqual(self.connection.load(), 5)
+
+        self.connection.in_flight.discard(1)  # response is received, the window moves
+        self.connection.send_requests()
+        self.assertEqual((len(self.connection.in_flight), len(self.connection.data_to_send)), (3, 1))
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    def test_request_is_sent_by_least_loaded_connection(self):
+        pool = ConnectionPool(('127.0.0.1', 1), connections=3)
+        try:
+            for connection in pool.connections:
+                connection.wakeup_writer.setblocking(False)
+            for identifier in range(6):
+                pool.send(StatusRequest, 'status', None, identifier, None)
+            self.assertEqual([connection.load() for connection in pool.connections], [2, 2, 2])
+        finally:
+            for connection in pool.connections:
+                for connection_socket in (connection.client_socket, connection.wakeup_reader,
+                                          connection.wakeup_writer):
+                    connection_socket.close()
+
+    def test_pipelined_tasks_over_pool(self):
+        with running_server(delay=0) as server:
+            with TaskClient((server.ip, server.port), poll_interval=0.01, connections=3, max_in_flight=2) as client:
+                data = [f'data {number}' for number in range(20)]
+                identifiers = [future.result(5) for future in [client.submit('reverse', text) for text in data]]
+                results = client.wait(identifiers, timeout=10)
+        self.assertEqual([results[identifier] for identifier in identifiers], [text[::-1] for text in data])
@@ -0,0 +1,44 @@
+import threading
+import time
+import unittest
+
+from Server.ServerEventLoops import UserEventLoop
+from src.MessageHandlers import ServerMessageHandler
+from tests.Support import RawConnection, running_server
+
+
+class FailingEventLoop(UserEventLoop):
+    """event loop, which fails with unexpected error"""
+    released = threading.Event()  # is the connection released
+
+    @ServerMessageHandler.remove_connection_decorator
+    def run(self):
+        raise RuntimeError('unexpected error of event loop')
+
+    def release(self):
+        super(FailingEventLoop, self).release()
+        self.released.set()
+
+
+class RemoveConnectionTest(unittest.TestCase):
+    def setUp(self):
+        self.excepthook = threading.excepthook
+        threading.excepthook = lambda args: None  # the error of event loop is expected
+
+    def tearDown(self):
+        threading.excepthook = self.excepthook
+
+    def test_failed_event_loop_releases_connection(self):
+        with running_server(handler=FailingEventLoop, max_connections_per_ip=1) as server:
+            connection = RawConnection(server)
+            try:
+                self.assertTrue(FailingEventLoop.released.wait(5))
+                deadline = time.monotonic() + 5
+                while server.connections_per_ip and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                self.assertEqual(server.connections_per_ip, {})
+                self.assertEqual(list(server.sockets), [])
+                with self.assertRaises(ConnectionError):  # socket of the connection is closed
+                    connection.receive()
+            finally:
+                connection.close()
@@ -0,0 +1,38 @@
+import time
+import unittest
+
+from tests.Support import RawConnection, running_server
+
+
+def task(request_identifier: int, deadline, data: str = 'abc') -> list:
+    """task request with deadline as list"""
+    return [request_identifier, 'task', None, '--reverse', False, None, data, None, deadline, None, None]
+
+
+class ServerDeadlineValidationTest(unittest.TestCase):
+    def test_invalid_deadlines_get_error_response(self):
+        with running_server(delay=0) as server:
+            connection = RawConnection(server)
+            for request_identifier, deadline in enumerate(['1', -1, True, [1], float('nan'), 1e400], 1):
+                response = connection.request(task(request_identifier, deadline))
+                self.assertIsNotNone(response[2], deadline)
+            self.assertEqual(len(server.worker.tasks), 0)
+            # server is not blocked: other connections are served
+            other = RawConnection(server)
+            self.assertEqual(other.request([1, 'identifiers', None, None, None])[3], '')
+            other.close()
+            connection.close()
+
+    def test_valid_deadlines(self):
+        with running_server(delay=0.2) as server:
+            connection = RawConnection(server)
+            self.assertEqual(connection.request(task(1, 0.01))[7], 1)
+            self.assertEqual(connection.request(task(2, 5))[7], 2)
+            time.sleep(0.5)
+            self.assertEqual(connection.request([3, 'status', None, 1, None, None])[4], 'expired')
+            self.assertEqual(connection.request([4, 'status', None, 2, None, None])[4], 'done')
+            connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
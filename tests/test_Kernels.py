@@ -0,0 +1,85 @@
+import random
+import unittest
+
+from Server import Kernels
+from Server.Kernels import (array_kernels, code_point_kernels, fuse_stages, from_code_points, np, python_kernels,
+                            run_kernel, run_stage, to_code_points, to_text)
+
+
+alphabet: tuple = ('a', 'b', 'я', '\0', '\ud800', '\udc80', '\udfff', '\U0001f600', '\U0010ffff', 'endofmsg')
+special_inputs: tuple = ('', 'a', 'ab', 'abc', '\ud800', '\udc80a', 'a\U0001f600b', '\U0001f600\ud800\U0010ffff',
+                         '\udfff\ud800')  # empty, odd and even length, lone surrogates, astral characters
+
+
+def random_inputs(count: int = 200, max_length: int = 40, seed: int = 26) -> list:
+    """strings of random length from symbols, which differ in UTF-8, UTF-16 and UCS4 representation"""
+    generator = random.Random(seed)
+    return [''.join(generator.choice(alphabet) for _ in range(generator.randrange(max_length)))
+            for _ in range(count)]
+
+
+def reference(task_type: str, data: str) -> str:
+    """result of pipeline by pure python kernels without fusion of stages"""
+    for stage in task_type.split('|'):
+        data = python_kernels[stage](data)
+    return data
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class ArrayKernelsTest(unittest.TestCase):
+    def test_code_points_round_trip(self):
+        for data in special_inputs + tuple(random_inputs()):
+            code_points = to_code_points(data)
+            self.assertEqual(len(code_points), len(data))
+            self.assertEqual(from_code_points(code_points), data)
+
+    def test_array_kernels_are_equal_to_python_kernels(self):
+        for task_type, kernel in python_kernels.items():
+            for data in special_inputs + tuple(random_inputs()):
+                expected = kernel(data)
+                self.assertEqual(array_kernels[task_type](data), expected, (task_type, data))
+                self.assertEqual(from_code_points(code_point_kernels[task_type](to_code_points(data))), expected,
+                                 (task_type, data))
+
+    def test_threshold_selects_equal_implementation(self):
+        data = ''.join(random_inputs(count=1, max_length=2000, seed=1)) * 2
+        for task_type in python_kernels:
+            self.assertEqual(run_kernel(task_type, data), python_kernels[task_type](data))
+
+    def test_array_stages_of_pipeline(self):
+        thresholds = dict(Kernels.array_thresholds)
+        Kernels.array_thresholds.update({task_type: 0 for task_type in thresholds})  # arrays between all stages
+        try:
+            self.assertPipelinesMatchReference()
+        finally:
+            Kernels.array_thresholds.update(thresholds)
+
+    def assertPipelinesMatchReference(self):
+        generator = random.Random(26)
+        for data in special_inputs + tuple(random_inputs(count=50)):
+            stages = [generator.choice(('reverse', 'pair_permutation')) for _ in range(generator.randrange(5))]
+            if not stages or generator.random() < 0.5:  # not more than once: the result grows quadratically
+                stages.insert(generator.randrange(len(stages) + 1), 'symbol_repeat')
+            value = data
+            plan = fuse_stages(stages)
+            for number, stage in enumerate(plan):
+                value = run_stage(stage, value, number + 1 == len(plan))
+            self.assertEqual(to_text(value), reference('|'.join(stages), data), (stages, data))
+
+
+class PythonPipelineTest(unittest.TestCase):
+    def test_fused_pipeline_is_equal_to_all_stages(self):
+        for stages in (['reverse', 'reverse'], ['pair_permutation', 'reverse', 'reverse', 'pair_permutation'],
+                       ['symbol_repeat', 'symbol_repeat'], ['reverse', 'pair_permutation', 'reverse']):
+            for data in special_inputs:
+                value = data
+                for stage in fuse_stages(stages):
+                    value = python_kernels[stage](value)
+                self.assertEqual(value, reference('|'.join(stages), data), (stages, data))
+
+    def test_python_kernels_on_special_inputs(self):
+        self.assertEqual(python_kernels['pair_permutation']('a\U0001f600b'), '\U0001f600ab')
+        self.assertEqual(python_kernels['reverse']('\ud800\udc80'), '\udc80\ud800')  # lone surrogates stay apart
+        self.assertEqual(python_kernels['symbol_repeat']('\U0010ffffa'), '\U0010ffffaa')
+        for kernel in python_kernels.values():
+            self.assertEqual(kernel(''), '')
@@ -0,0 +1,39 @@
+import threading
+import unittest
+
+from Client.LoadGenerator import LoadGenerator, format_report, parse_mix
+from tests.Support import running_server
+
+
+class LoadGeneratorTest(unittest.TestCase):
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix('reverse=3, status'), {'reverse': 3.0, 'status': 1.0})
+        with self.assertRaises(ValueError):
+            parse_mix('reverse=1,unknown=2')
+
+    def test_percentile(self):
+        values = [float(i) for i in range(100)]
+        self.assertEqual(LoadGenerator.percentile(values, 0.5), 50.0)
+        self.assertEqual(LoadGenerator.percentile(values, 0.999), 99.0)
+        self.assertIsNone(LoadGenerator.percentile([], 0.5))
+
+    def test_errors_of_connection_threads_are_counted(self):
+        generator = LoadGenerator(('127.0.0.1', 1), connections=8, duration=0, mix='reverse')
+        threads = [threading.Thread(target=lambda: [generator.record('reverse', None, 'error') for _ in range(10000)])
+                   for _ in range(generator.connections)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(generator.errors['reverse'], 80000)
+
+    def test_closed_loop_against_server(self):
+        with running_server(delay=0) as server:
+            generator = LoadGenerator((server.ip, server.port), connections=2, duration=0.3,
+                                      mix='reverse=1,reverse_b=1,identifiers=1', timeout=5)
+            report = generator.run()
+        self.assertEqual(report['connection_errors'], 0)
+        for label in ('reverse', 'reverse_b', 'identifiers'):
+            self.assertGreater(report['commands'][label]['count'], 0, label)
+            self.assertEqual(report['commands'][label]['errors'], 0, label)
+        self.assertIn('reverse_b', format_report(report))
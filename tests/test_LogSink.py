@@ -0,0 +1,66 @@
+import time
+import unittest
+from io import StringIO
+
+from src.LogSink import LogSink
+
+
+class CountingStream(StringIO):
+    def __init__(self):
+        super(CountingStream, self).__init__()
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        self.writes += 1
+        return super(CountingStream, self).write(text)
+
+
+class LogSinkTest(unittest.TestCase):
+    def test_format(self):
+        timestamp = time.mktime((2024, 1, 2, 3, 4, 5, 0, 0, -1)) + 0.25
+        line = LogSink.format((timestamp, 'error', ('Send error:', 'broken pipe'), {'client': '127.0.0.1:1', 'id': 7}))
+        self.assertEqual(line, '2024-01-02 03:04:05.250 ERROR Send error: broken pipe client=127.0.0.1:1 id=7')
+
+    def test_records_below_level_are_not_queued(self):
+        sink = LogSink(StringIO(), level='warning')
+        sink.info('info')
+        sink.debug('debug')
+        sink.error('error')
+        self.assertEqual(sink.queue.qsize(), 1)
+        sink.set_level('debug')
+        sink.debug('debug')
+        self.assertEqual(sink.queue.qsize(), 2)
+
+    def test_records_are_written_by_batches_and_on_stop(self):
+        stream = CountingStream()
+        sink = LogSink(stream, batch_size=2)
+        for number in range(5):
+            sink.info('record', number)
+        sink.start()
+        sink.stop()
+        self.assertFalse(sink.thread.is_alive())
+        lines = stream.getvalue().splitlines()
+        self.assertEqual([line.split(' ', 2)[2] for line in lines], [f'INFO record {number}' for number in range(5)])
+        self.assertEqual(stream.writes, 3)
+
+    def test_dropped_records_are_reported(self):
+        stream = StringIO()
+        sink = LogSink(stream, capacity=2)
+        for number in range(5):
+            sink.info('record', number)
+        self.assertEqual(sink.dropped, 3)
+        sink.start()
+        sink.stop()
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[-1].endswith('WARNING 3 log records dropped'))
+        self.assertEqual(sink.dropped, 0)
+
+    def test_closed_stream_does_not_stop_writer(self):
+        stream = StringIO()
+        sink = LogSink(stream)
+        stream.close()
+        sink.start()
+        sink.info('lost')
+        sink.stop()
+        self.assertFalse(sink.thread.is_alive())
@@ -0,0 +1,56 @@
+import tracemalloc
+import unittest
+
+from Server.Memory import SnapshotDiff, format_size, memory_report
+from tests.Support import RawConnection, running_server
+
+
+class FormatSizeTest(unittest.TestCase):
+    def test_units(self):
+        self.assertEqual(format_size(0), '0 B')
+        self.assertEqual(format_size(1023), '1023 B')
+        self.assertEqual(format_size(1536), '1.5 KiB')
+        self.assertEqual(format_size(3 * 1024 ** 2), '3.0 MiB')
+        self.assertEqual(format_size(2048 * 1024 ** 3), '2048.0 GiB')
+        self.assertEqual(format_size(-2048), '-2.0 KiB')
+
+
+class MemoryReportTest(unittest.TestCase):
+    def test_report_by_subsystems(self):
+        with running_server(delay=10) as server:
+            connection = RawConnection(server)
+            try:
+                connection.request([1, 'task', None, '--reverse', False, None, 'a' * 10000, None, None, None, None])
+                lines = memory_report(server).splitlines()
+            finally:
+                connection.close()
+        self.assertTrue(any(line.startswith('task table: ') for line in lines))
+        task_type = [line.strip() for line in lines if line.strip().startswith('--reverse:')]
+        self.assertEqual(len(task_type), 1)
+        self.assertTrue(task_type[0].startswith('--reverse: 1 tasks (1 not finished), inputs 9.'), task_type[0])
+        self.assertIn('connections: 1 open, 0 with stopped event loop', lines)
+        self.assertTrue(lines[-1].strip().endswith('1 not finished tasks'), lines[-1])
+
+
+class SnapshotDiffTest(unittest.TestCase):
+    def setUp(self):
+        if tracemalloc.is_tracing():
+            self.skipTest('tracemalloc is started outside of test')
+        self.snapshots = SnapshotDiff()
+
+    def tearDown(self):
+        self.snapshots.stop()
+
+    def test_growth_since_baseline(self):
+        self.assertEqual(self.snapshots.diff(), 'tracemalloc is not started')
+        self.assertEqual(self.snapshots.start(), 'tracemalloc started with 1 frames, baseline snapshot taken')
+        self.assertEqual(self.snapshots.start(), 'tracemalloc is already started')
+        leak = [str(number) * 100 for number in range(1000)]
+        lines = self.snapshots.diff(5, 'filename').splitlines()
+        self.assertTrue(lines[0].startswith('top 5 of '))
+        self.assertIn('test_Memory.py', lines[1])
+        self.assertTrue(self.snapshots.snapshot().startswith('baseline snapshot taken: '))
+        self.assertEqual(len(leak), 1000)
+        self.assertEqual(self.snapshots.stop(), 'tracemalloc stopped')
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual(self.snapshots.stop(), 'tracemalloc is not started')
@@ -0,0 +1,63 @@
+import threading
+import unittest
+from types import SimpleNamespace
+
+from src.Metrics import MetricsRegistry
+from src.ServerRequest import semaphore_decorator
+from tests.Support import RawConnection, running_server
+
+
+class MetricsLabelsTest(unittest.TestCase):
+    def test_labels_of_different_types_are_rendered(self):
+        registry = MetricsRegistry()
+        counter = registry.counter('requests_total', 'Requests', 'command')
+        counter.inc(label='task')
+        counter.inc(label=5)
+        counter.inc(label=None)
+        self.assertEqual(len(registry.render_text().splitlines()), 3)
+        self.assertIn('requests_total{command="5"} 1', registry.render_prometheus())
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        registry.counter('requests_total', 'Requests', 'command').inc(label='a"b\\c\nd')
+        registry.histogram('latency_seconds', 'Latency', 'command').observe(0.1, 'x"y')
+        text = registry.render_prometheus()
+        self.assertIn('requests_total{command="a\\"b\\\\c\\nd"} 1', text)
+        self.assertIn('latency_seconds_count{command="x\\"y"} 1', text)
+        self.assertIn('latency_seconds_bucket{command="x\\"y",le="+Inf"} 1', text)
+
+
+class SemaphoreDecoratorTest(unittest.TestCase):
+    def test_semaphore_is_released_on_exception(self):
+        class FailingRequest:
+            trace = None
+            event_handler = SimpleNamespace(worker=SimpleNamespace(semaphore=threading.Semaphore(1)), data_to_send=[])
+
+            @semaphore_decorator
+            def run(self):
+                raise ValueError('broken request')
+
+        request = FailingRequest()
+        with self.assertRaises(ValueError):
+            request.run()
+        self.assertTrue(request.event_handler.worker.semaphore.acquire(blocking=False))
+
+
+class InvalidCommandTest(unittest.TestCase):
+    def test_invalid_command_does_not_break_stats(self):
+        with running_server() as server:
+            attacker = RawConnection(server)
+            attacker.send([1, 5, None, None, None, None])  # command is not string
+            with self.assertRaises(ConnectionError):  # server closes the connection after invalid request
+                attacker.receive()
+            client = RawConnection(server)
+            response = client.request([1, 'stats', None, None, None])
+            self.assertIsNone(response[2])
+            self.assertIn('requests_total{command="invalid"}: ', response[3])
+            self.assertEqual(client.request([2, 'identifiers', None, None, None])[1], 'identifiers')
+            attacker.close()
+            client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
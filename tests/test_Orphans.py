@@ -0,0 +1,50 @@
+import time
+import unittest
+
+from Server.Worker import Worker
+from tests.Support import task
+
+
+class OrphanPolicyTest(unittest.TestCase):
+    def worker(self, orphan_policy: str) -> Worker:
+        worker = Worker(orphan_policy)
+        worker.delays = {task_type: 0 for task_type in Worker.delays}
+        return worker
+
+    def test_wrong_policy(self):
+        with self.assertRaises(ValueError):
+            Worker('drop')
+
+    def test_cancel_policy_cancels_tasks_of_disconnected_client(self):
+        worker = self.worker('cancel')
+        orphan, other = task(), task()
+        orphaned = worker.add_task(orphan)
+        kept = worker.add_task(other)
+        worker.release_connection(orphan.event_handler)
+        self.assertEqual(worker.tasks.get_status(orphaned), 'cancelled')
+        self.assertEqual(worker.tasks.get_status(kept), 'in queue')
+        self.assertFalse(worker.has_tasks(orphan.event_handler))
+        self.assertNotIn(orphan.event_handler, worker.connection_ids)
+
+    def test_deprioritize_policy_computes_orphans_last(self):
+        worker = self.worker('deprioritize')
+        orphan, other = task('orphan'), task('other')
+        orphaned = worker.add_task(orphan)
+        worker.release_connection(orphan.event_handler)
+        kept = worker.add_task(other)
+        worker.delay_tasks()
+        time.sleep(0.01)
+        self.assertEqual(worker.pop_ready_task(), kept)
+        self.assertEqual(worker.pop_ready_task(), orphaned)
+        self.assertIsNone(worker.pop_ready_task())
+
+    def test_keep_policy_computes_orphan_result(self):
+        worker = self.worker('keep')
+        orphan = task('abc')
+        orphaned = worker.add_task(orphan)
+        worker.release_connection(orphan.event_handler)
+        worker.delay_tasks()
+        worker.compute_stage(worker.pop_ready_task())
+        self.assertEqual(worker.tasks.get_status(orphaned), 'done')
+        self.assertEqual(worker.tasks.get_result(orphaned), 'cba')
+        self.assertEqual(worker.tasks.owner[orphaned - 1], 0)
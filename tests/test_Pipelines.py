@@ -0,0 +1,44 @@
+import unittest
+
+from src.ClientRequests import Task
+from tests.Support import RawConnection, running_server
+
+
+def task(request_identifier: int, task_type, data='abcdef', is_batch_processing_mode=False) -> list:
+    """task request as list"""
+    return [request_identifier, 'task', None, task_type, is_batch_processing_mode,
+            request_identifier + 1000 if is_batch_processing_mode else None, data, None, None, None, None]
+
+
+class ServerPipelineValidationTest(unittest.TestCase):
+    def test_invalid_task_types_get_error_response(self):
+        with running_server(delay=0) as server:
+            connection = RawConnection(server)
+            wrong_types = ['--reverse|--unknown', '--unknown', '', 5, None,
+                           '|'.join(['--reverse'] * (Task.max_stages + 1))]
+            for request_identifier, task_type in enumerate(wrong_types, 1):
+                response = connection.request(task(request_identifier, task_type))
+                self.assertEqual(response[0], request_identifier)
+                self.assertIsNotNone(response[2], task_type)
+                self.assertIsNone(response[7])
+            self.assertEqual(len(server.worker.tasks), 0)
+            self.assertEqual(server.worker.tasks.task_types, [])
+
+            # worker is alive and computes valid pipeline
+            self.assertEqual(connection.request(task(10, '--reverse|--pair_permutation', 'abcdef', True))[7], 1)
+            response = connection.receive()
+            self.assertEqual((response[0], response[2], response[4]), (1010, None, 'efcdab'))
+            self.assertTrue(server.worker.thread.is_alive())
+            connection.close()
+
+    def test_data_must_be_string(self):
+        with running_server(delay=0) as server:
+            connection = RawConnection(server)
+            response = connection.request(task(1, '--reverse', data=[1, 2]))
+            self.assertIsNotNone(response[2])
+            self.assertEqual(len(server.worker.tasks), 0)
+            connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
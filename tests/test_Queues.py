@@ -0,0 +1,68 @@
+import os
+import socket
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from Client.Queues import InputOutput, Queue, result_window_script
+from src.ClientRequests import StatusRequest
+
+
+class RetryTest(unittest.TestCase):
+    def setUp(self):
+        self.client_socket = socket.socket()
+        self.event_handler = SimpleNamespace(request_num=0, client_socket=self.client_socket,
+                                             address=('127.0.0.1', 5),
+                                             batch_processing_mode=SimpleNamespace(status=False, task=None))
+        self.queue = Queue(self.event_handler, request_timeout=0.01)
+        self.queue.retry_backoff = 0.001
+
+    def tearDown(self):
+        self.client_socket.close()
+
+    def send_status(self) -> StatusRequest:
+        """send status request and wait until it is queued to be sent again"""
+        self.queue.create_request('status 5')
+        request = self.queue.data_to_send.pop()
+        self.queue.register_waiting(request)
+        deadline = time.monotonic() + 5
+        while not self.queue.data_to_send and time.monotonic() < deadline:
+            time.sleep(0.005)
+            self.queue.check_timeouts()
+        self.assertEqual(list(self.queue.data_to_send), [request])
+        return request
+
+    def response(self, request: StatusRequest) -> StatusRequest:
+        return StatusRequest(self.event_handler, request.request_identifier_on_client, 'status', None, 5, 'done')
+
+    def test_late_response_is_accepted_before_request_is_sent_again(self):
+        request = self.send_status()
+        self.queue.handle_response(self.response(request))
+        self.assertEqual(self.queue.data_to_show.items[0][0], 'status, 5: done')
+        self.assertEqual(len(self.queue.data_to_send), 0)  # answered request is not sent again
+        self.assertEqual(self.queue.wait_for_result, {})
+
+    def test_response_to_request_sent_again(self):
+        request = self.send_status()
+        self.queue.register_waiting(self.queue.data_to_send.pop())
+        self.queue.handle_response(self.response(request))
+        self.assertEqual(self.queue.data_to_show.items[0][0], 'status, 5: done')
+        self.assertEqual(self.queue.resending, set())
+
+
+class ResultWindowSubprocessTest(unittest.TestCase):
+    def test_result_window_script_is_started(self):
+        with socket.socket() as sender_socket:
+            input_output = InputOutput.__new__(InputOutput)
+            input_output.event_handler = SimpleNamespace(
+                result_window_sender=SimpleNamespace(client_socket=sender_socket, address=('127.0.0.1', 5)))
+            input_output.readiness = SimpleNamespace(address='tcp://127.0.0.1:6')
+            for system in ('Linux', 'Windows'):
+                with mock.patch('Client.Queues.platform.system', return_value=system), \
+                        mock.patch('Client.Queues.Popen') as popen:
+                    input_output.start_subprocess()
+                arguments = popen.call_args[0][0]
+                self.assertIn(result_window_script, arguments)
+                self.assertTrue(os.path.isfile(arguments[arguments.index(result_window_script)]))
+                self.assertEqual(arguments[-4:], ['--address', 'tcp://127.0.0.1:5', '--notify', 'tcp://127.0.0.1:6'])
@@ -0,0 +1,85 @@
+import time
+import unittest
+from json import loads
+from threading import Thread
+
+from Client.Queues import DisplayQueue, ResultRelay
+
+
+class DisplayQueueTest(unittest.TestCase):
+    def test_items_are_coalesced_in_order(self):
+        queue = DisplayQueue()
+        for text in ('a', 'b', 'c'):
+            queue.appendleft([text, None])
+        lines, traces = queue.pop_batch(1024, 0, lambda: True)
+        self.assertEqual(lines, [['a', None], ['b', None], ['c', None]])
+        self.assertEqual(traces, [])
+
+    def test_control_item_ends_frame(self):
+        queue = DisplayQueue()
+        for item in (['a', None], ['', 'shutdown'], ['b', None]):
+            queue.appendleft(item)
+        self.assertEqual(queue.pop_batch(1024, 0, lambda: True)[0], [['a', None], ['', 'shutdown']])
+        self.assertEqual(queue.pop_batch(1024, 0, lambda: True)[0], [['b', None]])
+
+    def test_size_budget(self):
+        queue = DisplayQueue()
+        for text in ('aaaa', 'bb', 'cc'):
+            queue.appendleft([text, None])
+        self.assertEqual(queue.pop_batch(3, 1.0, lambda: True)[0], [['aaaa', None]])  # one item is popped anyway
+        self.assertEqual(queue.pop_batch(4, 1.0, lambda: True)[0], [['bb', None], ['cc', None]])
+
+    def test_traces_are_returned(self):
+        queue = DisplayQueue()
+        trace = {'id': 'a', 'command': 'status', 'hops': []}
+        queue.appendleft(['a', None, trace])
+        queue.appendleft(['b', None, None])
+        self.assertEqual(queue.pop_batch(1024, 0, lambda: True), ([['a', None], ['b', None]], [trace]))
+
+    def test_waits_for_next_items_within_delay(self):
+        queue = DisplayQueue()
+        queue.appendleft(['a', None])
+        Thread(target=lambda: (time.sleep(0.05), queue.appendleft(['b', None]))).start()
+        self.assertEqual(queue.pop_batch(1024, 0.5, lambda: True)[0], [['a', None], ['b', None]])
+
+    def test_watermarks(self):
+        queue = DisplayQueue(high_watermark=3, low_watermark=1)
+        for _ in range(4):
+            queue.appendleft(['a', None])
+        self.assertTrue(queue.is_full())
+        queue.items.pop()
+        self.assertTrue(queue.is_full())  # still full until the queue is drained below low watermark
+        queue.items.pop()
+        queue.items.pop()
+        self.assertFalse(queue.is_full())
+        queue.appendleft(['a', None])
+        self.assertFalse(queue.is_full())
+
+
+class FakeSender:
+    def __init__(self):
+        self.frames = list()
+
+    def send_msg(self, frame: bytes):
+        self.frames.append(frame)
+
+
+class ResultRelayTest(unittest.TestCase):
+    def test_frames_are_sent_with_escaped_end_of_message(self):
+        queue, sender = DisplayQueue(), FakeSender()
+        relay = ResultRelay(queue, sender, max_bytes=1024, max_delay=0)
+        for item in (['text with endofmsg', None], ['b', None], ['', 'shutdown']):
+            queue.appendleft(item)
+        thread = Thread(target=relay.run)
+        thread.start()
+        deadline = time.monotonic() + 5
+        while not sender.frames and time.monotonic() < deadline:
+            time.sleep(0.01)
+        relay.stop()
+        thread.join(5)
+        self.assertEqual(len(sender.frames), 1)
+        frame = sender.frames[0]
+        self.assertEqual(frame.count(b'endofmsg'), 1)
+        self.assertTrue(frame.endswith(b'endofmsg'))
+        self.assertEqual(loads(frame[:-len(b'endofmsg')].decode('utf-8')),
+                         [['text with endofmsg', None], ['b', None], ['', 'shutdown']])
@@ -0,0 +1,80 @@
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from Client.Queues import Queue, ResultCache
+from src.ClientRequests import InfoRequest
+from tests.Support import RawConnection, running_server
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_disk_is_used_only_after_bind(self):
+        cache = ResultCache(directory=self.directory)
+        cache.put(1, 'done', 'a')
+        self.assertEqual(os.listdir(self.directory), [])
+        self.assertEqual(cache.get(1), ('done', 'a'))
+
+    def test_entries_of_other_server_instance_are_not_read(self):
+        cache = ResultCache(directory=self.directory)
+        cache.bind('tcp://127.0.0.1:12345', 'first')
+        cache.put(1, 'done', 'a')
+        self.assertEqual(ResultCache(directory=self.directory).get(1), None)  # not bound
+
+        restarted = ResultCache(directory=self.directory)
+        restarted.bind('tcp://127.0.0.1:12345', 'second')
+        self.assertEqual(restarted.get(1), None)
+        self.assertEqual(os.listdir(os.path.dirname(restarted.instance_directory)), ['second'])
+
+        same = ResultCache(directory=self.directory)
+        same.bind('tcp://127.0.0.1:12345', 'second')
+        restarted.put(2, 'cancelled')
+        self.assertEqual(same.get(2), ('cancelled', None))
+
+    def test_memory_entries_are_dropped_for_new_instance(self):
+        cache = ResultCache()
+        cache.bind('tcp://127.0.0.1:12345', 'first')
+        cache.put(1, 'done', 'a')
+        cache.bind('tcp://127.0.0.1:12345', 'first')
+        self.assertEqual(cache.get(1), ('done', 'a'))
+        cache.bind('tcp://127.0.0.1:12345', 'second')
+        self.assertEqual((cache.get(1), cache.size), (None, 0))
+
+    def test_instance_must_be_safe_name(self):
+        cache = ResultCache(directory=self.directory)
+        for instance in ('../escape', '', None, 'a/b'):
+            with self.assertRaises(ValueError):
+                cache.bind('tcp://127.0.0.1:12345', instance)
+        self.assertIsNone(cache.instance_directory)
+
+
+class InstanceRequestTest(unittest.TestCase):
+    def test_server_instance(self):
+        with running_server() as server:
+            connection = RawConnection(server)
+            try:
+                self.assertEqual(connection.request([1, 'instance', None, None, None])[3], server.worker.instance)
+            finally:
+                connection.close()
+
+    def test_queue_binds_cache_without_showing_response(self):
+        with socket.socket() as client_socket:
+            event_handler = SimpleNamespace(request_num=0, client_socket=client_socket, address=('127.0.0.1', 5),
+                                            batch_processing_mode=SimpleNamespace(status=False, task=None))
+            queue = Queue(event_handler)
+            queue.request_instance()
+            request = queue.data_to_send.pop()
+            queue.register_waiting(request)
+            queue.handle_response(InfoRequest(event_handler, request.request_identifier_on_client, 'instance',
+                                              None, 'abc'))
+            self.assertEqual(queue.result_cache.instance, 'abc')
+            self.assertEqual(len(queue.data_to_show), 0)
+            self.assertEqual(queue.wait_for_result, {})
@@ -0,0 +1,116 @@
+import os
+import tempfile
+import unittest
+from io import BytesIO, StringIO, TextIOWrapper
+from json import dumps
+
+from Server.ResultSink import ResultSink
+from Server.ServerEventLoops import ResultWindowEventLoop, ResultWindowServer
+
+
+class CountingStream(StringIO):
+    def __init__(self):
+        super(CountingStream, self).__init__()
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        self.writes += 1
+        return super(CountingStream, self).write(text)
+
+
+class ResultSinkTest(unittest.TestCase):
+    def test_buffered_lines_are_rendered_by_one_write(self):
+        stream = CountingStream()
+        sink = ResultSink(stream)
+        for text in ('a', 'b', 'c'):
+            sink.write(text)
+        self.assertFalse(sink.flush())
+        self.assertEqual((stream.getvalue(), stream.writes), ('a\nb\nc\n', 1))
+
+    def test_rate_limit_of_flush(self):
+        stream = StringIO()
+        sink = ResultSink(stream, max_bytes_per_flush=4)
+        for text in ('aaaaa', 'bb', 'cc', 'd'):
+            sink.write(text)
+        self.assertTrue(sink.flush())
+        self.assertEqual(stream.getvalue(), 'aaaaa\n')  # one line is rendered anyway
+        self.assertTrue(sink.flush())
+        self.assertFalse(sink.flush())
+        self.assertEqual(stream.getvalue(), 'aaaaa\nbb\ncc\nd\n')
+
+    def test_stop_renders_rest_of_buffer(self):
+        stream = StringIO()
+        sink = ResultSink(stream, flush_interval=10, max_bytes_per_flush=1)
+        sink.start()
+        for text in ('a', 'b', 'c'):
+            sink.write(text)
+        sink.stop()
+        self.assertEqual(stream.getvalue(), 'a\nb\nc\n')
+
+    def test_large_result_is_summarized_paged_and_saved(self):
+        stream = StringIO()
+        sink = ResultSink(stream, summary_threshold=10, page_size=4)
+        text = 'abcdefghijk'
+        sink.write(text)
+        sink.flush()
+        self.assertIn('[result #1] 11 symbols', stream.getvalue())
+        self.assertNotIn(text + '\n', stream.getvalue())
+        self.assertEqual(sink.page(1, 3), '[result #1, page 3/3]\nijk')
+        self.assertEqual(sink.page(1, 4), 'Page 4 not found. Result #1 has 3 pages')
+        self.assertEqual(sink.page(2), 'Result #2 not found')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'result.txt')
+            sink.command(f'save 1 {path}')
+            with open(path, encoding='utf-8') as file:
+                self.assertEqual(file.read(), text)
+
+    def test_commands(self):
+        stream = StringIO()
+        sink = ResultSink(stream, summary_threshold=10, page_size=4)
+        sink.write('abcdefghijk')
+        sink.flush()
+        for user_input in ('page 1 2', 'page x', 'unknown', ''):
+            sink.command(user_input)
+        sink.flush()
+        self.assertEqual(stream.getvalue().splitlines()[-4:], [
+            '[result #1, page 2/3]', 'efgh', 'Number of result and number of page must be integers',
+            'Commands: "page <number> [<page>]", "save <number> <path>"'])
+
+    def test_lone_surrogates_do_not_stop_writer(self):
+        stream = TextIOWrapper(BytesIO(), encoding='utf-8')  # strict stream, as stdout
+        sink = ResultSink(stream, flush_interval=0.01, summary_threshold=10)
+        sink.start()
+        sink.write('bad \udcff')
+        sink.write('large \udcff result')
+        sink.write('good')
+        sink.stop()
+        stream.seek(0)
+        lines = stream.read().splitlines()
+        self.assertEqual(lines[0], 'bad ?')
+        self.assertTrue(lines[1].startswith('[result #1] 14 symbols, sha256 '))
+        self.assertEqual(lines[-1], 'good')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'result.txt')
+            self.assertEqual(sink.save(1, path), f'Result #1 saved to {path}')
+            with open(path, 'rb') as file:
+                self.assertEqual(file.read(), b'large \xff result')  # surrogate of uploaded byte is restored
+
+    def test_oldest_stored_results_are_removed(self):
+        sink = ResultSink(StringIO(), summary_threshold=1, stored_results=2)
+        for text in ('aa', 'bb', 'cc'):
+            sink.write(text)
+        self.assertEqual(list(sink.results), [2, 3])
+
+
+class ResultWindowServerTest(unittest.TestCase):
+    def test_frame_is_shown_through_sink(self):
+        stream = StringIO()
+        server = ResultWindowServer(ResultWindowEventLoop, ResultSink(stream))
+        try:
+            self.assertFalse(server.show_frame(dumps([['a', None], ['', None], ['b', None]]).encode('utf-8')))
+            self.assertTrue(server.show_frame(dumps([['c', None], ['', 'shutdown']]).encode('utf-8')))
+            self.assertFalse(server.is_active)
+            server.sink.flush()
+            self.assertEqual(stream.getvalue(), 'a\nb\nc\n')
+        finally:
+            server.server_socket.close()
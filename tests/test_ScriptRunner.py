@@ -0,0 +1,75 @@
+import socket
+import unittest
+from io import StringIO
+from types import SimpleNamespace
+
+from Client.ClientLibrary import BatchProcessingModeStub
+from Client.ScriptRunner import ScriptRunner
+from src.ClientRequests import create_request
+from src.Exceptions import IdentifierNotFound
+from tests.Support import running_server
+
+
+class ParserTest(unittest.TestCase):
+    def setUp(self):
+        self.event_handler = SimpleNamespace(request_num=0, batch_processing_mode=BatchProcessingModeStub())
+
+    def parse(self, user_input: str):
+        return create_request(user_input, self.event_handler)
+
+    def test_task(self):
+        request = self.parse('  task   --reverse your  text ')
+        self.assertEqual((request.task_type, request.data, request.is_batch_processing_mode, request.deadline),
+                         ('--reverse', 'your  text ', False, None))
+        request = self.parse('task --symbol_repeat -b -d 5 a b')
+        self.assertEqual((request.task_type, request.data, request.is_batch_processing_mode, request.deadline),
+                         ('--symbol_repeat', 'a b', True, 5.0))
+        self.assertEqual(request.request_identifier_on_result, request.request_identifier_on_client + 1)
+        with self.assertRaises(ValueError):
+            self.parse('task --reverse')
+
+    def test_identifiers(self):
+        self.assertEqual(self.parse('status 5').identifier, 5)
+        self.assertEqual(self.parse('result\t 7').identifier, 7)
+        self.assertEqual(self.parse('cancel 1, 2 3').identifier, [1, 2, 3])
+        with self.assertRaises(IdentifierNotFound):
+            self.parse('status')
+        with self.assertRaises(ValueError):
+            self.parse('cancel 1,a')
+
+
+class ScriptRunnerTest(unittest.TestCase):
+    def test_script_is_pipelined_and_results_are_written_by_line(self):
+        script = ['# comment\n', '\n', 'task --reverse abc\n', 'task --reverse -b xyz\n', 'unknown 1\n',
+                  'status 1\n', 'cancel 1,a\n']
+        output = StringIO()
+        with running_server(delay=0) as server:
+            runner = ScriptRunner(socket.socket(socket.AF_INET, socket.SOCK_STREAM), (server.ip, server.port),
+                                  script, output, max_in_flight=2, timeout=5)
+            try:
+                runner.connect()
+                report = runner.run()
+            finally:
+                runner.client_socket.close()
+        self.assertEqual({key: report[key] for key in ('commands', 'responses', 'errors', 'parse_errors')},
+                         {'commands': 5, 'responses': 4, 'errors': 0, 'parse_errors': 2})
+        results = [line.split('\t', 1) for line in output.getvalue().splitlines()]
+        self.assertEqual(sorted(int(line_num) for line_num, text in results), [3, 4, 4, 5, 6, 7])
+        self.assertIn(['4', 'result, 2: zyx'], results)
+        self.assertIn(['7', 'ValueError. Identifier must be integer'], results)
+        self.assertEqual(runner.pending, dict())
+
+    def test_lines_without_response_are_reported(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as listener:
+            listener.bind(('127.0.0.1', 0))
+            listener.listen(1)  # connection is accepted by backlog, but nobody responds
+            output = StringIO()
+            runner = ScriptRunner(socket.socket(socket.AF_INET, socket.SOCK_STREAM), listener.getsockname(),
+                                  ['status 1\n', 'status 2\n'], output, timeout=0.2)
+            try:
+                runner.connect()
+                report = runner.run()
+            finally:
+                runner.client_socket.close()
+        self.assertEqual(output.getvalue(), '1\tNo response in 0.2 s\n2\tNo response in 0.2 s\n')
+        self.assertEqual(report['errors'], 2)
@@ -0,0 +1,60 @@
+import io
+import unittest
+
+from Server.TaskTable import TaskTable
+
+
+class TaskTableTest(unittest.TestCase):
+    def assertConsistent(self, table: TaskTable, rows: int):
+        for column in table.columns():
+            self.assertEqual(len(column), rows)
+        self.assertEqual(len(table.data_arena), table.data_end[-1] if rows else 0)
+
+    def test_add_and_read_row(self):
+        table = TaskTable()
+        identifier = table.add(1, 7, '--reverse', True, 8, 'data\udc80', 5.0)
+        self.assertEqual(table.get_data(identifier), 'data\udc80')
+        self.assertEqual(table.get_status(identifier), 'in queue')
+        self.assertEqual(table.get_deadline(identifier), 5.0)
+        self.assertEqual(table.request_identifier_on_result[0], 8)
+        table.set_result(identifier, 'atad')
+        self.assertEqual(table.get_result(identifier), 'atad')
+
+    def test_uploaded_data_is_copied(self):
+        table = TaskTable()
+        table.copy_chunk_size = 3
+        identifier = table.add(1, 1, '--reverse', False, None, io.BytesIO('abcdefgh'.encode()))
+        self.assertEqual(table.get_data(identifier), 'abcdefgh')
+        self.assertEqual(table.request_identifier_on_result[0], -1)
+
+    def test_value_out_of_column_range_rolls_back_row(self):
+        table = TaskTable()
+        table.add(1, 1, '--reverse', False, None, 'first')
+        for wrong in ({'owner': -1}, {'request_identifier_on_client': 'x'}, {'deadline': 'soon'}):
+            row = dict(owner=1, request_identifier_on_client=2, task_type='--pair_permutation',
+                       is_batch_processing_mode=False, request_identifier_on_result=None, data='second')
+            row.update(wrong)
+            with self.assertRaises(ValueError):
+                table.add(**row)
+            self.assertConsistent(table, 1)
+            self.assertEqual(table.task_types, ['--reverse'])
+        self.assertEqual(table.get_data(table.add(1, 3, '--reverse', False, None, 'third')), 'third')
+
+    def test_task_types_are_limited(self):
+        table = TaskTable()
+        table.max_task_types = 2
+        table.add(1, 1, '--reverse', False, None, 'a')
+        table.add(1, 2, '--pair_permutation', False, None, 'b')
+        with self.assertRaises(ValueError):
+            table.add(1, 3, '--symbol_repeat', False, None, 'c')
+        self.assertConsistent(table, 2)
+        self.assertEqual(len(table.plans), 2)
+        table.add(1, 4, '--reverse', False, None, 'd')  # known task type is accepted
+        self.assertConsistent(table, 3)
+
+    def test_column_capacity_is_default_limit(self):
+        self.assertEqual(TaskTable.max_task_types, 2 ** (8 * TaskTable().task_type.itemsize))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+
+from src.Tracing import Tracer, breakdown, checked_trace, copy_trace, hop
+from tests.Support import RawConnection, running_server
+
+
+def hop_names(trace: dict) -> list:
+    return [name for name, timestamp in trace['hops']]
+
+
+class TracerTest(unittest.TestCase):
+    def test_sampling(self):
+        self.assertIsNone(Tracer(0.0).start('status'))
+        trace = Tracer(1.0).start('status')
+        self.assertEqual((trace['command'], trace['hops']), ('status', []))
+
+    def test_finished_trace_is_copied_to_ring_buffer(self):
+        tracer = Tracer(1.0, capacity=2)
+        traces = [tracer.start('task') for _ in range(3)]
+        for trace in traces:
+            hop(trace, 'client_queued')
+            tracer.finish(trace)
+        hop(traces[-1], 'late_hop')  # finished trace is not changed in buffer
+        self.assertEqual([trace['id'] for trace in tracer.traces], [traces[1]['id'], traces[2]['id']])
+        self.assertEqual(hop_names(tracer.traces[-1]), ['client_queued'])
+        self.assertEqual(len(tracer.dumps().splitlines()), 2)
+
+    def test_copy_continues_independently(self):
+        trace = {'id': 'a', 'command': 'task', 'hops': [['client_sent', 1.0]]}
+        copy = copy_trace(trace)
+        hop(copy, 'worker_queued')
+        self.assertEqual(hop_names(trace), ['client_sent'])
+        self.assertIsNone(copy_trace(None))
+
+    def test_checked_trace(self):
+        trace = {'id': 'a', 'command': 'task', 'hops': [['client_sent', 1.0]], 'other': 1}
+        self.assertEqual(checked_trace(trace), {'id': 'a', 'command': 'task', 'hops': [['client_sent', 1.0]]})
+        for value in ('x', 1, [], {'id': 'a', 'command': 'task'}, {'id': 1, 'command': 'task', 'hops': []},
+                      {'id': 'a', 'command': 'task', 'hops': 'x'}, {'id': 'a', 'command': 'task', 'hops': [1]},
+                      {'id': 'a', 'command': 'task', 'hops': [['client_sent', True]]},
+                      {'id': 'a', 'command': 'task', 'hops': [['client_sent', 1.0]] * 65}):
+            self.assertIsNone(checked_trace(value), value)
+
+    def test_breakdown(self):
+        lines = breakdown({'id': 'a', 'command': 'task', 'hops': [['first', 1.0], ['second', 1.5]]})
+        self.assertEqual(lines, ['trace a task: total 500.000 ms', '    first -> second: 500.000 ms'])
+
+
+class ServerTracingTest(unittest.TestCase):
+    def test_trace_of_client_is_continued_by_server_and_worker(self):
+        with running_server(delay=0) as server:
+            connection = RawConnection(server)
+            try:
+                trace = {'id': 'a', 'command': 'task', 'hops': [['client_sent', 0.0]]}
+                response = connection.request([1, 'task', None, '--reverse', True, 2, 'ab', None, None, trace, None])
+                self.assertEqual(hop_names(response[9]), ['client_sent', 'server_read', 'worker_semaphore',
+                                                          'server_handled', 'server_sent'])
+                result = connection.receive()  # result of task in batch processing mode
+                self.assertEqual(result[4], 'ba')
+                names = hop_names(result[5])
+                self.assertEqual(names[:4], ['client_sent', 'server_read', 'worker_semaphore', 'worker_queued'])
+                self.assertIn('worker_compute_start', names)
+                self.assertEqual(names[-2:], ['worker_finished', 'server_sent'])
+            finally:
+                connection.close()
+
+    def test_invalid_trace_of_client_is_ignored(self):
+        with running_server(delay=0) as server:
+            connection = RawConnection(server)
+            try:
+                response = connection.request([1, 'help', None, None, 'x'])
+                self.assertEqual((response[0], response[4]), (1, None))
+                response = connection.request([2, 'status', None, 5, None, {'id': 'a', 'hops': 1}])
+                self.assertEqual((response[0], response[5]), (2, None))  # connection is alive
+            finally:
+                connection.close()
@@ -0,0 +1,255 @@
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+from typing import List, Tuple
+from unittest import mock
+
+from Client.Queues import InputOutput
+from Server.ServerEventLoops import MainServer, UserEventLoop
+from src.ClientRequests import BaseRequest
+from src.MessageHandlers import ClientMessageHandler, DataTransfer
+from src.Transport import ReadinessListener, ShmRing, ShmRingTransfer, create_client_handler, notify_ready, \
+    parse_address, remove_socket_file, shared_memory
+from tests.Support import free_port, running_server
+
+
+class ParseAddressTest(unittest.TestCase):
+    def test_schemes(self):
+        self.assertEqual(parse_address('127.0.0.1:12345'), ('tcp', ('127.0.0.1', 12345)))
+        self.assertEqual(parse_address('tcp://localhost:1'), ('tcp', ('localhost', 1)))
+        self.assertEqual(parse_address('tcp://[::1]:1'), ('tcp', ('[::1]', 1)))
+        if hasattr(socket, 'AF_UNIX'):
+            self.assertEqual(parse_address('unix:///tmp/server.sock'), ('unix', '/tmp/server.sock'))
+
+    def test_wrong_addresses(self):
+        for address in ('udp://127.0.0.1:1', 'tcp://127.0.0.1', 'tcp://:1', '127.0.0.1:port', 'unix://'):
+            with self.subTest(address=address), self.assertRaises(ValueError):
+                parse_address(address)
+
+
+class FramingTest(unittest.TestCase):
+    def setUp(self):
+        self.sender_socket, receiver_socket = socket.socketpair()
+        self.receiver = DataTransfer(receiver_socket, ('peer', 0))
+        self.receiver.read_timeout = 2.0
+
+    def tearDown(self):
+        self.sender_socket.close()
+        self.receiver.client_socket.close()
+
+    def test_end_of_message_inside_data_is_escaped(self):
+        message = [1, 'task', None, '--reverse', False, None, 'text endofmsg text', None]
+        data = BaseRequest.dump(message)
+        self.assertEqual(data.count(b'endofmsg'), 1)
+        self.sender_socket.sendall(data)
+        self.assertEqual(list(BaseRequest.loads(self.receiver.read_msg())), message)
+
+    def test_end_of_message_split_between_packages(self):
+        self.receiver.msg_len = 3
+        self.sender_socket.sendall(b'["abc"]endofmsg["d"]endofmsg')
+        self.assertEqual(self.receiver.read_msg(), b'["abc"]')
+        self.assertEqual(self.receiver.read_msg(), b'["d"]')
+        self.assertEqual(self.receiver.receive_buffer, bytearray())
+
+    def test_several_messages_in_one_receive(self):
+        self.sender_socket.sendall(b'["a"]endofmsg["b"]endofmsg["c"')
+        self.assertEqual(self.receiver.read_msg(), b'["a"]')
+        self.assertTrue(self.receiver.has_buffered_msg())  # socket may be not readable, but message is received
+        self.assertEqual(self.receiver.read_msg(), b'["b"]')
+        self.assertFalse(self.receiver.has_buffered_msg())
+        self.sender_socket.sendall(b']endofmsg')
+        self.assertEqual(self.receiver.read_msg(), b'["c"]')
+
+    def test_timeout_and_lost_connection(self):
+        self.receiver.read_timeout = 0.05
+        self.sender_socket.sendall(b'["a"')
+        with self.assertRaises(TimeoutError):
+            self.receiver.read_msg()
+        self.sender_socket.close()
+        with self.assertRaises(ConnectionError):
+            self.receiver.read_msg()
+
+
+class ReadinessTest(unittest.TestCase):
+    def setUp(self):
+        self.listener = ReadinessListener()
+
+    def tearDown(self):
+        self.listener.close()
+
+    def waiting_client(self, window: threading.Thread) -> InputOutput:
+        """input and output of client, which waits for the result window started in thread"""
+        io = InputOutput.__new__(InputOutput)  # without client event loop
+        io.readiness, io.result_window, io.result_window_subprocess = self.listener, window, None
+        return io
+
+    def test_notification(self):
+        thread = threading.Thread(target=notify_ready, args=(self.listener.address,))
+        thread.start()
+        self.assertTrue(self.listener.wait(5))
+        thread.join(5)
+
+    def test_timeout_of_listener(self):
+        start = time.monotonic()
+        self.assertFalse(self.listener.wait(0.1))
+        self.assertLess(time.monotonic() - start, 1)
+        self.listener.close()
+        notify_ready(self.listener.address)  # nobody waits for notification, it is not error
+
+    def test_result_window_signals_ready(self):
+        def result_window():
+            time.sleep(0.1)  # result window starts listening
+            notify_ready(self.listener.address)
+
+        window = threading.Thread(target=result_window)
+        window.start()
+        self.assertTrue(self.waiting_client(window).wait_result_window())
+        window.join(5)
+        self.assertEqual(self.listener.listener.fileno(), -1)  # listener is closed after waiting
+
+    def test_result_window_never_connects(self):
+        is_active = threading.Event()
+        window = threading.Thread(target=is_active.wait, args=(5,))  # started, but never notifies
+        window.start()
+        io = self.waiting_client(window)
+        io.ready_timeout = 0.2
+        start = time.monotonic()
+        try:
+            self.assertFalse(io.wait_result_window())
+            self.assertLess(time.monotonic() - start, 1)
+        finally:
+            is_active.set()
+            window.join(5)
+        start = time.monotonic()  # closed result window is not waited until timeout
+        self.listener = ReadinessListener()
+        io = self.waiting_client(window)
+        io.ready_timeout = 5
+        self.assertFalse(io.wait_result_window())
+        self.assertLess(time.monotonic() - start, 1)
+
+
+class ConnectBackoffTest(unittest.TestCase):
+    @staticmethod
+    def connect(address: tuple, n_max: int, cap: float = 1.0) -> Tuple[bool, List[float]]:
+        """
+        connect client handler and record its pauses between tries
+        :return: is connected, pauses between tries in s
+        """
+        pauses = list()
+        sleep = time.sleep
+
+        def record(seconds: float):
+            if threading.current_thread() is threading.main_thread():
+                pauses.append(seconds)
+            sleep(seconds)
+
+        handler = ClientMessageHandler(socket.socket(socket.AF_INET, socket.SOCK_STREAM), address)
+        handler.connect_backoff_cap = cap
+        try:
+            with mock.patch('src.MessageHandlers.time.sleep', record):
+                handler.connect(n_max=n_max)
+        finally:
+            handler.client_socket.close()
+        return handler.is_connected, pauses
+
+    def test_listener_starts_late(self):
+        address = ('127.0.0.1', free_port())
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+        def start():
+            listener.bind(address)
+            listener.listen(1)
+
+        timer = threading.Timer(0.2, start)
+        timer.start()
+        begin = time.monotonic()
+        try:
+            is_connected, pauses = self.connect(address, n_max=10)
+            elapsed = time.monotonic() - begin
+        finally:
+            timer.join(5)
+            listener.close()
+        self.assertTrue(is_connected)
+        self.assertEqual(pauses, [0.01 * 2 ** number for number in range(len(pauses))])  # pause is doubled
+        self.assertTrue(0.2 <= sum(pauses) < 0.6, pauses)  # not more than the last doubled pause after start
+        self.assertLess(elapsed, 1)
+
+    def test_pause_is_capped(self):
+        self.assertEqual(self.connect(('127.0.0.1', free_port()), n_max=5, cap=0.03),
+                         (False, [0.01, 0.02, 0.03, 0.03, 0.03]))
+
+
+@unittest.skipIf(shared_memory is None, 'shared memory is not supported')
+class ShmRingTest(unittest.TestCase):
+    def setUp(self):
+        self.name = 'test_' + uuid.uuid4().hex[:12]
+
+    def test_ring_wraps_around(self):
+        ring = ShmRing(self.name, 8)
+        try:
+            self.assertEqual(ring.write(b'abcdef'), 6)
+            self.assertEqual(ring.read(4), b'abcd')
+            self.assertEqual(ring.write(b'ghijklmn'), 6)  # only free space is written
+            self.assertEqual(ring.write(b'x'), 0)
+            self.assertEqual(ring.read(100), b'efghijkl')
+            self.assertFalse(ring.readable())
+        finally:
+            ring.close()
+
+    def test_messages_larger_than_ring(self):
+        consumer, producer = ShmRingTransfer(self.name), ShmRingTransfer(self.name)
+        consumer.listen(capacity=64)
+        messages = [BaseRequest.dump([number, 'x' * 100 * number, 'endofmsg']) for number in range(5)]
+        try:
+            producer.connect()
+            thread = threading.Thread(target=lambda: [producer.send_msg(message) for message in messages])
+            thread.start()
+            received = [consumer.read_msg() + b'endofmsg' for _ in messages]
+            thread.join(5)
+            self.assertEqual(received, messages)
+        finally:
+            producer.close()
+            consumer.close()
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'unix domain sockets are not supported')
+class UnixSocketTest(unittest.TestCase):
+    def test_request_over_unix_socket(self):
+        with tempfile.TemporaryDirectory() as directory:
+            address = 'unix://' + os.path.join(directory, 'server.sock')
+            with running_server(delay=0, address=address):
+                client = create_client_handler(address)
+                try:
+                    client.connect()
+                    client.send_msg(BaseRequest.dump([1, 'status', None, 5, None, None]))
+                    response = BaseRequest.loads(client.read_msg())
+                finally:
+                    client.client_socket.close()
+            self.assertFalse(os.path.exists(address[len('unix://'):]))  # socket file is removed by server
+        self.assertEqual(response[:2], (1, 'status'))
+
+    def test_only_socket_file_is_removed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'data.txt')
+            with open(path, 'w') as file:
+                file.write('data of user')
+            server = MainServer(UserEventLoop)
+            try:
+                with self.assertRaises(ValueError):
+                    server.run_address('unix://' + path)  # mistyped address
+            finally:
+                server.server_socket.close()
+            remove_socket_file(path, strict=False)
+            with open(path) as file:
+                self.assertEqual(file.read(), 'data of user')
+
+            path = os.path.join(directory, 'stale.sock')
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+                stale.bind(path)  # socket file of previous run
+            remove_socket_file(path)
+            self.assertFalse(os.path.exists(path))
+            remove_socket_file(path)  # missing file is not error
@@ -0,0 +1,123 @@
+import os
+import socket
+import tempfile
+import time
+import unittest
+
+from Client.ClientEventLoops import ClientEventLoop
+from src.ClientRequests import BaseRequest, Task, create_request
+from src.MessageHandlers import DataTransfer
+from tests.Support import RawConnection, running_server
+
+
+def chunk(upload: int, size: int, data: str) -> list:
+    """chunk of uploaded data"""
+    return [upload, 'upload', None, size, data, None]
+
+
+def task(identifier: int, upload: int) -> list:
+    """task with uploaded data"""
+    return [identifier, 'task', None, '--reverse', False, None, None, None, None, None, upload]
+
+
+class ServerUploadsTest(unittest.TestCase):
+    def test_uploads_of_connection_are_limited(self):
+        with running_server(max_uploads_per_connection=2) as server:
+            connection = RawConnection(server)
+            try:
+                for upload in (1, 2, 3):
+                    connection.send(chunk(upload, 2, 'ab'))
+                responses = [connection.request(task(10 + upload, upload)) for upload in (1, 2, 3)]
+                self.assertEqual([response[2] is None for response in responses], [True, True, False])
+                self.assertIn('not found', responses[2][2])
+                connection.send(chunk(4, 2, 'cd'))  # finished uploads release their places
+                self.assertIsNone(connection.request(task(14, 4))[2])
+            finally:
+                connection.close()
+
+    def test_wrong_chunks_are_answered_by_notice(self):
+        with running_server() as server:
+            connection = RawConnection(server)
+            try:
+                connection.send(chunk(1, 4, 'ab'))
+                for wrong in (chunk(7, 'x', 'abc'), chunk(7, -1, 'abc'), chunk(7, True, 'abc'), chunk(1, 4, 5),
+                              chunk([1], 4, 'ab')):
+                    connection.send(wrong)
+                    response = connection.receive()
+                    self.assertEqual(response[:2], [0, 'help'])
+                    self.assertTrue(response[2].startswith('ValueError.'), response[2])
+                self.assertIn('not found', connection.request(task(2, 1))[2])  # upload with wrong chunk is removed
+            finally:
+                connection.close()
+
+    def test_stalled_upload_expires(self):
+        with running_server(upload_timeout=0.1) as server:
+            connection = RawConnection(server)
+            try:
+                connection.send(chunk(1, 4, 'ab'))
+                deadline = time.monotonic() + 5
+                while time.monotonic() < deadline and (not server.sockets or server.sockets[0].uploads):
+                    time.sleep(0.05)
+                self.assertEqual(server.sockets[0].uploads, {})
+                self.assertIn('not found', connection.request(task(2, 1))[2])
+            finally:
+                connection.close()
+
+
+class ClientUploadTest(unittest.TestCase):
+    def setUp(self):
+        descriptor, self.path = tempfile.mkstemp()
+        with os.fdopen(descriptor, 'w') as file:
+            file.write('abcdefgh')
+        self.listener = socket.socket()
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(1)
+        self.client = ClientEventLoop(socket.socket(), self.listener.getsockname(), None,
+                                      is_start_result_window=False)
+        self.client.client_socket.connect(self.listener.getsockname())
+        self.server_side = DataTransfer(self.listener.accept()[0], ('client', 0))
+        self.chunk_size = Task.upload_chunk_size
+        Task.upload_chunk_size = 3
+
+    def tearDown(self):
+        Task.upload_chunk_size = self.chunk_size
+        self.client.stop_upload()
+        for connection in (self.client.client_socket, self.server_side.client_socket, self.listener):
+            connection.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_file_is_sent_by_one_chunk_per_call(self):
+        request = create_request(f'task --reverse -f {self.path}', self.client)
+        self.client.start_upload(request)
+        messages = list()
+        while self.client.upload is not None:
+            self.client.send_upload()
+            messages.append(BaseRequest.loads(self.server_side.read_msg()))
+        self.assertEqual([message[1] for message in messages], ['upload', 'upload', 'upload', 'task'])
+        self.assertEqual(''.join(message[4] for message in messages[:-1]), 'abcdefgh')
+        self.assertIn(request.request_identifier_on_client, self.client.queue.wait_for_result)
+
+    def test_timeout_aborts_upload_and_batch_mode(self):
+        self.client.queue.create_request(f'task --reverse -b -f {self.path}')
+        request = self.client.queue.data_to_send.pop()
+        self.client.start_upload(request)
+        self.client.send_upload()
+
+        def timeout(message: bytes):
+            raise TimeoutError('Timeout to send message')
+        self.client.send_msg = timeout
+        self.client.send_upload()
+        self.assertIsNone(self.client.upload)
+        shown = [item[0] for item in self.client.queue.data_to_show.items]
+        self.assertTrue(any('is aborted' in text for text in shown), shown)
+        self.assertFalse(self.client.batch_processing_mode.status)
+        self.assertEqual(self.client.queue.wait_for_result, {})
+
+    def test_removed_file_aborts_upload(self):
+        request = create_request(f'task --reverse -f {self.path}', self.client)
+        os.remove(self.path)
+        self.client.start_upload(request)
+        self.client.send_upload()
+        self.assertIsNone(self.client.upload)
+        self.assertEqual(self.client.queue.wait_for_result, {})
@@ -0,0 +1,97 @@
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from Server.Worker import Worker
+from src.ServerRequest import ServerCancelRequest
+from tests.Support import RawConnection, running_server, task
+
+
+class CancelAfterCheckWorker(Worker):
+    """worker, whose task is cancelled by client right after check_task of delay_tasks"""
+    def check_task(self, identifier: int) -> bool:
+        is_alive = super(CancelAfterCheckWorker, self).check_task(identifier)
+        self.semaphore.acquire()
+        self.cancel_task(identifier)
+        self.semaphore.release()
+        return is_alive
+
+
+class StartTaskTest(unittest.TestCase):
+    def test_queued_task_is_started(self):
+        worker = Worker()
+        identifier = worker.add_task(task())
+        worker.delay_tasks()
+        self.assertEqual(worker.tasks.get_status(identifier), 'in work')
+        self.assertEqual([item[1] for item in worker.delayed], [identifier])
+
+    def test_task_cancelled_before_start_is_not_started(self):
+        worker = CancelAfterCheckWorker()
+        identifier = worker.add_task(task())
+        worker.delay_tasks()
+        self.assertEqual(worker.tasks.get_status(identifier), 'cancelled')
+        self.assertEqual(worker.delayed, [])
+        self.assertIsNone(worker.pop_ready_task())
+
+    def test_start_of_finished_task_is_skipped(self):
+        worker = Worker()
+        identifier = worker.add_task(task())
+        worker.semaphore.acquire()
+        worker.cancel_task(identifier)
+        worker.semaphore.release()
+        self.assertFalse(worker.start_task(identifier))
+        self.assertEqual(worker.tasks.get_status(identifier), 'cancelled')
+
+
+class DeadlineTest(unittest.TestCase):
+    @staticmethod
+    def slow_stage(task_type: str, value, is_last: bool = True) -> str:
+        time.sleep(0.1)
+        return value[::-1]
+
+    def test_deadline_passed_while_computing(self):
+        worker = Worker()
+        identifier = worker.add_task(SimpleNamespace(**{**vars(task()), 'deadline': 0.05}))
+        worker.delay_tasks()
+        with mock.patch('Server.Worker.run_stage', self.slow_stage):
+            worker.compute_stage(identifier)  # compute phase without waiting for simulated latency
+        self.assertEqual(worker.tasks.get_status(identifier), 'expired')
+        self.assertIsNone(worker.tasks.get_result(identifier))
+
+    def test_task_within_deadline_is_done(self):
+        worker = Worker()
+        identifier = worker.add_task(SimpleNamespace(**{**vars(task()), 'deadline': 5}))
+        worker.delay_tasks()
+        with mock.patch('Server.Worker.run_stage', self.slow_stage):
+            worker.compute_stage(identifier)  # compute phase without waiting for simulated latency
+        self.assertEqual((worker.tasks.get_status(identifier), worker.tasks.get_result(identifier)), ('done', 'cba'))
+
+
+class CancelCommandTest(unittest.TestCase):
+    def test_cancel_of_one_and_several_tasks(self):
+        with running_server(delay=10) as server:
+            connection = RawConnection(server)
+            try:
+                identifiers = [connection.request([number, 'task', None, '--reverse', False, None, 'abc', None, None,
+                                                   None, None])[7] for number in (1, 2)]
+                response = connection.request([3, 'cancel', None, identifiers[:1], None, None])
+                self.assertEqual((response[2], response[4]), (None, [[identifiers[0], 'cancelled']]))
+                response = connection.request([4, 'cancel', None, identifiers + [100], None, None])
+                self.assertEqual(response[4], [[identifiers[0], 'cancelled'], [identifiers[1], 'cancelled'],
+                                               [100, 'not found']])
+            finally:
+                connection.close()
+
+    def test_wrong_identifiers(self):
+        with running_server(delay=0) as server:
+            connection = RawConnection(server)
+            try:
+                for number, identifier in enumerate((5, 'x', [1, 'a'], [True], None,
+                                                     [1] * (ServerCancelRequest.max_identifiers + 1)), 1):
+                    response = connection.request([number, 'cancel', None, identifier, None, None])
+                    self.assertEqual(response[0], number)
+                    self.assertTrue(response[2].startswith('ValueError.'), response[2])
+                    self.assertIsNone(response[4])
+            finally:
+                connection.close()